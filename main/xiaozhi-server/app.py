@@ -9,6 +9,10 @@ from core.utils.util import get_local_ip, validate_mcp_endpoint
 from core.http_server import SimpleHttpServer
 from core.websocket_server import WebSocketServer
 from core.utils.util import check_ffmpeg_installed
+from core.utils.asset_cache import preload_assets
+from core.utils.music_cache import start_music_cache
+from core.utils.http_client import configure_http_client
+from core.utils.runtime import configure_runtime, log_runtime_report
 
 TAG = __name__
 logger = setup_logging()
@@ -46,6 +50,15 @@ async def monitor_stdin():
 async def main():
     check_ffmpeg_installed()
     config = load_config()
+    # TTSなどが共有するHTTP接続プールの設定を反映します
+    configure_http_client(config)
+    # ローカルモデルのスレッド数とCPUアフィニティの割り当てを反映します（モデル初期化前）
+    configure_runtime(config)
+
+    # 静的オーディオアセットをバックグラウンドで事前にOpusへ変換します
+    asyncio.get_running_loop().run_in_executor(None, preload_assets)
+    # 音楽ディレクトリをバックグラウンドで事前にp3へ変換します
+    start_music_cache(config)
 
     # デフォルトで manager-api の secret を auth_key として使用します
     # secret が空の場合、ランダムなキーを生成します
@@ -60,6 +73,8 @@ async def main():
 
     # WebSocket サーバーを起動
     ws_server = WebSocketServer(config)
+    # 実際に適用されたスレッド設定を出力します
+    log_runtime_report()
     ws_task = asyncio.create_task(ws_server.start())
     # Simple http サーバーを起動
     ota_server = SimpleHttpServer(config)
@@ -0,0 +1,28 @@
+import json
+from aiohttp import web
+from core.api.base_handler import BaseHandler
+from core.utils.metrics import get_metrics
+
+TAG = __name__
+
+
+class MetricsHandler(BaseHandler):
+    def __init__(self, config: dict):
+        super().__init__(config)
+
+    async def handle_get(self, request):
+        """実行時メトリクスをJSON形式で返します"""
+        try:
+            response = web.Response(
+                text=json.dumps(get_metrics(), ensure_ascii=False),
+                content_type="application/json",
+            )
+        except Exception as e:
+            self.logger.bind(tag=TAG).error(f"メトリクス取得例外: {e}")
+            response = web.Response(
+                text=json.dumps({"success": False, "message": "サーバー内部エラー"}),
+                content_type="application/json",
+            )
+        finally:
+            self._add_cors_headers(response)
+        return response
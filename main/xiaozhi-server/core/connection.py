@@ -22,6 +22,13 @@ from core.utils.modules_initialize import (
     initialize_tts,
     initialize_asr,
 )
+from core.utils.pipeline import (
+    PIPELINE_MODE_ASYNCIO,
+    AsyncBridgeQueue,
+    get_pipeline_mode,
+    get_shared_executor,
+)
+from core.utils.audio_buffer import PcmBuffer
 from core.handle.reportHandle import report
 from core.providers.tts.default import DefaultTTS
 from concurrent.futures import ThreadPoolExecutor
@@ -88,10 +95,19 @@ class ConnectionHandler:
         # スレッドタスク関連
         self.loop = asyncio.get_event_loop()
         self.stop_event = threading.Event()
-        self.executor = ThreadPoolExecutor(max_workers=5)
+        # thread: 接続ごとにスレッドを起動、asyncio: asyncioタスクと共有スレッドプールで処理
+        self.pipeline_mode = get_pipeline_mode(self.config)
+        # asyncioモードで起動したパイプラインタスク（close時にキャンセル）
+        self.pipeline_tasks = []
+        if self.pipeline_mode == PIPELINE_MODE_ASYNCIO:
+            self.executor = get_shared_executor(self.config)
+            self.owns_executor = False
+        else:
+            self.executor = ThreadPoolExecutor(max_workers=5)
+            self.owns_executor = True
 
         # レポート用スレッドプールを追加
-        self.report_queue = queue.Queue()
+        self.report_queue = self._create_queue()
         self.report_thread = None
         # 将来的にはここを修正してASRとTTSのレポートを調整できますが、現在はデフォルトで両方有効です
         self.report_asr_enable = self.read_config_from_api
@@ -108,20 +124,30 @@ class ConnectionHandler:
         self.intent = _intent
 
         # VAD関連の変数
-        self.client_audio_buffer = bytearray()
+        # 受信したOpusパケットは一度だけデコードしてpcm_bufferに書き込み、VADとASRの両方がここから読み取ります
+        self.pcm_buffer = PcmBuffer()
+        # VADが次に読み取るサンプルの絶対インデックス
+        self.vad_read_index = 0
         self.client_have_voice = False
         self.last_activity_time = 0.0  # 統一されたアクティビティタイムスタンプ（ミリ秒）
         self.client_voice_stop = False
+        # 短い無音（推測モードのしきい値）を検出したかどうか
+        self.client_voice_pause = False
+        # VADが音声と判定した区間（pcm_bufferの絶対インデックス）。ASR前の無音トリミングに使用します
+        self.speech_start_index = None
+        self.speech_end_index = None
 
         # ASR関連の変数
         # 実際のデプロイでは共有のローカルASRが使用される可能性があるため、変数を共有ASRに公開することはできません
         # そのため、ASR関連の変数はここで定義する必要があり、connectionのプライベート変数となります
         self.asr_audio = []
-        self.asr_audio_queue = queue.Queue()
+        self.asr_audio_queue = self._create_queue()
 
         # LLM関連の変数
         self.llm_finish_task = True
         self.dialogue = Dialogue()
+        # 発話終了の確定前に先行して開始した推測中の対話
+        self.speculation = None
 
         # TTS関連の変数
         self.sentence_id = None
@@ -149,6 +175,12 @@ class ConnectionHandler:
         # {"mcp":true} はMCP機能を有効にすることを意味します
         self.features = None
 
+    def _create_queue(self):
+        """パイプラインモードに応じたキューを作成します"""
+        if self.pipeline_mode == PIPELINE_MODE_ASYNCIO:
+            return AsyncBridgeQueue(self.loop)
+        return queue.Queue()
+
     async def handle_connection(self, ws):
         try:
             # ヘッダーを取得して検証
@@ -269,7 +301,7 @@ class ConnectionHandler:
                 return
             if self.asr is None:
                 return
-            self.asr_audio_queue.put(message)
+            self.asr_audio_queue.put_nowait(message)
 
     async def handle_restart(self, message):
         """サーバー再起動リクエストを処理します"""
@@ -364,6 +396,10 @@ class ConnectionHandler:
             return
         if self.chat_history_conf == 0:
             return
+        if self.pipeline_mode == PIPELINE_MODE_ASYNCIO:
+            # asyncioモードではレポート用スレッドの代わりにタスクを起動
+            asyncio.run_coroutine_threadsafe(self._start_report_task(), self.loop)
+            return
         if self.report_thread is None or not self.report_thread.is_alive():
             self.report_thread = threading.Thread(
                 target=self._report_worker, daemon=True
@@ -608,12 +644,17 @@ class ConnectionHandler:
         # システムプロンプトをコンテキストに更新
         self.dialogue.update_system_message(self.prompt)
 
-    def chat(self, query, tool_call=False):
-        self.logger.bind(tag=TAG).info(f"大規模モデルがユーザーメッセージを受信しました: {query}")
-        self.llm_finish_task = False
+    def chat(self, query, tool_call=False, speculation=None):
+        """speculationを指定した場合は推測モードで実行します
 
-        if not tool_call:
-            self.dialogue.put(Message(role="user", content=query))
+        発話終了が確定するまでTTSメッセージはspeculationにバッファされ、
+        ツール呼び出しと対話履歴の保存は確定を待ってから行います
+        """
+        self.logger.bind(tag=TAG).info(f"大規模モデルがユーザーメッセージを受信しました: {query}")
+        if speculation is None:
+            self.llm_finish_task = False
+            if not tool_call:
+                self.dialogue.put(Message(role="user", content=query))
 
         # 意図関数を定義
         functions = None
@@ -630,22 +671,32 @@ class ConnectionHandler:
                 )
                 memory_str = future.result()
 
-            self.sentence_id = str(uuid.uuid4().hex)
+            dialogue = self.dialogue.get_llm_dialogue_with_memory(memory_str)
+            if speculation is None:
+                sentence_id = str(uuid.uuid4().hex)
+                self.sentence_id = sentence_id
+            else:
+                # 推測中はユーザーメッセージを履歴に追加せず、リクエストにのみ含めます
+                sentence_id = speculation.sentence_id
+                dialogue.append({"role": "user", "content": query})
 
             if self.intent_type == "function_call" and functions is not None:
                 # functionsをサポートするストリーミングインターフェースを使用
                 llm_responses = self.llm.response_with_functions(
                     self.session_id,
-                    self.dialogue.get_llm_dialogue_with_memory(memory_str),
+                    dialogue,
                     functions=functions,
                 )
             else:
                 llm_responses = self.llm.response(
                     self.session_id,
-                    self.dialogue.get_llm_dialogue_with_memory(memory_str),
+                    dialogue,
                 )
         except Exception as e:
             self.logger.bind(tag=TAG).error(f"LLM処理中にエラーが発生しました {query}: {e}")
+            if speculation is not None:
+                # 確定時に通常の対話をやり直します
+                speculation.cancel()
             return None
 
         # ストリーミング応答を処理
@@ -655,9 +706,12 @@ class ConnectionHandler:
         function_arguments = ""
         content_arguments = ""
         text_index = 0
-        self.client_abort = False
+        if speculation is None:
+            self.client_abort = False
         for response in llm_responses:
-            if self.client_abort:
+            if speculation is not None and speculation.cancelled:
+                break
+            if self.client_abort and (speculation is None or speculation.confirmed):
                 break
             if self.intent_type == "function_call" and functions is not None:
                 content, tools_call = response
@@ -685,22 +739,32 @@ class ConnectionHandler:
                 if not tool_call_flag:
                     response_message.append(content)
                     if text_index == 0:
-                        self.tts.tts_text_queue.put(
+                        self._put_tts_text(
                             TTSMessageDTO(
-                                sentence_id=self.sentence_id,
+                                sentence_id=sentence_id,
                                 sentence_type=SentenceType.FIRST,
                                 content_type=ContentType.ACTION,
-                            )
+                            ),
+                            speculation,
                         )
-                    self.tts.tts_text_queue.put(
+                    self._put_tts_text(
                         TTSMessageDTO(
-                            sentence_id=self.sentence_id,
+                            sentence_id=sentence_id,
                             sentence_type=SentenceType.MIDDLE,
                             content_type=ContentType.TEXT,
                             content_detail=content,
-                        )
+                        ),
+                        speculation,
                     )
                     text_index += 1
+
+        if speculation is not None:
+            # 発話終了が確定するまで待ち、ユーザーが話し続けた場合は応答を破棄します
+            if not speculation.wait():
+                self.logger.bind(tag=TAG).debug(f"推測応答を破棄しました: {query}")
+                return None
+            self.dialogue.put(Message(role="user", content=query))
+
         # function callを処理
         if tool_call_flag:
             bHasError = False
@@ -752,7 +816,7 @@ class ConnectionHandler:
         if text_index > 0:
             self.tts.tts_text_queue.put(
                 TTSMessageDTO(
-                    sentence_id=self.sentence_id,
+                    sentence_id=sentence_id,
                     sentence_type=SentenceType.LAST,
                     content_type=ContentType.ACTION,
                 )
@@ -764,6 +828,32 @@ class ConnectionHandler:
 
         return True
 
+    def _put_tts_text(self, message, speculation=None):
+        """TTSテキストキューに追加します（推測中は確定までバッファします）"""
+        if speculation is None:
+            self.tts.tts_text_queue.put(message)
+        else:
+            speculation.put(self.tts.tts_text_queue, message)
+
+    def confirm_speculation(self, speculation) -> bool:
+        """推測中の対話を確定し、バッファした応答をTTSに送ります"""
+        if speculation.query is None:
+            return False
+        self.sentence_id = speculation.sentence_id
+        self.llm_finish_task = False
+        self.client_abort = False
+        return speculation.confirm()
+
+    def cancel_speculation(self):
+        """推測中の対話を破棄します"""
+        speculation = self.speculation
+        if speculation is None:
+            return
+        self.speculation = None
+        speculation.cancel()
+        if speculation.asr_task is not None and not speculation.asr_task.done():
+            speculation.asr_task.cancel()
+
     def _handle_function_result(self, result, function_call_data):
         if result.action == Action.RESPONSE:  # フロントエンドに直接応答
             text = result.response
@@ -835,6 +925,33 @@ class ConnectionHandler:
 
         self.logger.bind(tag=TAG).info("チャット履歴レポートスレッドが終了しました")
 
+    async def _start_report_task(self):
+        """asyncioモードのレポートタスクを起動します"""
+        self.pipeline_tasks.append(asyncio.create_task(self._report_task()))
+        self.logger.bind(tag=TAG).info("TTSレポート用タスクが開始されました")
+
+    async def _report_task(self):
+        """チャット履歴レポートタスク（asyncioモード）"""
+        while not self.stop_event.is_set():
+            item = await self.report_queue.get()
+            if item is None:  # ポイズンピルを検出
+                break
+            type, text, audio_data, report_time = item
+            try:
+                # ブロッキングするレポート処理は共有スレッドプールで実行
+                await self.loop.run_in_executor(
+                    self.executor,
+                    self._process_report,
+                    type,
+                    text,
+                    audio_data,
+                    report_time,
+                )
+            except Exception as e:
+                self.logger.bind(tag=TAG).error(f"チャット履歴レポートタスクで例外が発生しました: {e}")
+
+        self.logger.bind(tag=TAG).info("チャット履歴レポートタスクが終了しました")
+
     def _process_report(self, type, text, audio_data, report_time):
         """レポートタスクを処理します"""
         try:
@@ -875,9 +992,28 @@ class ConnectionHandler:
             if self.stop_event:
                 self.stop_event.set()
 
+            # 推測中の対話を破棄（確定待ちの対話スレッドを解放）
+            self.cancel_speculation()
+
+            # asyncioモードのパイプラインタスクをキャンセル
+            for task in self.pipeline_tasks:
+                if not task.done():
+                    task.cancel()
+            self.pipeline_tasks.clear()
+
             # タスクキューをクリア
             self.clear_queues()
 
+            # 接続ごとのTTS/ASRプロバイダーが保持する外部接続を解放
+            # （ローカルASRは全接続で共有しているため閉じない）
+            for provider in (self.tts, self.asr if self.asr is not self._asr else None):
+                if provider is None:
+                    continue
+                try:
+                    await provider.close()
+                except Exception as e:
+                    self.logger.bind(tag=TAG).error(f"プロバイダーのクローズ中にエラーが発生しました: {e}")
+
             # WebSocket接続を閉じる
             try:
                 if ws:
@@ -915,7 +1051,8 @@ class ConnectionHandler:
                 self.logger.bind(tag=TAG).error(f"WebSocket接続を閉じる際にエラーが発生しました: {ws_error}")
 
             # 最後にスレッドプールを閉じる（ブロッキングを避けるため）
-            if self.executor:
+            # 共有スレッドプールは他の接続も使用しているため閉じない
+            if self.executor and self.owns_executor:
                 try:
                     self.executor.shutdown(wait=False)
                 except Exception as executor_error:
@@ -939,6 +1076,9 @@ class ConnectionHandler:
                 f"クリーンアップ開始: TTSキューサイズ={self.tts.tts_text_queue.qsize()}, オーディオキューサイズ={self.tts.tts_audio_queue.qsize()}"
             )
 
+            # 先読み合成中のセグメントを破棄（キューのクリア後に再生キューへ入らないようにする）
+            self.tts.cancel_lookahead()
+
             # 非ブロッキング方式でキューをクリア
             for q in [
                 self.tts.tts_text_queue,
@@ -958,9 +1098,13 @@ class ConnectionHandler:
             )
 
     def reset_vad_states(self):
-        self.client_audio_buffer = bytearray()
+        # 処理途中の端数フレームは破棄します
+        self.vad_read_index = self.pcm_buffer.end
         self.client_have_voice = False
         self.client_voice_stop = False
+        self.client_voice_pause = False
+        self.speech_start_index = None
+        self.speech_end_index = None
         self.logger.bind(tag=TAG).debug("VADの状態がリセットされました。")
 
     def chat_and_close(self, text):
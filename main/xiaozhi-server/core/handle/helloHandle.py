@@ -3,7 +3,7 @@ import json
 import random
 import asyncio
 from core.utils.dialogue import Message
-from core.utils.util import audio_to_data
+from core.utils.asset_cache import get_asset_audio
 from core.handle.sendAudioHandle import sendAudioMessage, send_stt_message
 from core.utils.util import remove_punctuation_and_length, opus_datas_to_wav_bytes
 from core.providers.tts.dto.dto import ContentType, SentenceType
@@ -83,7 +83,7 @@ async def checkWakeupWords(conn, text):
 
     # ウェイクアップワードの応答を再生
     conn.client_abort = False
-    opus_packets, _ = audio_to_data(response.get("file_path"))
+    opus_packets, _ = get_asset_audio(response.get("file_path"))
 
     conn.logger.bind(tag=TAG).info(f"ウェイクアップワードの応答を再生: {response.get('text')}")
     await sendAudioMessage(conn, SentenceType.FIRST, opus_packets, response.get("text"))
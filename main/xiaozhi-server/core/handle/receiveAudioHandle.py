@@ -5,19 +5,20 @@ from core.handle.abortHandle import handleAbortMessage
 import time
 import asyncio
 from core.handle.sendAudioHandle import SentenceType
-from core.utils.util import audio_to_data
+from core.utils.asset_cache import get_asset_audio
 
 TAG = __name__
 
 
 async def handleAudioMessage(conn, audio):
     # 現在のフラグメントに誰かが話しているか
-    have_voice = conn.vad.is_vad(conn, audio)
+    have_voice = await conn.vad.is_vad_async(conn, audio)
     # デバイスがちょうど起動された場合、VAD検出を一時的に無視
     if have_voice and hasattr(conn, "just_woken_up") and conn.just_woken_up:
         have_voice = False
         # 短い遅延の後にVAD検出を再開するように設定
         conn.asr_audio.clear()
+        conn.pcm_buffer.clear()
         if not hasattr(conn, "vad_resume_task") or conn.vad_resume_task.done():
             conn.vad_resume_task = asyncio.create_task(resume_vad_detection(conn))
         return
@@ -37,7 +38,7 @@ async def resume_vad_detection(conn):
     conn.just_woken_up = False
 
 
-async def startToChat(conn, text):
+async def startToChat(conn, text, speculation=None):
     if conn.need_bind:
         await check_bind_device(conn)
         return
@@ -61,6 +62,13 @@ async def startToChat(conn, text):
 
     # 意図が処理されていない場合は、通常のチャットフローを続行
     await send_stt_message(conn, text)
+    # 同じテキストで推測中の対話があれば、それを確定してバッファ済みの応答をすぐに再生します
+    if (
+        speculation is not None
+        and speculation.query == text
+        and conn.confirm_speculation(speculation)
+    ):
+        return
     conn.executor.submit(conn.chat, text)
 
 
@@ -95,7 +103,7 @@ async def max_out_size(conn):
     text = "すみません、今ちょっと用事があるので、明日のこの時間にまた話しましょう。約束ですよ！また明日、さようなら！"
     await send_stt_message(conn, text)
     file_path = "config/assets/max_output_size.wav"
-    opus_packets, _ = audio_to_data(file_path)
+    opus_packets, _ = get_asset_audio(file_path)
     conn.tts.tts_audio_queue.put((SentenceType.LAST, opus_packets, text))
     conn.close_after_chat = True
 
@@ -114,7 +122,7 @@ async def check_bind_device(conn):
 
         # プロンプト音を再生
         music_path = "config/assets/bind_code.wav"
-        opus_packets, _ = audio_to_data(music_path)
+        opus_packets, _ = get_asset_audio(music_path)
         conn.tts.tts_audio_queue.put((SentenceType.FIRST, opus_packets, text))
 
         # 数字を1つずつ再生
@@ -122,7 +130,7 @@ async def check_bind_device(conn):
             try:
                 digit = conn.bind_code[i]
                 num_path = f"config/assets/bind_code/{digit}.wav"
-                num_packets, _ = audio_to_data(num_path)
+                num_packets, _ = get_asset_audio(num_path)
                 conn.tts.tts_audio_queue.put((SentenceType.MIDDLE, num_packets, None))
             except Exception as e:
                 conn.logger.bind(tag=TAG).error(f"数字の音声の再生に失敗しました: {e}")
@@ -132,5 +140,5 @@ async def check_bind_device(conn):
         text = "このデバイスのバージョン情報が見つかりませんでした。OTAアドレスを正しく設定してから、ファームウェアを再コンパイルしてください。"
         await send_stt_message(conn, text)
         music_path = "config/assets/bind_not_found.wav"
-        opus_packets, _ = audio_to_data(music_path)
+        opus_packets, _ = get_asset_audio(music_path)
         conn.tts.tts_audio_queue.put((SentenceType.LAST, opus_packets, text))
\ No newline at end of file
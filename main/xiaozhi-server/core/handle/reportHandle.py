@@ -61,7 +61,8 @@ def opus_to_wav(conn, opus_data):
 
     for opus_packet in opus_data:
         try:
-            pcm_frame = decoder.decode(opus_packet, 960)  # 960サンプル = 60ms
+            # p3ファイルから再生したフレームはmemoryviewのため、bytesに変換してからデコードします
+            pcm_frame = decoder.decode(bytes(opus_packet), 960)  # 960サンプル = 60ms
             pcm_data.append(pcm_frame)
         except opuslib_next.OpusError as e:
             conn.logger.bind(tag=TAG).error(f"Opusデコードエラー: {e}", exc_info=True)
@@ -3,6 +3,7 @@ import asyncio
 import time
 from core.providers.tts.dto.dto import SentenceType
 from core.utils.util import get_string_no_punctuation_or_emoji, analyze_emotion
+from core.utils.asset_cache import get_asset_audio
 from loguru import logger
 
 TAG = __name__
@@ -121,7 +122,7 @@ async def send_tts_message(conn, state, text=None):
             stop_tts_notify_voice = conn.config.get(
                 "stop_tts_notify_voice", "config/assets/tts_notify.mp3"
             )
-            audios, _ = conn.tts.audio_to_opus_data(stop_tts_notify_voice)
+            audios, _ = get_asset_audio(stop_tts_notify_voice)
             await sendAudio(conn, audios)
         # サーバーサイドの話す状態をクリア
         conn.clearSpeakStatus()
@@ -142,4 +143,21 @@ async def send_stt_message(conn, text):
         json.dumps({"type": "stt", "text": stt_text, "session_id": conn.session_id})
     )
     conn.client_is_speaking = True
-    await send_tts_message(conn, "start")
\ No newline at end of file
+    await send_tts_message(conn, "start")
+
+
+async def send_stt_partial_message(conn, text):
+    """発話中の途中認識結果を送信（state: partial、確定結果はsend_stt_messageで送信）"""
+    stt_text = get_string_no_punctuation_or_emoji(text)
+    if not stt_text:
+        return
+    await conn.websocket.send(
+        json.dumps(
+            {
+                "type": "stt",
+                "state": "partial",
+                "text": stt_text,
+                "session_id": conn.session_id,
+            }
+        )
+    )
\ No newline at end of file
@@ -51,11 +51,8 @@ class ASRProvider(ASRProviderBase):
                 pcm_data = self.decode_opus(opus_data)
             combined_pcm_data = b"".join(pcm_data)
 
-            # 判断是否保存为WAV文件
-            if self.delete_audio_file:
-                pass
-            else:
-                self.save_audio_to_file(pcm_data, session_id)
+            # 审计录音在后台保存，不阻塞识别
+            self.record_audio(pcm_data, session_id)
 
             start_time = time.time()
             # 识别本地文件
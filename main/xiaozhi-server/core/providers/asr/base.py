@@ -1,23 +1,34 @@
 import os
+import json
 import wave
-import copy
 import uuid
 import queue
 import asyncio
 import traceback
 import threading
 import opuslib_next
+import numpy as np
 from abc import ABC, abstractmethod
 from config.logger import setup_logging
 from typing import Optional, Tuple, List
 from core.handle.receiveAudioHandle import startToChat
 from core.handle.reportHandle import enqueue_asr_report
+from core.utils import metrics
+from core.utils.audio_recorder import get_audio_recorder
 from core.utils.util import remove_punctuation_and_length
+from core.utils.pipeline import PIPELINE_MODE_ASYNCIO
+from core.utils.inference_pool import InferencePool, BatchScheduler
+from core.utils.session_pool import WarmSessionPool, get_session_pool
+from core.utils.speculation import SpeculativeTurn
 from core.handle.receiveAudioHandle import handleAudioMessage
 
 TAG = __name__
 logger = setup_logging()
 
+# 音声開始前に保持するコンテキストのパケット数（1パケット = 960サンプル = 60ms）
+ASR_PREROLL_PACKETS = 10
+OPUS_FRAME_SAMPLES = 960
+
 
 class ASRProviderBase(ABC):
     def __init__(self):
@@ -27,6 +38,12 @@ class ASRProviderBase(ABC):
     # ここではデフォルトで非ストリーミング方式で処理します
     # ストリーミング方式で処理する場合は、サブクラスでオーバーライドしてください
     async def open_audio_channels(self, conn):
+        if conn.pipeline_mode == PIPELINE_MODE_ASYNCIO:
+            # asyncioモードではスレッドの代わりにタスクで処理
+            conn.pipeline_tasks.append(
+                asyncio.create_task(self.asr_text_priority_task(conn))
+            )
+            return
         # tts消化スレッド
         conn.asr_priority_thread = threading.Thread(
             target=self.asr_text_priority_thread, args=(conn,), daemon=True
@@ -51,6 +68,17 @@ class ASRProviderBase(ABC):
                 )
                 continue
 
+    # ASRオーディオを順序どおりに処理（asyncioモード）
+    async def asr_text_priority_task(self, conn):
+        while not conn.stop_event.is_set():
+            message = await conn.asr_audio_queue.get()
+            try:
+                await handleAudioMessage(conn, message)
+            except Exception as e:
+                logger.bind(tag=TAG).error(
+                    f"ASRテキストの処理に失敗しました: {str(e)}, タイプ: {type(e).__name__}, スタックトレース: {traceback.format_exc()}"
+                )
+
     # オーディオを受信
     # ここではデフォルトで非ストリーミング方式で処理します
     # ストリーミング方式で処理する場合は、サブクラスでオーバーライドしてください
@@ -62,40 +90,207 @@ class ASRProviderBase(ABC):
         # 今回音声がなく、このセグメントにも音声がない場合は、音声を破棄します
         conn.asr_audio.append(audio)
         if have_voice == False and conn.client_have_voice == False:
-            conn.asr_audio = conn.asr_audio[-10:]
+            conn.asr_audio = conn.asr_audio[-ASR_PREROLL_PACKETS:]
+            conn.pcm_buffer.keep_last(ASR_PREROLL_PACKETS * OPUS_FRAME_SAMPLES)
             return
 
         # このセグメントに音声があり、すでに停止している場合
         if conn.client_voice_stop:
-            asr_audio_task = copy.deepcopy(conn.asr_audio)
-            conn.asr_audio.clear()
+            # Opusパケットはレポート用にそのまま引き渡し、ASRにはデコード済みのPCMをコピーせずに渡します
+            asr_audio_task = conn.asr_audio
+            conn.asr_audio = []
+            pcm_data = self.take_speech_pcm(conn)
 
             # オーディオが短すぎて認識できません
             conn.reset_vad_states()
             if len(asr_audio_task) > 15:
-                await self.handle_voice_stop(conn, asr_audio_task)
+                await self.handle_voice_stop(conn, asr_audio_task, pcm_data)
+            else:
+                conn.cancel_speculation()
+        elif conn.client_voice_pause and conn.client_listen_mode != "manual":
+            # 短い無音：発話終了の確定を待たずに認識と対話を先行して開始します
+            if conn.speculation is None and len(conn.asr_audio) > 15:
+                self.start_speculation(conn)
+        elif conn.speculation is not None:
+            # ユーザーが話し続けたため推測を破棄します
+            conn.cancel_speculation()
+
+    def start_speculation(self, conn):
+        """ここまでの音声で推測認識を開始し、結果が得られればLLMへのリクエストも開始します"""
+        start, end = self.get_speech_bounds(conn)
+        pcm_data = conn.pcm_buffer.read(start, end)
+        speculation = SpeculativeTurn()
+        speculation.asr_task = asyncio.create_task(
+            self._speculate(conn, speculation, pcm_data)
+        )
+        conn.speculation = speculation
+
+    def get_speech_bounds(self, conn) -> Tuple[int, int]:
+        """VADが判定した音声区間から、余白を残して前後の無音を除いた範囲を返します"""
+        start, end = conn.pcm_buffer.start, conn.pcm_buffer.end
+        speech_range = conn.vad.get_speech_range(conn) if conn.vad else None
+        if speech_range is None:
+            return start, end
+        speech_start = max(start, speech_range[0])
+        speech_end = min(end, speech_range[1])
+        if speech_end <= speech_start:
+            return start, end
+        return speech_start, speech_end
+
+    def take_speech_pcm(self, conn) -> memoryview:
+        """PCMバッファから音声区間を取り出してバッファを空にします（データはコピーしません）"""
+        buffer_start, buffer_end = conn.pcm_buffer.start, conn.pcm_buffer.end
+        start, end = self.get_speech_bounds(conn)
+        pcm_data = conn.pcm_buffer.detach()
+        trimmed = (buffer_end - buffer_start) - (end - start)
+        if trimmed > 0:
+            metrics.inc_counter("asr.trimmed_seconds", trimmed / 16000)
+        metrics.inc_counter("asr.input_seconds", (end - start) / 16000)
+        return pcm_data[(start - buffer_start) * 2 : (end - buffer_start) * 2]
+
+    async def _speculate(self, conn, speculation, pcm_data) -> Optional[str]:
+        raw_text, _ = await self.speech_to_text([pcm_data], conn.session_id, "pcm")
+        text_len, _ = remove_punctuation_and_length(raw_text)
+        if text_len > 0 and not speculation.cancelled and not conn.need_bind:
+            speculation.query = raw_text
+            conn.executor.submit(conn.chat, raw_text, speculation=speculation)
+        return raw_text
 
     # 音声停止を処理
-    async def handle_voice_stop(self, conn, asr_audio_task):
-        raw_text, _ = await self.speech_to_text(
-            asr_audio_task, conn.session_id, conn.audio_format
-        )  # ASRモジュールが元のテキストを返すことを確認
+    async def handle_voice_stop(self, conn, asr_audio_task, pcm_data=None):
+        # 推測認識が完了していれば、その後の無音は認識結果に影響しないため結果をそのまま使用します
+        speculation = conn.speculation
+        conn.speculation = None
+        raw_text = None
+        if speculation is not None:
+            try:
+                raw_text = await speculation.asr_task
+            except Exception as e:
+                conn.logger.bind(tag=TAG).warning(f"推測認識に失敗しました: {e}")
+        if raw_text is None:
+            if pcm_data is not None and len(pcm_data) > 0:
+                # VADでデコード済みのPCMを使用し、再デコードを省略します
+                raw_text, _ = await self.speech_to_text(
+                    [pcm_data], conn.session_id, "pcm"
+                )
+            else:
+                raw_text, _ = await self.speech_to_text(
+                    asr_audio_task, conn.session_id, conn.audio_format
+                )  # ASRモジュールが元のテキストを返すことを確認
         conn.logger.bind(tag=TAG).info(f"認識テキスト: {raw_text}")
         text_len, _ = remove_punctuation_and_length(raw_text)
         self.stop_ws_connection()
-        if text_len > 0:
-            # カスタムモジュールを使用してレポート
-            await startToChat(conn, raw_text)
-            enqueue_asr_report(conn, raw_text, asr_audio_task)
+        try:
+            if text_len > 0:
+                # カスタムモジュールを使用してレポート
+                await startToChat(conn, raw_text, speculation)
+                enqueue_asr_report(conn, raw_text, asr_audio_task)
+        finally:
+            # 確定されなかった推測（意図処理で完結した場合など）は破棄します
+            if speculation is not None:
+                speculation.cancel()
 
     def stop_ws_connection(self):
         pass
 
-    def save_audio_to_file(self, pcm_data: List[bytes], session_id: str) -> str:
-        """PCMデータをWAVファイルとして保存"""
+    def create_inference_pool(self, config: dict, model, create_model=None) -> InferencePool:
+        """ローカルモデル用の推論サービスを作成
+
+        replicasが2以上の場合はcreate_modelで追加のモデルレプリカを生成します
+        """
+        replicas = int(config.get("replicas") or 1)
+        models = [model]
+        if create_model is not None:
+            models += [create_model() for _ in range(replicas - 1)]
+        module_name = self.__class__.__module__.split(".")[-1]
+        return InferencePool(
+            f"asr.{module_name}",
+            models,
+            max_queue_size=int(config.get("max_queue_size") or 32),
+            timeout=float(config.get("inference_timeout") or 30),
+        )
+
+    def create_batch_scheduler(self, config: dict, batch_func) -> Optional[BatchScheduler]:
+        """推論サービスの前段にマイクロバッチスケジューラを作成
+
+        batch_window_msが0、またはmax_batch_sizeが1以下の場合はバッチ処理を行わずNoneを返します
+        """
+        window_ms = float(config.get("batch_window_ms") or 0)
+        max_batch_size = int(config.get("max_batch_size") or 1)
+        if window_ms <= 0 or max_batch_size <= 1:
+            return None
+        return BatchScheduler(
+            self.inference_pool,
+            batch_func,
+            window_ms=window_ms,
+            max_batch_size=max_batch_size,
+            max_batch_cost=float(config.get("max_batch_seconds") or 60),
+        )
+
+    def create_session_pool(
+        self,
+        config: dict,
+        create,
+        close,
+        is_alive=None,
+        default_sessions: int = 0,
+        default_max_idle: float = 10,
+    ) -> WarmSessionPool:
+        """ストリーミングサービス用の事前接続済みセッションプールを取得
+
+        同じ設定の接続はプロセス内で1つのプールを共有します。
+        warm_sessionsが0の場合は事前接続を行わず、取得時に接続します。
+        未設定時の値はプロバイダーごとに指定します：課金・認証のあるサービスは
+        既定で事前接続せず、warm_session_max_idleはサーバー側のアイドル切断時間に合わせます
+        """
+        module_name = self.__class__.__module__.split(".")[-1]
+        key = (module_name, json.dumps(config, sort_keys=True, default=str))
+        return get_session_pool(
+            key,
+            f"asr.{module_name}.session_pool",
+            create,
+            close,
+            is_alive,
+            size=int(config.get("warm_sessions", default_sessions) or 0),
+            max_idle=float(config.get("warm_session_max_idle") or default_max_idle),
+        )
+
+    async def close(self):
+        """リソースクリーンアップメソッド"""
+        pass
+
+    def _audio_file_path(self, session_id: str) -> str:
         module_name = __name__.split(".")[-1]
         file_name = f"asr_{module_name}_{session_id}_{uuid.uuid4()}.wav"
-        file_path = os.path.join(self.output_dir, file_name)
+        return os.path.join(self.output_dir, file_name)
+
+    def record_audio(self, pcm_data: List[bytes], session_id: str) -> Optional[str]:
+        """監査用に音声をバックグラウンドでWAVファイルとして保存し、保存先のパスを返します
+
+        delete_audio_fileが有効な場合は保存せずNoneを返します。
+        ディスクへの書き込みは認識処理と並行して行われ、認識を待たせません
+        """
+        if getattr(self, "delete_audio_file", True) or not self.output_dir:
+            return None
+        file_path = self._audio_file_path(session_id)
+        if not get_audio_recorder().submit(file_path, list(pcm_data)):
+            return None
+        return file_path
+
+    @staticmethod
+    def pcm_to_float32(pcm_data: List[bytes]) -> np.ndarray:
+        """16ビットPCMを[-1, 1)に正規化したfloat32配列に変換（ファイルを経由しません）"""
+        if len(pcm_data) == 1:
+            samples = np.frombuffer(pcm_data[0], dtype=np.int16)
+        else:
+            samples = np.frombuffer(b"".join(pcm_data), dtype=np.int16)
+        audio = samples.astype(np.float32)
+        audio *= 1.0 / 32768.0
+        return audio
+
+    def save_audio_to_file(self, pcm_data: List[bytes], session_id: str) -> str:
+        """PCMデータをWAVファイルとして保存"""
+        file_path = self._audio_file_path(session_id)
 
         with wave.open(file_path, "wb") as wf:
             wf.setnchannels(1)
@@ -4,6 +4,7 @@ import uuid
 import asyncio
 import websockets
 import opuslib_next
+from websockets.protocol import State
 from core.providers.asr.base import ASRProviderBase
 from config.logger import setup_logging
 from core.providers.asr.dto.dto import InterfaceType
@@ -11,6 +12,9 @@ from core.providers.asr.dto.dto import InterfaceType
 TAG = __name__
 logger = setup_logging()
 
+# 服务端在初始化请求后约10秒收不到音频即断开连接，预建的连接需在此之前重建
+DOUBAO_IDLE_TIMEOUT = 10
+
 
 class ASRProvider(ASRProviderBase):
     def __init__(self, config, delete_audio_file):
@@ -23,6 +27,7 @@ class ASRProvider(ASRProviderBase):
         self.decoder = opuslib_next.Decoder(16000, 1)
         self.asr_ws = None
         self.forward_task = None
+        self.session_pool = None
         self.is_processing = False  # 添加处理状态标志
 
         # 配置参数
@@ -52,56 +57,83 @@ class ASRProvider(ASRProviderBase):
 
     async def open_audio_channels(self, conn):
         await super().open_audio_channels(conn)
+        # 预先建立并初始化ASR连接，检测到语音时直接使用
+        # 认证并计费的服务，默认不预建连接，需要时在配置中设置warm_sessions开启
+        self.session_pool = self.create_session_pool(
+            self.config,
+            self._create_session,
+            self._close_session,
+            self._is_session_open,
+            default_sessions=0,
+            default_max_idle=DOUBAO_IDLE_TIMEOUT,
+        )
+        self.session_pool.attach()
+
+    async def _create_session(self):
+        """建立ASR服务连接并完成初始化请求"""
+        headers = self.token_auth() if self.auth_method == "token" else None
+        logger.bind(tag=TAG).info(f"正在连接ASR服务，headers: {headers}")
+
+        asr_ws = await websockets.connect(
+            self.ws_url,
+            additional_headers=headers,
+            max_size=1000000000,
+            ping_interval=None,
+            ping_timeout=None,
+            close_timeout=10,
+        )
+
+        # 发送初始化请求
+        request_params = self.construct_request(str(uuid.uuid4()))
+        try:
+            payload_bytes = str.encode(json.dumps(request_params))
+            payload_bytes = gzip.compress(payload_bytes)
+            full_client_request = self.generate_header()
+            full_client_request.extend((len(payload_bytes)).to_bytes(4, "big"))
+            full_client_request.extend(payload_bytes)
+
+            logger.bind(tag=TAG).info(f"发送初始化请求: {request_params}")
+            await asr_ws.send(full_client_request)
+
+            # 等待初始化响应
+            init_res = await asr_ws.recv()
+            result = self.parse_response(init_res)
+            logger.bind(tag=TAG).info(f"收到初始化响应: {result}")
+
+            # 检查初始化响应
+            if "code" in result and result["code"] != 1000:
+                error_msg = f"ASR服务初始化失败: {result.get('payload_msg', {}).get('error', '未知错误')}"
+                logger.bind(tag=TAG).error(error_msg)
+                raise Exception(error_msg)
+
+        except Exception as e:
+            logger.bind(tag=TAG).error(f"发送初始化请求失败: {str(e)}")
+            if hasattr(e, "__cause__") and e.__cause__:
+                logger.bind(tag=TAG).error(f"错误原因: {str(e.__cause__)}")
+            await asr_ws.close()
+            raise e
+        return asr_ws
+
+    @staticmethod
+    async def _close_session(asr_ws):
+        await asr_ws.close()
+
+    @staticmethod
+    def _is_session_open(asr_ws):
+        return asr_ws.state is State.OPEN
 
     async def receive_audio(self, conn, audio, audio_have_voice):
         conn.asr_audio.append(audio)
         conn.asr_audio = conn.asr_audio[-10:]
+        # 流式识别直接发送Opus数据，不需要保留VAD解码出的PCM
+        conn.pcm_buffer.clear()
 
         # 如果本次有声音，且之前没有建立连接
         if audio_have_voice and self.asr_ws is None and not self.is_processing:
             try:
                 self.is_processing = True
-                # 建立新的WebSocket连接
-                headers = self.token_auth() if self.auth_method == "token" else None
-                logger.bind(tag=TAG).info(f"正在连接ASR服务，headers: {headers}")
-
-                self.asr_ws = await websockets.connect(
-                    self.ws_url,
-                    additional_headers=headers,
-                    max_size=1000000000,
-                    ping_interval=None,
-                    ping_timeout=None,
-                    close_timeout=10,
-                )
-
-                # 发送初始化请求
-                request_params = self.construct_request(str(uuid.uuid4()))
-                try:
-                    payload_bytes = str.encode(json.dumps(request_params))
-                    payload_bytes = gzip.compress(payload_bytes)
-                    full_client_request = self.generate_header()
-                    full_client_request.extend((len(payload_bytes)).to_bytes(4, "big"))
-                    full_client_request.extend(payload_bytes)
-
-                    logger.bind(tag=TAG).info(f"发送初始化请求: {request_params}")
-                    await self.asr_ws.send(full_client_request)
-
-                    # 等待初始化响应
-                    init_res = await self.asr_ws.recv()
-                    result = self.parse_response(init_res)
-                    logger.bind(tag=TAG).info(f"收到初始化响应: {result}")
-
-                    # 检查初始化响应
-                    if "code" in result and result["code"] != 1000:
-                        error_msg = f"ASR服务初始化失败: {result.get('payload_msg', {}).get('error', '未知错误')}"
-                        logger.bind(tag=TAG).error(error_msg)
-                        raise Exception(error_msg)
-
-                except Exception as e:
-                    logger.bind(tag=TAG).error(f"发送初始化请求失败: {str(e)}")
-                    if hasattr(e, "__cause__") and e.__cause__:
-                        logger.bind(tag=TAG).error(f"错误原因: {str(e.__cause__)}")
-                    raise e
+                # 取出预先初始化好的连接（没有时立即建立）
+                self.asr_ws = await self.session_pool.acquire()
 
                 # 启动接收ASR结果的异步任务
                 self.forward_task = asyncio.create_task(self._forward_asr_results(conn))
@@ -349,3 +381,6 @@ class ASRProvider(ASRProviderBase):
                 pass
             self.forward_task = None
         self.is_processing = False
+        if self.session_pool is not None:
+            await self.session_pool.detach()
+            self.session_pool = None
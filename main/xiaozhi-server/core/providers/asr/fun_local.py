@@ -8,15 +8,13 @@ from typing import Optional, Tuple, List
 from core.providers.asr.base import ASRProviderBase
 from funasr import AutoModel
 from funasr.utils.postprocess_utils import rich_transcription_postprocess
-import shutil
 from core.providers.asr.dto.dto import InterfaceType
+from core.utils.runtime import get_torch_threads
+import numpy as np
 
 TAG = __name__
 logger = setup_logging()
 
-MAX_RETRIES = 2
-RETRY_DELAY = 1  # 重试延迟（秒）
-
 
 # 捕获标准输出
 class CaptureOutput:
@@ -49,86 +47,83 @@ class ASRProvider(ASRProviderBase):
         self.model_dir = config.get("model_dir")
         self.output_dir = config.get("output_dir")  # 修正配置键名
         self.delete_audio_file = delete_audio_file
+        # FunASR在加载模型时按ncpu设置torch线程数（进程级）：num_threads优先，其次为runtime的torch线程数，默认4
+        self.num_threads = get_torch_threads(config.get("num_threads"), 4)
 
         # 确保输出目录存在
         os.makedirs(self.output_dir, exist_ok=True)
+        self.model = self._create_model()
+        # 推理在独立的工作线程中执行，避免阻塞事件循环
+        self.inference_pool = self.create_inference_pool(
+            config, self.model, self._create_model
+        )
+        # 多个设备同时说完时合并为一次批量推理
+        self.batch_scheduler = self.create_batch_scheduler(
+            config, self._generate_batch
+        )
+
+    def _create_model(self):
         with CaptureOutput():
-            self.model = AutoModel(
+            return AutoModel(
                 model=self.model_dir,
                 vad_kwargs={"max_single_segment_time": 30000},
                 disable_update=True,
                 hub="hf",
+                ncpu=self.num_threads,
                 # device="cuda:0",  # 启用GPU加速
             )
 
+    @staticmethod
+    def _generate(model, audio: np.ndarray) -> str:
+        result = model.generate(
+            input=audio,
+            cache={},
+            language="auto",
+            use_itn=True,
+            batch_size_s=60,
+        )
+        return rich_transcription_postprocess(result[0]["text"])
+
+    @staticmethod
+    def _generate_batch(model, audio_batch: List[np.ndarray]) -> List[str]:
+        results = model.generate(
+            input=audio_batch,
+            cache={},
+            language="auto",
+            use_itn=True,
+            batch_size=len(audio_batch),
+            batch_size_s=60,
+        )
+        return [rich_transcription_postprocess(result["text"]) for result in results]
+
     async def speech_to_text(
         self, opus_data: List[bytes], session_id: str, audio_format="opus"
     ) -> Tuple[Optional[str], Optional[str]]:
         """语音转文本主处理逻辑"""
         file_path = None
-        retry_count = 0
-
-        while retry_count < MAX_RETRIES:
-            try:
-                # 合并所有opus数据包
-                if audio_format == "pcm":
-                    pcm_data = opus_data
-                else:
-                    pcm_data = self.decode_opus(opus_data)
-
-                combined_pcm_data = b"".join(pcm_data)
-
-                # 检查磁盘空间
-                if not self.delete_audio_file:
-                    free_space = shutil.disk_usage(self.output_dir).free
-                    if free_space < len(combined_pcm_data) * 2:  # 预留2倍空间
-                        raise OSError("磁盘空间不足")
-
-                # 判断是否保存为WAV文件
-                if self.delete_audio_file:
-                    pass
-                else:
-                    file_path = self.save_audio_to_file(pcm_data, session_id)
-
-                # 语音识别
-                start_time = time.time()
-                result = self.model.generate(
-                    input=combined_pcm_data,
-                    cache={},
-                    language="auto",
-                    use_itn=True,
-                    batch_size_s=60,
-                )
-                text = rich_transcription_postprocess(result[0]["text"])
-                logger.bind(tag=TAG).debug(
-                    f"语音识别耗时: {time.time() - start_time:.3f}s | 结果: {text}"
-                )
-
-                return text, file_path
-
-            except OSError as e:
-                retry_count += 1
-                if retry_count >= MAX_RETRIES:
-                    logger.bind(tag=TAG).error(
-                        f"语音识别失败（已重试{retry_count}次）: {e}", exc_info=True
-                    )
-                    return "", file_path
-                logger.bind(tag=TAG).warning(
-                    f"语音识别失败，正在重试（{retry_count}/{MAX_RETRIES}）: {e}"
-                )
-                time.sleep(RETRY_DELAY)
-
-            except Exception as e:
-                logger.bind(tag=TAG).error(f"语音识别失败: {e}", exc_info=True)
-                return "", file_path
-
-            finally:
-                # 文件清理逻辑
-                if self.delete_audio_file and file_path and os.path.exists(file_path):
-                    try:
-                        os.remove(file_path)
-                        logger.bind(tag=TAG).debug(f"已删除临时音频文件: {file_path}")
-                    except Exception as e:
-                        logger.bind(tag=TAG).error(
-                            f"文件删除失败: {file_path} | 错误: {e}"
-                        )
+        try:
+            # 合并所有opus数据包
+            if audio_format == "pcm":
+                pcm_data = opus_data
+            else:
+                pcm_data = self.decode_opus(opus_data)
+
+            # 审计录音在后台保存，识别直接使用内存中的PCM
+            file_path = self.record_audio(pcm_data, session_id)
+            audio = self.pcm_to_float32(pcm_data)
+
+            # 语音识别
+            start_time = time.time()
+            if self.batch_scheduler:
+                text = await self.batch_scheduler.run(audio, cost=len(audio) / 16000)
+            else:
+                text = await self.inference_pool.run(self._generate, audio)
+            logger.bind(tag=TAG).debug(
+                f"语音识别耗时: {time.time() - start_time:.3f}s | 结果: {text}"
+            )
+
+            return text, file_path
+
+        except Exception as e:
+            logger.bind(tag=TAG).error(f"语音识别失败: {e}", exc_info=True)
+            return "", file_path
@@ -4,6 +4,7 @@ from core.providers.asr.dto.dto import InterfaceType
 import ssl
 import json
 import websockets
+from websockets.protocol import State
 from config.logger import setup_logging
 import asyncio
 import re
@@ -11,6 +12,9 @@ import re
 TAG = __name__
 logger = setup_logging()
 
+# Seconds before an idle warm connection is replaced; the FunASR server itself never times out
+FUNASR_IDLE_RECYCLE = 600
+
 
 class ASRProvider(ASRProviderBase):
     def __init__(self, config: dict, delete_audio_file: bool):
@@ -21,6 +25,8 @@ class ASRProvider(ASRProviderBase):
         """
         super().__init__()
         self.interface_type = InterfaceType.NON_STREAM
+        self.config = config
+        self.session_pool = None
         self.host = config.get("host", "localhost")
         self.port = config.get("port", 10095)
         self.api_key = config.get("api_key", "none")
@@ -41,6 +47,49 @@ class ASRProvider(ASRProviderBase):
             self.ssl_context.check_hostname = False
             self.ssl_context.verify_mode = ssl.CERT_NONE
 
+    async def open_audio_channels(self, conn):
+        await super().open_audio_channels(conn)
+        # Keep pre-opened connections so the handshake is not on the critical path
+        # A self-hosted server is not billed, so one warm connection is kept by default
+        self.session_pool = self.create_session_pool(
+            self.config,
+            self._create_session,
+            self._close_session,
+            self._is_session_open,
+            default_sessions=1,
+            default_max_idle=FUNASR_IDLE_RECYCLE,
+        )
+        self.session_pool.attach()
+
+    async def _create_session(self):
+        """
+        Open a new WebSocket connection to the FunASR server.
+        """
+        auth_header = {"Authorization": "Bearer; {}".format(self.api_key)}
+        return await websockets.connect(
+            self.uri,
+            additional_headers=auth_header,
+            subprotocols=["binary"],
+            ping_interval=None,
+            ssl=self.ssl_context,
+        )
+
+    @staticmethod
+    async def _close_session(ws):
+        await ws.close()
+
+    @staticmethod
+    def _is_session_open(ws):
+        return ws.state is State.OPEN
+
+    async def close(self):
+        """
+        Release the shared session pool.
+        """
+        if self.session_pool is not None:
+            await self.session_pool.detach()
+            self.session_pool = None
+
     async def _receive_responses(self, ws) -> None:
         """
         Asynchronous generator to receive messages from the WebSocket.
@@ -115,19 +164,13 @@ class ASRProvider(ASRProviderBase):
             pcm_data = self.decode_opus(opus_data)
         combined_pcm_data = b"".join(pcm_data)
 
-        # 判断是否保存为WAV文件
-        if self.delete_audio_file:
-            pass
+        # 审计录音在后台保存，不阻塞识别
+        file_path = self.record_audio(pcm_data, session_id)
+        if self.session_pool is not None:
+            ws = await self.session_pool.acquire()
         else:
-            file_path = self.save_audio_to_file(pcm_data, session_id)
-        auth_header = {"Authorization": "Bearer; {}".format(self.api_key)}
-        async with websockets.connect(
-            self.uri,
-            additional_headers=auth_header,
-            subprotocols=["binary"],
-            ping_interval=None,
-            ssl=self.ssl_context,
-        ) as ws:
+            ws = await self._create_session()
+        async with ws:
             try:
                 # Use asyncio to handle WebSocket communication
                 send_task = asyncio.create_task(
@@ -1,6 +1,3 @@
-import os
-import io
-import wave
 from google.cloud import speech
 from core.providers.asr.base import ASRProviderBase
 from config.logger import setup_logging
@@ -30,14 +27,11 @@ class ASRProvider(ASRProviderBase):
             # PCMデータを結合
             combined_pcm_data = b"".join(pcm_data)
 
-            # WAVファイルとして保存
-            file_path = self.save_audio_to_file(pcm_data, session_id)
+            # 監査用の録音はバックグラウンドで保存
+            file_path = self.record_audio(pcm_data, session_id)
 
-            # 音声データをGoogle Cloud Speech-to-Text APIに送信
-            with io.open(file_path, "rb") as audio_file:
-                content = audio_file.read()
-
-            audio = speech.RecognitionAudio(content=content)
+            # ファイルを経由せず、PCMデータをGoogle Cloud Speech-to-Text APIに直接送信
+            audio = speech.RecognitionAudio(content=combined_pcm_data)
             config = speech.RecognitionConfig(
                 encoding=speech.RecognitionConfig.AudioEncoding.LINEAR16,
                 sample_rate_hertz=16000,
@@ -52,10 +46,6 @@ class ASRProvider(ASRProviderBase):
             if response.results:
                 transcript = response.results[0].alternatives[0].transcript
 
-            # ファイルを削除
-            if self.delete_audio_file and os.path.exists(file_path):
-                os.remove(file_path)
-
             return transcript, file_path
 
         except Exception as e:
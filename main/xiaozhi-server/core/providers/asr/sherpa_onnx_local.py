@@ -1,5 +1,4 @@
 import time
-import wave
 import os
 import sys
 import io
@@ -7,6 +6,7 @@ from config.logger import setup_logging
 from typing import Optional, Tuple, List
 from core.providers.asr.dto.dto import InterfaceType
 from core.providers.asr.base import ASRProviderBase
+from core.utils.runtime import get_num_threads
 
 import numpy as np
 import sherpa_onnx
@@ -41,6 +41,7 @@ class ASRProvider(ASRProviderBase):
         self.model_dir = config.get("model_dir")
         self.output_dir = config.get("output_dir")
         self.delete_audio_file = delete_audio_file
+        self.num_threads = get_num_threads("asr", config.get("num_threads"))
 
         # 确保输出目录存在
         os.makedirs(self.output_dir, exist_ok=True)
@@ -72,11 +73,20 @@ class ASRProvider(ASRProviderBase):
             logger.bind(tag=TAG).error(f"模型文件处理失败: {str(e)}")
             raise
 
+        self.model = self._create_model()
+        # 推理在独立的工作线程中执行，避免阻塞事件循环
+        self.inference_pool = self.create_inference_pool(
+            config, self.model, self._create_model
+        )
+        # 多个设备同时说完时合并为一次批量推理
+        self.batch_scheduler = self.create_batch_scheduler(config, self._decode_batch)
+
+    def _create_model(self):
         with CaptureOutput():
-            self.model = sherpa_onnx.OfflineRecognizer.from_sense_voice(
+            return sherpa_onnx.OfflineRecognizer.from_sense_voice(
                 model=self.model_path,
                 tokens=self.tokens_path,
-                num_threads=2,
+                num_threads=self.num_threads,
                 sample_rate=16000,
                 feature_dim=80,
                 decoding_method="greedy_search",
@@ -84,29 +94,22 @@ class ASRProvider(ASRProviderBase):
                 use_itn=True,
             )
 
-    def read_wave(self, wave_filename: str) -> Tuple[np.ndarray, int]:
-        """
-        Args:
-        wave_filename:
-            Path to a wave file. It should be single channel and each sample should
-            be 16-bit. Its sample rate does not need to be 16kHz.
-        Returns:
-        Return a tuple containing:
-        - A 1-D array of dtype np.float32 containing the samples, which are
-        normalized to the range [-1, 1].
-        - sample rate of the wave file
-        """
-
-        with wave.open(wave_filename) as f:
-            assert f.getnchannels() == 1, f.getnchannels()
-            assert f.getsampwidth() == 2, f.getsampwidth()  # it is in bytes
-            num_samples = f.getnframes()
-            samples = f.readframes(num_samples)
-            samples_int16 = np.frombuffer(samples, dtype=np.int16)
-            samples_float32 = samples_int16.astype(np.float32)
-
-            samples_float32 = samples_float32 / 32768
-            return samples_float32, f.getframerate()
+    @staticmethod
+    def _decode(model, samples: np.ndarray, sample_rate: int) -> str:
+        s = model.create_stream()
+        s.accept_waveform(sample_rate, samples)
+        model.decode_stream(s)
+        return s.result.text
+
+    @staticmethod
+    def _decode_batch(model, waves: List[Tuple[np.ndarray, int]]) -> List[str]:
+        streams = []
+        for samples, sample_rate in waves:
+            s = model.create_stream()
+            s.accept_waveform(sample_rate, samples)
+            streams.append(s)
+        model.decode_streams(streams)
+        return [s.result.text for s in streams]
 
     async def speech_to_text(
         self, opus_data: List[bytes], session_id: str, audio_format="opus"
@@ -114,24 +117,24 @@ class ASRProvider(ASRProviderBase):
         """语音转文本主处理逻辑"""
         file_path = None
         try:
-            # 保存音频文件
-            start_time = time.time()
             if audio_format == "pcm":
                 pcm_data = opus_data
             else:
                 pcm_data = self.decode_opus(opus_data)
-            file_path = self.save_audio_to_file(pcm_data, session_id)
-            logger.bind(tag=TAG).debug(
-                f"音频文件保存耗时: {time.time() - start_time:.3f}s | 路径: {file_path}"
-            )
+            # 审计录音在后台保存，识别直接使用内存中的PCM
+            file_path = self.record_audio(pcm_data, session_id)
 
             # 语音识别
             start_time = time.time()
-            s = self.model.create_stream()
-            samples, sample_rate = self.read_wave(file_path)
-            s.accept_waveform(sample_rate, samples)
-            self.model.decode_stream(s)
-            text = s.result.text
+            samples, sample_rate = self.pcm_to_float32(pcm_data), 16000
+            if self.batch_scheduler:
+                text = await self.batch_scheduler.run(
+                    (samples, sample_rate), cost=len(samples) / sample_rate
+                )
+            else:
+                text = await self.inference_pool.run(
+                    self._decode, samples, sample_rate
+                )
             logger.bind(tag=TAG).debug(
                 f"语音识别耗时: {time.time() - start_time:.3f}s | 结果: {text}"
             )
@@ -141,11 +144,3 @@ class ASRProvider(ASRProviderBase):
         except Exception as e:
             logger.bind(tag=TAG).error(f"语音识别失败: {e}", exc_info=True)
             return "", file_path
-        finally:
-            # 文件清理逻辑
-            if self.delete_audio_file and file_path and os.path.exists(file_path):
-                try:
-                    os.remove(file_path)
-                    logger.bind(tag=TAG).debug(f"已删除临时音频文件: {file_path}")
-                except Exception as e:
-                    logger.bind(tag=TAG).error(f"文件删除失败: {file_path} | 错误: {e}")
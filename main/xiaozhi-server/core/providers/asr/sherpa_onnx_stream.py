@@ -0,0 +1,202 @@
+import os
+import threading
+from config.logger import setup_logging
+from typing import Optional, Tuple, List
+from core.providers.asr.dto.dto import InterfaceType
+from core.providers.asr.base import (
+    ASRProviderBase,
+    ASR_PREROLL_PACKETS,
+    OPUS_FRAME_SAMPLES,
+)
+from core.utils.runtime import get_num_threads
+from core.handle.sendAudioHandle import send_stt_partial_message
+
+import numpy as np
+import sherpa_onnx
+
+TAG = __name__
+logger = setup_logging()
+
+SAMPLE_RATE = 16000
+# 结束输入时补充的静音，让模型输出最后几个字
+TAIL_PADDING = np.zeros(int(SAMPLE_RATE * 0.3), dtype=np.float32)
+
+# 同一模型的识别器、推理服务在所有连接间共享，每个连接只创建自己的解码流
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+class _StreamEngine:
+    def __init__(self, recognizer, inference_pool, batch_scheduler):
+        self.recognizer = recognizer
+        self.inference_pool = inference_pool
+        self.batch_scheduler = batch_scheduler
+
+
+class ASRProvider(ASRProviderBase):
+    """
+    基于sherpa-onnx在线（流式）transducer模型的本地流式识别
+    PCM到达即解码并产生中间结果，由端点检测规则或VAD判定说话结束后立即给出最终结果
+    """
+
+    def __init__(self, config: dict, delete_audio_file: bool):
+        super().__init__()
+        self.interface_type = InterfaceType.STREAM
+        self.config = config
+        self.model_dir = config.get("model_dir")
+        self.output_dir = config.get("output_dir")
+        self.delete_audio_file = delete_audio_file
+
+        self.engine = self._get_engine(config)
+        self.stream = None
+        # 下一个送入解码流的采样点在pcm_buffer中的绝对索引
+        self.read_index = 0
+        self.partial_text = ""
+        self.text = ""
+        # 说话过程中是否把中间识别结果发送给客户端
+        self.send_partial_results = config.get("send_partial_results", True)
+
+    def _get_engine(self, config: dict) -> _StreamEngine:
+        with _engines_lock:
+            engine = _engines.get(self.model_dir)
+            if engine is None:
+                recognizer = self._create_model(config)
+                # 解码在独立的工作线程中执行，多个连接同时到达的数据合并为一次批量解码
+                self.inference_pool = self.create_inference_pool(config, recognizer)
+                batch_scheduler = self.create_batch_scheduler(
+                    config, self._decode_batch
+                )
+                engine = _StreamEngine(
+                    recognizer, self.inference_pool, batch_scheduler
+                )
+                _engines[self.model_dir] = engine
+            return engine
+
+    def _create_model(self, config: dict):
+        model_files = {
+            "encoder": config.get("encoder", "encoder.onnx"),
+            "decoder": config.get("decoder", "decoder.onnx"),
+            "joiner": config.get("joiner", "joiner.onnx"),
+            "tokens": config.get("tokens", "tokens.txt"),
+        }
+        paths = {}
+        for name, file_name in model_files.items():
+            path = os.path.join(self.model_dir, file_name)
+            if not os.path.isfile(path):
+                raise FileNotFoundError(
+                    f"模型文件不存在: {path}，请从sherpa-onnx发布页下载流式transducer模型"
+                )
+            paths[name] = path
+
+        return sherpa_onnx.OnlineRecognizer.from_transducer(
+            tokens=paths["tokens"],
+            encoder=paths["encoder"],
+            decoder=paths["decoder"],
+            joiner=paths["joiner"],
+            num_threads=get_num_threads("asr", config.get("num_threads")),
+            sample_rate=SAMPLE_RATE,
+            feature_dim=80,
+            decoding_method="greedy_search",
+            enable_endpoint_detection=True,
+            rule1_min_trailing_silence=float(
+                config.get("rule1_min_trailing_silence") or 2.4
+            ),
+            rule2_min_trailing_silence=float(
+                config.get("rule2_min_trailing_silence") or 0.8
+            ),
+            rule3_min_utterance_length=float(
+                config.get("rule3_min_utterance_length") or 20
+            ),
+        )
+
+    @staticmethod
+    def _decode(recognizer, stream) -> Tuple[str, bool]:
+        while recognizer.is_ready(stream):
+            recognizer.decode_stream(stream)
+        return recognizer.get_result(stream), recognizer.is_endpoint(stream)
+
+    @staticmethod
+    def _decode_batch(recognizer, streams) -> List[Tuple[str, bool]]:
+        ready = [s for s in streams if recognizer.is_ready(s)]
+        while ready:
+            recognizer.decode_streams(ready)
+            ready = [s for s in ready if recognizer.is_ready(s)]
+        return [(recognizer.get_result(s), recognizer.is_endpoint(s)) for s in streams]
+
+    async def _run_decode(self) -> Tuple[str, bool]:
+        if self.engine.batch_scheduler:
+            return await self.engine.batch_scheduler.run(self.stream)
+        return await self.engine.inference_pool.run(self._decode, self.stream)
+
+    def _feed(self, conn):
+        """把pcm_buffer中新到达的PCM送入解码流，已送入且VAD已读取的数据随即丢弃"""
+        end = conn.pcm_buffer.end
+        start = max(self.read_index, conn.pcm_buffer.start)
+        if end > start:
+            self.stream.accept_waveform(
+                SAMPLE_RATE, conn.pcm_buffer.read_float32(start, end)
+            )
+        self.read_index = end
+        conn.pcm_buffer.discard_before(min(end, conn.vad_read_index))
+
+    async def receive_audio(self, conn, audio, audio_have_voice):
+        if conn.client_listen_mode == "auto" or conn.client_listen_mode == "realtime":
+            have_voice = audio_have_voice
+        else:
+            have_voice = conn.client_have_voice
+        conn.asr_audio.append(audio)
+
+        if self.stream is None:
+            if not have_voice:
+                conn.asr_audio = conn.asr_audio[-ASR_PREROLL_PACKETS:]
+                conn.pcm_buffer.keep_last(ASR_PREROLL_PACKETS * OPUS_FRAME_SAMPLES)
+                return
+            # 开始说话：创建解码流，并从保留的前置音频开始解码
+            self.stream = self.engine.recognizer.create_stream()
+            self.read_index = conn.pcm_buffer.start
+            self.partial_text = ""
+
+        self._feed(conn)
+        if conn.client_voice_stop:
+            # VAD判定说话结束：结束输入，解码剩余数据
+            self.stream.accept_waveform(SAMPLE_RATE, TAIL_PADDING)
+            self.stream.input_finished()
+        try:
+            text, is_endpoint = await self._run_decode()
+        except Exception as e:
+            logger.bind(tag=TAG).error(f"流式语音识别失败: {e}", exc_info=True)
+            text, is_endpoint = "", True
+
+        if text != self.partial_text:
+            self.partial_text = text
+            logger.bind(tag=TAG).debug(f"中间识别结果: {text}")
+            if self.send_partial_results and not (is_endpoint or conn.client_voice_stop):
+                try:
+                    await send_stt_partial_message(conn, text)
+                except Exception as e:
+                    logger.bind(tag=TAG).debug(f"发送中间识别结果失败: {e}")
+
+        if is_endpoint or conn.client_voice_stop:
+            self.text = text
+            self.stream = None
+            self.partial_text = ""
+            asr_audio_task = conn.asr_audio
+            conn.asr_audio = []
+            conn.pcm_buffer.clear()
+            conn.reset_vad_states()
+            if len(asr_audio_task) > 15:
+                await self.handle_voice_stop(conn, asr_audio_task)
+            else:
+                self.text = ""
+
+    async def speech_to_text(
+        self, opus_data: List[bytes], session_id: str, audio_format="opus"
+    ) -> Tuple[Optional[str], Optional[str]]:
+        """返回流式解码得到的最终结果"""
+        result = self.text
+        self.text = ""
+        return result, None
+
+    async def close(self):
+        """资源清理方法"""
+        self.stream = None
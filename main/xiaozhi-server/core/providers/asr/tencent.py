@@ -53,11 +53,8 @@ class ASRProvider(ASRProviderBase):
                 pcm_data = self.decode_opus(opus_data)
             combined_pcm_data = b"".join(pcm_data)
 
-            # 判断是否保存为WAV文件
-            if self.delete_audio_file:
-                pass
-            else:
-                self.save_audio_to_file(pcm_data, session_id)
+            # 审计录音在后台保存，不阻塞识别
+            self.record_audio(pcm_data, session_id)
 
             # 将音频数据转换为Base64编码
             base64_audio = base64.b64encode(combined_pcm_data).decode("utf-8")
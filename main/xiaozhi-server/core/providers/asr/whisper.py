@@ -1,6 +1,6 @@
-import os
 import whisper
 from core.providers.asr.base import ASRProviderBase
+from core.providers.asr.dto.dto import InterfaceType
 from config.logger import setup_logging
 
 TAG = __name__
@@ -10,12 +10,17 @@ logger = setup_logging()
 class ASRProvider(ASRProviderBase):
     def __init__(self, config, delete_audio_file):
         super().__init__()
+        self.interface_type = InterfaceType.LOCAL
         self.model_name = config.get("model_name", "turbo")
         self.language = config.get("language", None)
         self.output_dir = config.get("output_dir", "tmp/")
         self.delete_audio_file = delete_audio_file
         # Whisperモデルのロード
         self.model = whisper.load_model(self.model_name)
+        # 推論は専用のワーカースレッドで実行し、イベントループをブロックしない
+        self.inference_pool = self.create_inference_pool(
+            config, self.model, lambda: whisper.load_model(self.model_name)
+        )
 
     async def speech_to_text(self, opus_data, session_id, audio_format="opus"):
         try:
@@ -25,18 +30,14 @@ class ASRProvider(ASRProviderBase):
             else:
                 pcm_data = opus_data
 
-            # PCMデータを結合
-            combined_pcm_data = b"".join(pcm_data)
+            # 監査用の録音はバックグラウンドで保存
+            file_path = self.record_audio(pcm_data, session_id)
 
-            # WAVファイルとして保存
-            file_path = self.save_audio_to_file(pcm_data, session_id)
-
-            # Whisperを使用して音声をテキストに変換
-            result = self.model.transcribe(file_path, language=self.language)
-
-            # ファイルを削除
-            if self.delete_audio_file and os.path.exists(file_path):
-                os.remove(file_path)
+            # WAVファイルを経由せず、float32配列をWhisperに直接渡す
+            audio = self.pcm_to_float32(pcm_data)
+            result = await self.inference_pool.run(
+                lambda model: model.transcribe(audio, language=self.language)
+            )
 
             return result["text"], file_path
 
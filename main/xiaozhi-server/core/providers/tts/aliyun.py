@@ -3,9 +3,11 @@ import json
 import hmac
 import hashlib
 import base64
+import asyncio
 import requests
 from datetime import datetime
 from core.providers.tts.base import TTSProviderBase
+from core.utils.http_client import get_async_client
 
 import time
 import uuid
@@ -163,7 +165,7 @@ class TTSProvider(TTSProviderBase):
     async def text_to_speak(self, text, output_file):
         if self._is_token_expired():
             logger.warning("Token已过期，正在自动刷新...")
-            self._refresh_token()
+            await asyncio.to_thread(self._refresh_token)
         request_json = {
             "appkey": self.appkey,
             "token": self.token,
@@ -178,13 +180,14 @@ class TTSProvider(TTSProviderBase):
 
         # print(self.api_url, json.dumps(request_json, ensure_ascii=False))
         try:
-            resp = requests.post(
-                self.api_url, json.dumps(request_json), headers=self.header
+            client = get_async_client(self.api_url)
+            resp = await client.post(
+                self.api_url, content=json.dumps(request_json), headers=self.header
             )
             if resp.status_code == 401:  # Token过期特殊处理
-                self._refresh_token()
-                resp = requests.post(
-                    self.api_url, json.dumps(request_json), headers=self.header
+                await asyncio.to_thread(self._refresh_token)
+                resp = await client.post(
+                    self.api_url, content=json.dumps(request_json), headers=self.header
                 )
             # 检查返回请求数据的mime类型是否是audio/***，是则保存到指定路径下；返回的是binary格式的
             if resp.headers["Content-Type"].startswith("audio/"):
@@ -10,8 +10,20 @@ from core.utils import textUtils
 from abc import ABC, abstractmethod
 from config.logger import setup_logging
 from core.utils.util import audio_to_data, audio_bytes_to_data
+from core.utils.audio_stream import StreamingAudioDecoder, prewarm_stream_decoder
+from core.utils.opus_encoder_utils import get_encoder_pool
+from core.utils.sentence_segmenter import SentenceSegmenter
+from core.utils.tts_cache import get_tts_cache, build_cache_identity, build_cache_key
 from core.utils.tts import MarkdownCleaner
+from core.utils.http_client import run_coroutine, iterate_async
 from core.utils.output_counter import add_device_output
+from core.utils.pipeline import (
+    PIPELINE_MODE_ASYNCIO,
+    AsyncBridgeQueue,
+    OrderedOutput,
+    get_shared_executor,
+    get_lookahead_executor,
+)
 from core.handle.reportHandle import enqueue_tts_report
 from core.handle.sendAudioHandle import sendAudioMessage
 from core.providers.tts.dto.dto import (
@@ -40,7 +52,6 @@ class TTSProviderBase(ABC):
         self.tts_audio_first_sentence = True
         self.before_stop_play_files = []
 
-        self.tts_text_buff = []
         self.punctuations = (
             "。",
             "？",
@@ -67,8 +78,28 @@ class TTSProviderBase(ABC):
             "：",
         )
         self.tts_stop_request = False
-        self.processed_chars = 0
-        self.is_first_sentence = True
+        # LLMの出力テキストを逐次分割する分割器（接続時に設定を反映して作り直します）
+        self.segmenter = self._create_segmenter({})
+        # ストリーミング合成で使用するOpusエンコーダーのプール（合成1回ごとに取り出し、終了後に状態をリセットして返却）
+        self.opus_encoder_pool = get_encoder_pool(16000, 1, 60)
+        # 先読み合成：同時に合成するセグメント数（1の場合は1セグメントずつ順番に合成）
+        self.tts_lookahead = 1
+        self.lookahead_semaphore = None
+        # 並行して合成したオーディオを文の順番どおりに再生キューへ入れる重排バッファ
+        self.audio_output = OrderedOutput(self.tts_audio_queue.put)
+        # 合成キャッシュのキーに含める、合成結果に影響する設定
+        self.cache_identity = build_cache_identity(self.__class__.__module__, config)
+
+    def _create_segmenter(self, config):
+        """tts_segment設定に従ってテキスト分割器を作成"""
+        segment_config = config.get("tts_segment") or {}
+        return SentenceSegmenter(
+            self.punctuations,
+            self.first_sentence_punctuations,
+            min_first_length=int(segment_config.get("min_first_length") or 0),
+            max_length=int(segment_config.get("max_length") or 0),
+            flush_after_ms=float(segment_config.get("flush_after_ms") or 0),
+        )
 
     def generate_filename(self, extension=".wav"):
         return os.path.join(
@@ -83,7 +114,7 @@ class TTSProviderBase(ABC):
             # ファイルを直接オーディオデータに変換する必要がある
             while max_repeat_time > 0:
                 try:
-                    audio_bytes = asyncio.run(self.text_to_speak(text, None))
+                    audio_bytes = run_coroutine(self.text_to_speak(text, None))
                     if audio_bytes:
                         audio_datas, _ = audio_bytes_to_data(
                             audio_bytes, file_type=self.audio_file_type, is_opus=True
@@ -110,7 +141,7 @@ class TTSProviderBase(ABC):
             try:
                 while not os.path.exists(tmp_file) and max_repeat_time > 0:
                     try:
-                        asyncio.run(self.text_to_speak(text, tmp_file))
+                        run_coroutine(self.text_to_speak(text, tmp_file))
                     except Exception as e:
                         logger.bind(tag=TAG).warning(
                             f"音声生成に失敗しました{5 - max_repeat_time + 1}回目: {text}、エラー: {e}"
@@ -134,10 +165,156 @@ class TTSProviderBase(ABC):
                 logger.bind(tag=TAG).error(f"TTSファイルの生成に失敗しました: {e}")
                 return None
 
+    # text_to_speakは全接続で共有するバックグラウンドのイベントループで実行されるため、
+    # HTTPリクエストはcore.utils.http_clientの共有クライアントを使用し、ブロッキングする処理は直接呼び出さないでください
     @abstractmethod
     async def text_to_speak(self, text, output_file):
         pass
 
+    # ストリーミング出力に対応するプロバイダーはこのメソッドをオーバーライドし、
+    # エンコード済みオーディオのチャンクを受信順にyieldする非同期ジェネレーターとして実装してください
+    text_to_speak_stream = None
+
+    def supports_stream(self):
+        """チャンク単位のストリーミング合成を利用できるかどうか"""
+        return (
+            self.text_to_speak_stream is not None
+            and self.delete_audio_file
+            and self.conn is not None
+            and self.conn.audio_format != "pcm"
+        )
+
+    def to_tts_stream(self, text, sentence_type=SentenceType.MIDDLE, output=None):
+        """プロバイダーの応答チャンクを逐次デコード・Opusエンコードし、完成したパケットから再生キューに入れます
+
+        Returns:
+            output: オーディオの出力先（省略時は再生キュー）
+            tuple: (1パケット以上キューに入れたかどうか, 最後まで合成できた場合は全パケット、それ以外はNone)
+                   何も出力できずに失敗した場合、呼び出し元は通常の合成にフォールバックします
+        """
+        text = MarkdownCleaner.clean_markdown(text)
+        opus_encoder = self.opus_encoder_pool.acquire()
+        # テキストは最初のパケットと一緒に送信し、以降のパケットはテキストなしで送信します
+        pending_text = [text]
+        all_packets = []
+        if output is None:
+            output = self.tts_audio_queue
+
+        def put_packets(packets):
+            if not packets or self.conn.client_abort:
+                return
+            all_packets.extend(packets)
+            segment_text = pending_text.pop() if pending_text else None
+            output.put((sentence_type, packets, segment_text))
+
+        def on_pcm(pcm):
+            put_packets(opus_encoder.encode_pcm_to_opus(pcm, False))
+
+        decoder = None
+        try:
+            decoder = StreamingAudioDecoder(self.audio_file_type, on_pcm)
+            for chunk in iterate_async(self.text_to_speak_stream(text)):
+                if self.conn.client_abort:
+                    break
+                decoder.feed(chunk)
+            decoder.close()
+            put_packets(opus_encoder.encode_pcm_to_opus(b"", True))
+        except Exception as e:
+            if decoder is not None:
+                decoder.kill()
+            logger.bind(tag=TAG).warning(f"ストリーミング音声生成に失敗しました: {text}、エラー: {e}")
+            return not pending_text, None
+        finally:
+            self.opus_encoder_pool.release(opus_encoder)
+        if self.conn.client_abort:
+            return not pending_text, None
+        return not pending_text, all_packets
+
+    def _synthesize_segment(
+        self, segment_text, sentence_type=SentenceType.MIDDLE, output=None
+    ):
+        """1セグメントのテキストを音声合成し、再生キューに入れます
+
+        同じ設定・同じテキストの合成結果はキャッシュから再利用します
+        output: オーディオの出力先（省略時は再生キュー）
+        """
+        if output is None:
+            output = self.tts_audio_queue
+        cache, cache_key = None, None
+        if self.conn.audio_format != "pcm":
+            cache = get_tts_cache(self.conn.config)
+        if cache is not None:
+            cache_key = build_cache_key(
+                self.cache_identity, getattr(self, "voice", None), segment_text
+            )
+            audio_datas = cache.get(cache_key)
+            if audio_datas:
+                output.put((sentence_type, audio_datas, segment_text))
+                return
+
+        audio_datas = None
+        if self.supports_stream():
+            emitted, audio_datas = self.to_tts_stream(
+                segment_text, sentence_type, output
+            )
+            if emitted:
+                if cache is not None and audio_datas:
+                    cache.put(cache_key, audio_datas)
+                return
+        if self.delete_audio_file:
+            audio_datas = self.to_tts(segment_text)
+        else:
+            tts_file = self.to_tts(segment_text)
+            if tts_file:
+                audio_datas = self._process_audio_file(tts_file)
+        if audio_datas:
+            output.put((sentence_type, audio_datas, segment_text))
+            if cache is not None and not self.conn.client_abort:
+                cache.put(cache_key, audio_datas)
+
+    def _submit_segment(self, segment_text, sentence_type=SentenceType.MIDDLE):
+        """セグメントの合成を開始します
+
+        先読みが有効な場合は共有スレッドプールで並行して合成し、
+        同時に合成中のセグメントがtts_lookaheadに達している間は空きを待ちます。
+        合成結果は重排バッファを通して文の順番どおりに再生キューに入ります
+        """
+        output = self.audio_output
+        if self.tts_lookahead <= 1 or self.lookahead_semaphore is None:
+            slot = output.new_slot()
+            try:
+                self._synthesize_segment(segment_text, sentence_type, slot)
+            finally:
+                slot.close()
+            return
+        while not self.lookahead_semaphore.acquire(timeout=1):
+            if self.conn.stop_event.is_set() or self.conn.client_abort:
+                return
+        slot = output.new_slot()
+
+        def run():
+            try:
+                # 開始前に中断された場合は合成しません
+                if not slot.cancelled and not self.conn.client_abort:
+                    self._synthesize_segment(segment_text, sentence_type, slot)
+            except Exception as e:
+                logger.bind(tag=TAG).error(f"先読み合成に失敗しました: {segment_text}、エラー: {e}")
+            finally:
+                slot.close()
+                self.lookahead_semaphore.release()
+
+        try:
+            get_lookahead_executor(self.conn.config).submit(run)
+        except Exception:
+            slot.close()
+            self.lookahead_semaphore.release()
+            raise
+
+    def cancel_lookahead(self):
+        """合成中・再生待ちのセグメントを破棄します（中断時に呼び出します）"""
+        self.audio_output.cancel()
+        self.audio_output = OrderedOutput(self.tts_audio_queue.put)
+
     def audio_to_pcm_data(self, audio_file_path):
         """オーディオファイルをPCMエンコーディングに変換"""
         return audio_to_data(audio_file_path, is_opus=False)
@@ -191,6 +368,24 @@ class TTSProviderBase(ABC):
     async def open_audio_channels(self, conn):
         self.conn = conn
         self.tts_timeout = conn.config.get("tts_timeout", 10)
+        self.segmenter = self._create_segmenter(conn.config)
+        self.tts_lookahead = max(1, int(conn.config.get("tts_lookahead") or 1))
+        self.lookahead_semaphore = threading.BoundedSemaphore(self.tts_lookahead)
+        if self.text_to_speak_stream is not None:
+            # ストリーミング合成用のffmpegプロセスを出力形式を指定して事前に起動します
+            prewarm_stream_decoder(self.audio_file_type)
+        if conn.pipeline_mode == PIPELINE_MODE_ASYNCIO:
+            # asyncioモードではスレッドの代わりにタスクで処理
+            self.tts_text_queue = AsyncBridgeQueue(conn.loop)
+            self.tts_audio_queue = AsyncBridgeQueue(conn.loop)
+            self.audio_output = OrderedOutput(self.tts_audio_queue.put)
+            conn.pipeline_tasks.append(
+                asyncio.create_task(self.tts_text_priority_task())
+            )
+            conn.pipeline_tasks.append(
+                asyncio.create_task(self._audio_play_priority_task())
+            )
+            return
         # tts消化スレッド
         self.tts_priority_thread = threading.Thread(
             target=self.tts_text_priority_thread, daemon=True
@@ -203,54 +398,11 @@ class TTSProviderBase(ABC):
         )
         self.audio_play_priority_thread.start()
 
-    # ここではデフォルトで非ストリーミング方式で処理します
-    # ストリーミング方式で処理する場合は、サブクラスでオーバーライドしてください
     def tts_text_priority_thread(self):
         while not self.conn.stop_event.is_set():
             try:
                 message = self.tts_text_queue.get(timeout=1)
-                if self.conn.client_abort:
-                    logger.bind(tag=TAG).info("中断情報を受信しました。TTSテキスト処理スレッドを終了します")
-                    continue
-                if message.sentence_type == SentenceType.FIRST:
-                    # パラメータを初期化
-                    self.tts_stop_request = False
-                    self.processed_chars = 0
-                    self.tts_text_buff = []
-                    self.is_first_sentence = True
-                    self.tts_audio_first_sentence = True
-                elif ContentType.TEXT == message.content_type:
-                    self.tts_text_buff.append(message.content_detail)
-                    segment_text = self._get_segment_text()
-                    if segment_text:
-                        if self.delete_audio_file:
-                            audio_datas = self.to_tts(segment_text)
-                            if audio_datas:
-                                self.tts_audio_queue.put(
-                                    (message.sentence_type, audio_datas, segment_text)
-                                )
-                        else:
-                            tts_file = self.to_tts(segment_text)
-                            if tts_file:
-                                audio_datas = self._process_audio_file(tts_file)
-                                self.tts_audio_queue.put(
-                                    (message.sentence_type, audio_datas, segment_text)
-                                )
-                elif ContentType.FILE == message.content_type:
-                    self._process_remaining_text()
-                    tts_file = message.content_file
-                    if tts_file and os.path.exists(tts_file):
-                        audio_datas = self._process_audio_file(tts_file)
-                        self.tts_audio_queue.put(
-                            (message.sentence_type, audio_datas, message.content_detail)
-                        )
-
-                if message.sentence_type == SentenceType.LAST:
-                    self._process_remaining_text()
-                    self.tts_audio_queue.put(
-                        (message.sentence_type, [], message.content_detail)
-                    )
-
+                self._handle_tts_text_message(message)
             except queue.Empty:
                 continue
             except Exception as e:
@@ -259,6 +411,52 @@ class TTSProviderBase(ABC):
                 )
                 continue
 
+    async def tts_text_priority_task(self):
+        """TTSテキストを順序どおりに処理（asyncioモード）
+
+        ブロッキングする合成処理は共有スレッドプールで実行します
+        """
+        executor = get_shared_executor()
+        while not self.conn.stop_event.is_set():
+            message = await self.tts_text_queue.get()
+            try:
+                await self.conn.loop.run_in_executor(
+                    executor, self._handle_tts_text_message, message
+                )
+            except Exception as e:
+                logger.bind(tag=TAG).error(
+                    f"TTSテキストの処理に失敗しました: {str(e)}, タイプ: {type(e).__name__}, スタックトレース: {traceback.format_exc()}"
+                )
+
+    # ここではデフォルトで非ストリーミング方式で処理します
+    # ストリーミング方式で処理する場合は、サブクラスでオーバーライドしてください
+    def _handle_tts_text_message(self, message):
+        """TTSテキストキューから取り出したメッセージを1件処理します"""
+        if self.conn.client_abort:
+            logger.bind(tag=TAG).info("中断情報を受信しました。TTSテキスト処理スレッドを終了します")
+            return
+        if message.sentence_type == SentenceType.FIRST:
+            # パラメータを初期化
+            self.tts_stop_request = False
+            self.segmenter.reset()
+            self.tts_audio_first_sentence = True
+        elif ContentType.TEXT == message.content_type:
+            for segment_text in self._get_segment_texts(message.content_detail):
+                self._submit_segment(segment_text, message.sentence_type)
+        elif ContentType.FILE == message.content_type:
+            self._process_remaining_text()
+            tts_file = message.content_file
+            if tts_file and os.path.exists(tts_file):
+                audio_datas = self._process_audio_file(tts_file)
+                # 先読み中のセグメントの後に再生されるよう重排バッファを通します
+                self.audio_output.put(
+                    (message.sentence_type, audio_datas, message.content_detail)
+                )
+
+        if message.sentence_type == SentenceType.LAST:
+            self._process_remaining_text()
+            self.audio_output.put((message.sentence_type, [], message.content_detail))
+
     def _audio_play_priority_thread(self):
         while not self.conn.stop_event.is_set():
             text = None
@@ -276,14 +474,33 @@ class TTSProviderBase(ABC):
                     self.conn.loop,
                 )
                 future.result()
-                if self.conn.max_output_size > 0 and text:
-                    add_device_output(self.conn.headers.get("device-id"), len(text))
-                enqueue_tts_report(self.conn, text, audio_datas)
+                self._on_audio_sent(text, audio_datas)
             except Exception as e:
                 logger.bind(tag=TAG).error(
                     f"audio_play_priority priority_thread: {text} {e}"
                 )
 
+    async def _audio_play_priority_task(self):
+        """オーディオを順序どおりに再生（asyncioモード）"""
+        while not self.conn.stop_event.is_set():
+            text = None
+            try:
+                sentence_type, audio_datas, text = await self.tts_audio_queue.get()
+                await sendAudioMessage(self.conn, sentence_type, audio_datas, text)
+                self._on_audio_sent(text, audio_datas)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.bind(tag=TAG).error(
+                    f"audio_play_priority priority_task: {text} {e}"
+                )
+
+    def _on_audio_sent(self, text, audio_datas):
+        """オーディオ送信後の出力文字数の集計とレポート"""
+        if self.conn.max_output_size > 0 and text:
+            add_device_output(self.conn.headers.get("device-id"), len(text))
+        enqueue_tts_report(self.conn, text, audio_datas)
+
     async def start_session(self, session_id):
         pass
 
@@ -295,44 +512,16 @@ class TTSProviderBase(ABC):
         if hasattr(self, "ws") and self.ws:
             await self.ws.close()
 
-    def _get_segment_text(self):
-        # 現在のすべてのテキストを結合し、未分割部分を処理
-        full_text = "".join(self.tts_text_buff)
-        current_text = full_text[self.processed_chars :]  # 未処理の位置から開始
-        last_punct_pos = -1
-
-        # 最初の文かどうかに応じて異なる句読点のセットを選択
-        punctuations_to_use = (
-            self.first_sentence_punctuations
-            if self.is_first_sentence
-            else self.punctuations
-        )
-
-        for punct in punctuations_to_use:
-            pos = current_text.rfind(punct)
-            if (pos != -1 and last_punct_pos == -1) or (
-                pos != -1 and pos < last_punct_pos
-            ):
-                last_punct_pos = pos
-
-        if last_punct_pos != -1:
-            segment_text_raw = current_text[: last_punct_pos + 1]
+    def _get_segment_texts(self, text):
+        """新しく届いたテキストを分割器に追加し、合成可能になったセグメントを返します"""
+        segment_texts = []
+        for segment_text_raw in self.segmenter.push(text or ""):
             segment_text = textUtils.get_string_no_punctuation_or_emoji(
                 segment_text_raw
             )
-            self.processed_chars += len(segment_text_raw)  # 処理済み文字位置を更新
-
-            # 最初の文の場合、最初のコンマを見つけたらフラグをFalseに設定
-            if self.is_first_sentence:
-                self.is_first_sentence = False
-
-            return segment_text
-        elif self.tts_stop_request and current_text:
-            segment_text = current_text
-            self.is_first_sentence = True  # フラグをリセット
-            return segment_text
-        else:
-            return None
+            if segment_text:
+                segment_texts.append(segment_text)
+        return segment_texts
 
     def _process_audio_file(self, tts_file):
         """オーディオファイルを処理し、指定された形式に変換
@@ -346,7 +535,12 @@ class TTSProviderBase(ABC):
         """
         audio_datas = []
         if tts_file.endswith(".p3"):
-            audio_datas, _ = p3.decode_opus_from_file(tts_file)
+            if tts_file.startswith(self.output_file):
+                # TTSが出力した一時ファイルは削除されるため、メモリに読み込みます
+                audio_datas, _ = p3.decode_opus_from_file(tts_file)
+            else:
+                # 音楽などのファイルはメモリマップで開き、再生時にフレームを順次取り出します
+                audio_datas = p3.open_p3(tts_file)
         elif self.conn.audio_format == "pcm":
             audio_datas, _ = self.audio_to_pcm_data(tts_file)
         else:
@@ -375,23 +569,10 @@ class TTSProviderBase(ABC):
         Returns:
             bool: テキストが正常に処理されたかどうか
         """
-        full_text = "".join(self.tts_text_buff)
-        remaining_text = full_text[self.processed_chars :]
+        remaining_text = self.segmenter.flush()
         if remaining_text:
             segment_text = textUtils.get_string_no_punctuation_or_emoji(remaining_text)
             if segment_text:
-                if self.delete_audio_file:
-                    audio_datas = self.to_tts(segment_text)
-                    if audio_datas:
-                        self.tts_audio_queue.put(
-                            (SentenceType.MIDDLE, audio_datas, segment_text)
-                        )
-                else:
-                    tts_file = self.to_tts(segment_text)
-                    audio_datas = self._process_audio_file(tts_file)
-                    self.tts_audio_queue.put(
-                        (SentenceType.MIDDLE, audio_datas, segment_text)
-                    )
-                self.processed_chars += len(full_text)
+                self._submit_segment(segment_text, SentenceType.MIDDLE)
                 return True
         return False
\ No newline at end of file
@@ -1,5 +1,5 @@
-import requests
 from core.providers.tts.base import TTSProviderBase
+from core.utils.http_client import get_async_client
 
 
 class TTSProvider(TTSProviderBase):
@@ -29,9 +29,11 @@ class TTSProvider(TTSProviderBase):
         }
 
         try:
-            response = requests.request(
-                "POST", self.api_url, json=request_json, headers=headers
+            client = get_async_client(self.api_url)
+            response = await client.post(
+                self.api_url, json=request_json, headers=headers
             )
+            response.raise_for_status()
             data = response.content
             if output_file:
                 with open(output_file, "wb") as file_to_save:
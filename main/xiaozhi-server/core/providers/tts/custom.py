@@ -1,10 +1,10 @@
 import os
 import json
 import uuid
-import requests
 from config.logger import setup_logging
 from datetime import datetime
 from core.providers.tts.base import TTSProviderBase
+from core.utils.http_client import get_async_client
 
 TAG = __name__
 logger = setup_logging()
@@ -38,10 +38,11 @@ class TTSProvider(TTSProviderBase):
                 v = v.replace("{prompt_text}", text)
             request_params[k] = v
 
+        client = get_async_client(self.url)
         if self.method.upper() == "POST":
-            resp = requests.post(self.url, json=request_params, headers=self.headers)
+            resp = await client.post(self.url, json=request_params, headers=self.headers)
         else:
-            resp = requests.get(self.url, params=request_params, headers=self.headers)
+            resp = await client.get(self.url, params=request_params, headers=self.headers)
         if resp.status_code == 200:
             if output_file:
                 with open(output_file, "wb") as file:
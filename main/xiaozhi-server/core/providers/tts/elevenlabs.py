@@ -1,4 +1,5 @@
 import io
+import asyncio
 from elevenlabs import ElevenLabs, play
 from core.utils.util import check_model_key
 from core.providers.tts.base import TTSProviderBase
@@ -21,29 +22,28 @@ class TTSProvider(TTSProviderBase):
             logger.bind(tag=TAG).error(model_key_msg)
         self.client = ElevenLabs(api_key=self.api_key)
 
+    def _convert(self, text):
+        # ElevenLabs APIを使用して音声合成を実行（ブロッキング処理）
+        audio = self.client.text_to_speech.convert(
+            text=text,
+            voice_id=self.voice_id,
+            model_id=self.model_id,
+            output_format=self.output_format,
+        )
+        return b"".join(chunk for chunk in audio if isinstance(chunk, bytes))
+
     async def text_to_speak(self, text, output_file):
         try:
-            # ElevenLabs APIを使用して音声合成を実行
-            audio = self.client.text_to_speech.convert(
-                text=text,
-                voice_id=self.voice_id,
-                model_id=self.model_id,
-                output_format=self.output_format,
-            )
-            
+            # 共有イベントループをブロックしないようスレッドで実行
+            audio_bytes = await asyncio.to_thread(self._convert, text)
+
             if output_file:
                 # 音声データをファイルに保存
                 with open(output_file, "wb") as out:
-                    for chunk in audio:
-                        if isinstance(chunk, bytes):
-                            out.write(chunk)
+                    out.write(audio_bytes)
             else:
                 # 音声データをバイト列として返す
-                audio_bytes = b""
-                for chunk in audio:
-                    if isinstance(chunk, bytes):
-                        audio_bytes += chunk
                 return audio_bytes
-                
+
         except Exception as e:
-            raise Exception(f"ElevenLabs TTS request failed: {str(e)}")
\ No newline at end of file
+            raise Exception(f"ElevenLabs TTS request failed: {str(e)}")
@@ -1,5 +1,4 @@
 import base64
-import requests
 import ormsgpack
 from pathlib import Path
 from pydantic import BaseModel, Field, conint, model_validator
@@ -7,6 +6,7 @@ from typing_extensions import Annotated
 from typing import Literal
 from core.utils.util import check_model_key, parse_string_to_list
 from core.providers.tts.base import TTSProviderBase
+from core.utils.http_client import get_async_client
 from config.logger import setup_logging
 
 TAG = __name__
@@ -161,9 +161,10 @@ class TTSProvider(TTSProviderBase):
 
         pydantic_data = ServeTTSRequest(**data)
 
-        response = requests.post(
+        client = get_async_client(self.api_url)
+        response = await client.post(
             self.api_url,
-            data=ormsgpack.packb(
+            content=ormsgpack.packb(
                 pydantic_data, option=ormsgpack.OPT_SERIALIZE_PYDANTIC
             ),
             headers={
@@ -1,5 +1,6 @@
 import os
 import io
+import asyncio
 from google.cloud import texttospeech
 from core.utils.util import check_model_key
 from core.providers.tts.base import TTSProviderBase
@@ -36,8 +37,9 @@ class TTSProvider(TTSProviderBase):
                 audio_encoding=getattr(texttospeech.AudioEncoding, self.audio_encoding)
             )
             
-            # 音声合成の実行
-            response = client.synthesize_speech(
+            # 音声合成の実行（共有イベントループをブロックしないようスレッドで実行）
+            response = await asyncio.to_thread(
+                client.synthesize_speech,
                 input=synthesis_input,
                 voice=voice,
                 audio_config=audio_config
@@ -1,6 +1,6 @@
-import requests
 from config.logger import setup_logging
 from core.providers.tts.base import TTSProviderBase
+from core.utils.http_client import get_async_client
 from core.utils.util import parse_string_to_list
 
 TAG = __name__
@@ -90,7 +90,8 @@ class TTSProvider(TTSProviderBase):
             "repetition_penalty": self.repetition_penalty,
         }
 
-        resp = requests.post(self.url, json=request_json)
+        client = get_async_client(self.url)
+        resp = await client.post(self.url, json=request_json)
         if resp.status_code == 200:
             if output_file:
                 with open(output_file, "wb") as file:
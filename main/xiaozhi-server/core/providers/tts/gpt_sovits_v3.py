@@ -1,6 +1,6 @@
-import requests
 from config.logger import setup_logging
 from core.providers.tts.base import TTSProviderBase
+from core.utils.http_client import get_async_client
 from core.utils.util import parse_string_to_list
 
 TAG = __name__
@@ -51,7 +51,8 @@ class TTSProvider(TTSProviderBase):
             "if_sr": self.if_sr,
         }
 
-        resp = requests.get(self.url, params=request_params)
+        client = get_async_client(self.url)
+        resp = await client.get(self.url, params=request_params)
         if resp.status_code == 200:
             if output_file:
                 with open(output_file, "wb") as file:
@@ -1,7 +1,7 @@
 import os
+import time
 import uuid
 import json
-import queue
 import asyncio
 import traceback
 import websockets
@@ -12,7 +12,6 @@ from core.utils.util import check_model_key
 from core.providers.tts.base import TTSProviderBase
 from core.handle.abortHandle import handleAbortMessage
 from core.providers.tts.dto.dto import SentenceType, ContentType, InterfaceType
-from asyncio import Task
 
 
 TAG = __name__
@@ -54,9 +53,12 @@ EVENT_ConnectionFinished = 52  # 连接结束
 # 上行Session事件
 EVENT_StartSession = 100
 
+EVENT_CancelSession = 101
+
 EVENT_FinishSession = 102
 # 下行Session事件
 EVENT_SessionStarted = 150
+EVENT_SessionCanceled = 151
 EVENT_SessionFinished = 152
 
 EVENT_SessionFailed = 153
@@ -143,7 +145,22 @@ class TTSProvider(TTSProviderBase):
         super().__init__(config, delete_audio_file)
         self.ws = None
         self.interface_type = InterfaceType.DUAL_STREAM
-        self._monitor_task = None  # 监听任务引用
+        self._monitor_task = None  # 监听任务引用（连接存续期间持续运行）
+        # 当前会话ID及其结束事件，连接在多个会话之间复用
+        self._session_id = None
+        self._session_done = None
+        self._opus_datas_cache = []
+        self._is_first_sentence = True
+        self._first_sentence_segment_count = 0
+        # WebSocket心跳间隔（秒），保持连接常驻
+        self.keepalive_interval = float(config.get("keepalive_interval") or 20)
+        # 取消上一个未结束会话时等待服务端确认的超时（秒），超时则重建连接
+        self.cancel_timeout = float(config.get("cancel_timeout") or 3)
+        # 结束会话后等待服务端合成完剩余文本时，服务端无响应的最长时间（秒），超时则重建连接
+        # 每收到当前会话的响应都重新计时，长回复合成期间不会超时
+        self.finish_timeout = float(config.get("finish_timeout") or 10)
+        # 最近一次收到当前会话响应的时间（time.monotonic）
+        self._last_response_time = 0.0
         self.appId = config.get("appid")
         self.access_token = config.get("access_token")
         self.cluster = config.get("cluster")
@@ -172,8 +189,18 @@ class TTSProvider(TTSProviderBase):
             self.ws = None
             raise
 
+    def _is_connected(self):
+        return (
+            self.ws is not None
+            and self._monitor_task is not None
+            and not self._monitor_task.done()
+        )
+
     async def _ensure_connection(self):
-        """建立新的WebSocket连接"""
+        """获取常驻的WebSocket连接，不存在或已断开时重新建立并完成StartConnection"""
+        if self._is_connected():
+            return self.ws
+        await self._drop_connection()
         try:
             logger.bind(tag=TAG).info("开始建立新连接...")
             ws_header = {
@@ -183,95 +210,125 @@ class TTSProvider(TTSProviderBase):
                 "X-Api-Connect-Id": uuid.uuid4(),
             }
             self.ws = await websockets.connect(
-                self.ws_url, additional_headers=ws_header, max_size=1000000000
+                self.ws_url,
+                additional_headers=ws_header,
+                max_size=1000000000,
+                ping_interval=self.keepalive_interval,
+                ping_timeout=self.keepalive_interval,
+            )
+            # 建连鉴权，只在建立连接时执行一次，之后的会话直接复用
+            await self.start_connection()
+            while True:
+                msg = await asyncio.wait_for(self.ws.recv(), timeout=self.tts_timeout)
+                res = self.parser_response(msg)
+                self.print_response(res, "start_connection res:")
+                if res.optional.event == EVENT_ConnectionStarted:
+                    break
+                if (
+                    res.optional.event == EVENT_ConnectionFailed
+                    or res.header.message_type == ERROR_INFORMATION
+                ):
+                    raise Exception(
+                        f"建连失败: {res.optional.response_meta_json or res.payload}"
+                    )
+            # 启动监听任务，连接存续期间持续接收所有会话的响应
+            self._monitor_task = asyncio.create_task(
+                self._start_monitor_tts_response(self.ws)
             )
             logger.bind(tag=TAG).info("WebSocket连接建立成功")
             return self.ws
         except Exception as e:
             logger.bind(tag=TAG).error(f"建立连接失败: {str(e)}")
-            self.ws = None
+            await self._drop_connection()
             raise
 
-    def tts_text_priority_thread(self):
-        """火山引擎双流式TTS的文本处理线程"""
-        while not self.conn.stop_event.is_set():
+    async def _drop_connection(self):
+        """关闭当前连接并结束监听任务，下次会话时重新建立连接"""
+        ws, task = self.ws, self._monitor_task
+        self.ws = None
+        self._monitor_task = None
+        if ws is not None:
             try:
-                message = self.tts_text_queue.get(timeout=1)
-                logger.bind(tag=TAG).debug(
-                    f"收到TTS任务｜{message.sentence_type.name} ｜ {message.content_type.name} | 会话ID: {self.conn.sentence_id}"
-                )
-                if self.conn.client_abort:
-                    logger.bind(tag=TAG).info("收到打断信息，终止TTS文本处理线程")
-                    continue
+                await ws.close()
+            except:
+                pass
+        if task is not None and not task.done():
+            task.cancel()
+            try:
+                await task
+            except BaseException:
+                pass
+        if self._session_done is not None:
+            self._session_done.set()
 
-                if message.sentence_type == SentenceType.FIRST:
-                    # 初始化参数
-                    try:
-                        if not getattr(self.conn, "sentence_id", None): 
-                            self.conn.sentence_id = uuid.uuid4().hex
-                            logger.bind(tag=TAG).info(f"自动生成新的 会话ID: {self.conn.sentence_id}")
-
-                        logger.bind(tag=TAG).info("开始启动TTS会话...")
-                        future = asyncio.run_coroutine_threadsafe(
-                            self.start_session(self.conn.sentence_id),
-                            loop=self.conn.loop,
-                        )
-                        future.result()
-                        self.tts_audio_first_sentence = True
-                        self.before_stop_play_files.clear()
-                        logger.bind(tag=TAG).info("TTS会话启动成功")
-                    except Exception as e:
-                        logger.bind(tag=TAG).error(f"启动TTS会话失败: {str(e)}")
-                        continue
+    def _handle_tts_text_message(self, message):
+        """火山引擎双流式TTS的文本处理"""
+        logger.bind(tag=TAG).debug(
+            f"收到TTS任务｜{message.sentence_type.name} ｜ {message.content_type.name} | 会话ID: {self.conn.sentence_id}"
+        )
+        if self.conn.client_abort:
+            logger.bind(tag=TAG).info("收到打断信息，终止TTS文本处理线程")
+            return
 
-                elif ContentType.TEXT == message.content_type:
-                    if message.content_detail:
-                        try:
-                            logger.bind(tag=TAG).debug(
-                                f"开始发送TTS文本: {message.content_detail}"
-                            )
-                            future = asyncio.run_coroutine_threadsafe(
-                                self.text_to_speak(message.content_detail, None),
-                                loop=self.conn.loop,
-                            )
-                            future.result()
-                            logger.bind(tag=TAG).debug("TTS文本发送成功")
-                        except Exception as e:
-                            logger.bind(tag=TAG).error(f"发送TTS文本失败: {str(e)}")
-                            continue
-
-                elif ContentType.FILE == message.content_type:
-                    logger.bind(tag=TAG).info(
-                        f"添加音频文件到待播放列表: {message.content_file}"
+        if message.sentence_type == SentenceType.FIRST:
+            # 初始化参数
+            try:
+                if not getattr(self.conn, "sentence_id", None): 
+                    self.conn.sentence_id = uuid.uuid4().hex
+                    logger.bind(tag=TAG).info(f"自动生成新的 会话ID: {self.conn.sentence_id}")
+
+                logger.bind(tag=TAG).info("开始启动TTS会话...")
+                future = asyncio.run_coroutine_threadsafe(
+                    self.start_session(self.conn.sentence_id),
+                    loop=self.conn.loop,
+                )
+                future.result()
+                self.tts_audio_first_sentence = True
+                self.before_stop_play_files.clear()
+                logger.bind(tag=TAG).info("TTS会话启动成功")
+            except Exception as e:
+                logger.bind(tag=TAG).error(f"启动TTS会话失败: {str(e)}")
+                return
+
+        elif ContentType.TEXT == message.content_type:
+            if message.content_detail:
+                try:
+                    logger.bind(tag=TAG).debug(
+                        f"开始发送TTS文本: {message.content_detail}"
                     )
-                    self.before_stop_play_files.append(
-                        (message.content_file, message.content_detail)
+                    future = asyncio.run_coroutine_threadsafe(
+                        self.text_to_speak(message.content_detail, None),
+                        loop=self.conn.loop,
                     )
+                    future.result()
+                    logger.bind(tag=TAG).debug("TTS文本发送成功")
+                except Exception as e:
+                    logger.bind(tag=TAG).error(f"发送TTS文本失败: {str(e)}")
+                    return
 
-                if message.sentence_type == SentenceType.LAST:
-                    try:
-                        logger.bind(tag=TAG).info("开始结束TTS会话...")
-                        future = asyncio.run_coroutine_threadsafe(
-                            self.finish_session(self.conn.sentence_id),
-                            loop=self.conn.loop,
-                        )
-                        future.result()
-                    except Exception as e:
-                        logger.bind(tag=TAG).error(f"结束TTS会话失败: {str(e)}")
-                        continue
+        elif ContentType.FILE == message.content_type:
+            logger.bind(tag=TAG).info(
+                f"添加音频文件到待播放列表: {message.content_file}"
+            )
+            self.before_stop_play_files.append(
+                (message.content_file, message.content_detail)
+            )
 
-            except queue.Empty:
-                continue
-            except Exception as e:
-                logger.bind(tag=TAG).error(
-                    f"处理TTS文本失败: {str(e)}, 类型: {type(e).__name__}, 堆栈: {traceback.format_exc()}"
+        if message.sentence_type == SentenceType.LAST:
+            try:
+                logger.bind(tag=TAG).info("开始结束TTS会话...")
+                future = asyncio.run_coroutine_threadsafe(
+                    self.finish_session(self.conn.sentence_id),
+                    loop=self.conn.loop,
                 )
-                continue
+                future.result()
+            except Exception as e:
+                logger.bind(tag=TAG).error(f"结束TTS会话失败: {str(e)}")
+                return
 
     async def text_to_speak(self, text, _):
         """发送文本到TTS服务"""
         try:
-            # 建立新连接
             if self.ws is None:
                 logger.bind(tag=TAG).warning(f"WebSocket连接不存在，终止发送文本")
                 return
@@ -284,41 +341,45 @@ class TTSProvider(TTSProviderBase):
             return
         except Exception as e:
             logger.bind(tag=TAG).error(f"发送TTS文本失败: {str(e)}")
-            if self.ws:
-                try:
-                    await self.ws.close()
-                except:
-                    pass
-                self.ws = None
+            await self._drop_connection()
             raise
 
+    async def _cancel_previous_session(self):
+        """上一个会话未结束（如被打断）时取消它，服务端未及时确认则重建连接"""
+        if self._session_done is None or self._session_done.is_set():
+            return
+        logger.bind(tag=TAG).info(f"取消上一个未结束的会话: {self._session_id}")
+        try:
+            header = Header(
+                message_type=FULL_CLIENT_REQUEST,
+                message_type_specific_flags=MsgTypeFlagWithEvent,
+                serial_method=JSON,
+            ).as_bytes()
+            optional = Optional(
+                event=EVENT_CancelSession, sessionId=self._session_id
+            ).as_bytes()
+            await self.send_event(self.ws, header, optional, str.encode("{}"))
+            await asyncio.wait_for(
+                self._session_done.wait(), timeout=self.cancel_timeout
+            )
+        except Exception as e:
+            logger.bind(tag=TAG).warning(f"取消上一个会话失败，重建连接: {e}")
+            await self._drop_connection()
+
     async def start_session(self, session_id):
         logger.bind(tag=TAG).info(f"开始会话～～{session_id}")
         try:
-            task = self._monitor_task
-            if (
-                task is not None
-                and isinstance(task, Task)
-                and not task.done()
-            ):
-                logger.bind(tag=TAG).info("等待上一个监听任务结束...")
-                if self.ws is not None:
-                    logger.bind(tag=TAG).info("强制关闭上一个WebSocket连接以唤醒监听任务...")
-                    try:
-                        await self.ws.close()
-                    except Exception as e:
-                        logger.bind(tag=TAG).warning(f"关闭上一个ws异常: {e}")
-                    self.ws = None
-                try:
-                    await asyncio.wait_for(task, timeout=8)
-                except Exception as e:
-                    logger.bind(tag=TAG).warning(f"等待监听任务异常: {e}")
-                self._monitor_task = None
-            # 建立新连接
+            if self._is_connected():
+                await self._cancel_previous_session()
+            # 复用常驻连接，仅在断开后重新建立
             await self._ensure_connection()
 
-            # 启动监听任务
-            self._monitor_task = asyncio.create_task(self._start_monitor_tts_response())
+            # 重置会话状态
+            self._session_id = session_id
+            self._session_done = asyncio.Event()
+            self._opus_datas_cache = []
+            self._is_first_sentence = True
+            self._first_sentence_segment_count = 0
 
             header = Header(
                 message_type=FULL_CLIENT_REQUEST,
@@ -336,19 +397,7 @@ class TTSProvider(TTSProviderBase):
         except Exception as e:
             logger.bind(tag=TAG).error(f"启动会话失败: {str(e)}")
             # 确保清理资源
-            if hasattr(self, "_monitor_task"):
-                try:
-                    self._monitor_task.cancel()
-                    await self._monitor_task
-                except:
-                    pass
-                self._monitor_task = None
-            if self.ws:
-                try:
-                    await self.ws.close()
-                except:
-                    pass
-                self.ws = None
+            await self._drop_connection()
             raise
 
     async def finish_session(self, session_id):
@@ -367,75 +416,97 @@ class TTSProvider(TTSProviderBase):
                 await self.send_event(self.ws, header, optional, payload)
                 logger.bind(tag=TAG).info("会话结束请求已发送")
 
-                # 等待监听任务完成
-                if hasattr(self, "_monitor_task"):
-                    try:
-                        await self._monitor_task
-                    except Exception as e:
-                        logger.bind(tag=TAG).error(
-                            f"等待监听任务完成时发生错误: {str(e)}"
-                        )
-                    finally:
-                        self._monitor_task = None
-
-                # 关闭连接
-                await self.close()
+                # 等待会话结束，连接保持打开供下一个会话使用
+                if self._session_done is not None:
+                    self._last_response_time = time.monotonic()
+                    await self._wait_session_done()
+        except asyncio.TimeoutError:
+            logger.bind(tag=TAG).warning(
+                f"服务端{self.finish_timeout}秒无响应，会话未结束，重建连接: {session_id}"
+            )
+            await self._drop_connection()
         except Exception as e:
             logger.bind(tag=TAG).error(f"关闭会话失败: {str(e)}")
             # 确保清理资源
-            if hasattr(self, "_monitor_task"):
-                try:
-                    self._monitor_task.cancel()
-                    await self._monitor_task
-                except:
-                    pass
-                self._monitor_task = None
-            if self.ws:
-                try:
-                    await self.ws.close()
-                except:
-                    pass
-                self.ws = None
+            await self._drop_connection()
             raise
 
+    async def _wait_session_done(self):
+        """等待当前会话结束，距最近一次响应超过finish_timeout时抛出asyncio.TimeoutError"""
+        done = self._session_done
+        while not done.is_set():
+            remaining = self._last_response_time + self.finish_timeout - time.monotonic()
+            if remaining <= 0:
+                raise asyncio.TimeoutError()
+            try:
+                await asyncio.wait_for(done.wait(), timeout=remaining)
+            except asyncio.TimeoutError:
+                pass
+
     async def close(self):
         """资源清理方法"""
         if self.ws:
             try:
-                await self.ws.close()
-            except:
+                header = Header(
+                    message_type=FULL_CLIENT_REQUEST,
+                    message_type_specific_flags=MsgTypeFlagWithEvent,
+                ).as_bytes()
+                optional = Optional(event=EVENT_FinishConnection).as_bytes()
+                await self.send_event(self.ws, header, optional, str.encode("{}"))
+            except Exception:
                 pass
-            self.ws = None
+        await self._drop_connection()
+
+    def _end_session(self):
+        """当前会话结束：播放结束前的音频文件并通知等待方"""
+        self._process_before_stop_play_files()
+        if self._session_done is not None:
+            self._session_done.set()
 
-    async def _start_monitor_tts_response(self):
-        """监听TTS响应"""
-        opus_datas_cache = []
-        is_first_sentence = True
-        first_sentence_segment_count = 0  # 添加计数器
+    async def _start_monitor_tts_response(self, ws):
+        """监听TTS响应（连接存续期间持续运行，只处理当前会话的响应）"""
         try:
             while not self.conn.stop_event.is_set():
                 try:
                     # 确保 `recv()` 运行在同一个 event loop
-                    msg = await self.ws.recv()
+                    msg = await ws.recv()
                     res = self.parser_response(msg)
                     self.print_response(res, "send_text res:")
 
-                    # 检查客户端是否中止
+                    event = res.optional.event
+                    if res.optional.sessionId != self._session_id:
+                        # 已取消的旧会话的残留响应
+                        continue
+                    self._last_response_time = time.monotonic()
+
+                    if event in (
+                        EVENT_SessionFinished,
+                        EVENT_SessionCanceled,
+                        EVENT_SessionFailed,
+                    ):
+                        if event == EVENT_SessionFailed:
+                            logger.bind(tag=TAG).error(
+                                f"会话失败: {res.optional.response_meta_json}"
+                            )
+                        logger.bind(tag=TAG).debug(f"会话结束～～")
+                        self._end_session()
+                        continue
+
+                    # 被打断时丢弃剩余音频，等待会话被取消
                     if self.conn.client_abort:
-                        logger.bind(tag=TAG).info("收到打断信息，终止监听TTS响应")
-                        break
+                        continue
 
-                    if res.optional.event == EVENT_TTSSentenceStart:
+                    if event == EVENT_TTSSentenceStart:
                         json_data = json.loads(res.payload.decode("utf-8"))
                         self.tts_text = json_data.get("text", "")
                         logger.bind(tag=TAG).debug(f"句子语音生成开始: {self.tts_text}")
                         self.tts_audio_queue.put(
                             (SentenceType.FIRST, [], self.tts_text)
                         )
-                        opus_datas_cache = []
-                        first_sentence_segment_count = 0  # 重置计数器
+                        self._opus_datas_cache = []
+                        self._first_sentence_segment_count = 0  # 重置计数器
                     elif (
-                        res.optional.event == EVENT_TTSResponse
+                        event == EVENT_TTSResponse
                         and res.header.message_type == AUDIO_ONLY_RESPONSE
                     ):
                         logger.bind(tag=TAG).debug(f"推送数据到队列里面～～")
@@ -443,30 +514,30 @@ class TTSProvider(TTSProviderBase):
                         logger.bind(tag=TAG).debug(
                             f"推送数据到队列里面帧数～～{len(opus_datas)}"
                         )
-                        if is_first_sentence:
-                            first_sentence_segment_count += 1
-                            if first_sentence_segment_count <= 6:
+                        if self._is_first_sentence:
+                            self._first_sentence_segment_count += 1
+                            if self._first_sentence_segment_count <= 6:
                                 self.tts_audio_queue.put(
                                     (SentenceType.MIDDLE, opus_datas, None)
                                 )
                             else:
-                                opus_datas_cache = opus_datas_cache + opus_datas
+                                self._opus_datas_cache.extend(opus_datas)
                         else:
                             # 后续句子缓存
-                            opus_datas_cache = opus_datas_cache + opus_datas
-                    elif res.optional.event == EVENT_TTSSentenceEnd:
+                            self._opus_datas_cache.extend(opus_datas)
+                    elif event == EVENT_TTSSentenceEnd:
                         logger.bind(tag=TAG).info(f"句子语音生成成功：{self.tts_text}")
-                        if not is_first_sentence or first_sentence_segment_count > 10:
+                        if (
+                            not self._is_first_sentence
+                            or self._first_sentence_segment_count > 10
+                        ):
                             # 发送缓存的数据
                             self.tts_audio_queue.put(
-                                (SentenceType.MIDDLE, opus_datas_cache, None)
+                                (SentenceType.MIDDLE, self._opus_datas_cache, None)
                             )
+                            self._opus_datas_cache = []
                         # 第一句话结束后，将标志设置为False
-                        is_first_sentence = False
-                    elif res.optional.event == EVENT_SessionFinished:
-                        logger.bind(tag=TAG).debug(f"会话结束～～")
-                        self._process_before_stop_play_files()
-                        break
+                        self._is_first_sentence = False
                 except websockets.ConnectionClosed:
                     logger.bind(tag=TAG).warning("WebSocket连接已关闭")
                     break
@@ -477,15 +548,15 @@ class TTSProvider(TTSProviderBase):
                     traceback.print_exc()
                     break
         finally:
-            # 确保清理资源
-            if self.ws:
-                try:
-                    await self.ws.close()
-                except:
-                    pass
+            # 连接断开：唤醒等待中的会话，下次会话时重新建立连接
+            if self.ws is ws:
                 self.ws = None
-            # 监听任务退出时清理引用
-            self._monitor_task = None
+            if self._session_done is not None and not self._session_done.is_set():
+                self._session_done.set()
+            try:
+                await ws.close()
+            except:
+                pass
 
     async def send_event(
         self,
@@ -523,7 +594,7 @@ class TTSProvider(TTSProviderBase):
     def read_res_content(self, res: bytes, offset: int):
         content_size = int.from_bytes(res[offset : offset + 4], "big", signed=True)
         offset += 4
-        content = str(res[offset : offset + content_size])
+        content = res[offset : offset + content_size].decode("utf-8", "ignore")
         offset += content_size
         return content, offset
 
@@ -1,12 +1,8 @@
-import queue
-import asyncio
-import traceback
-import aiohttp
-import requests
 import time
 from config.logger import setup_logging
 from core.utils.tts import MarkdownCleaner
 from core.providers.tts.base import TTSProviderBase
+from core.utils.http_client import get_async_client, run_coroutine, iterate_async
 from core.utils import opus_encoder_utils, textUtils
 from core.providers.tts.dto.dto import SentenceType, ContentType, InterfaceType
 
@@ -40,43 +36,30 @@ class TTSProvider(TTSProviderBase):
     # linkerai单流式TTS重写父类的方法--开始
     ###################################################################################
 
-    def tts_text_priority_thread(self):
-        """流式文本处理线程"""
-        while not self.conn.stop_event.is_set():
-            try:
-                message = self.tts_text_queue.get(timeout=1)
-                if message.sentence_type == SentenceType.FIRST:
-                    # 初始化参数
-                    self.tts_stop_request = False
-                    self.processed_chars = 0
-                    self.tts_text_buff = []
-                    self.segment_count = 0
-                    self.tts_audio_first_sentence = True
-                    self.before_stop_play_files.clear()
-                elif ContentType.TEXT == message.content_type:
-                    self.tts_text_buff.append(message.content_detail)
-                    segment_text = self._get_segment_text()
-                    if segment_text:
-                        self.to_tts_single_stream(segment_text)
-
-                elif ContentType.FILE == message.content_type:
-                    logger.bind(tag=TAG).info(
-                        f"添加音频文件到待播放列表: {message.content_file}"
-                    )
-                    self.before_stop_play_files.append(
-                        (message.content_file, message.content_detail)
-                    )
-
-                if message.sentence_type == SentenceType.LAST:
-                    # 处理剩余的文本
-                    self._process_remaining_text(True)
-
-            except queue.Empty:
-                continue
-            except Exception as e:
-                logger.bind(tag=TAG).error(
-                    f"处理TTS文本失败: {str(e)}, 类型: {type(e).__name__}, 堆栈: {traceback.format_exc()}"
-                )
+    def _handle_tts_text_message(self, message):
+        """流式文本处理"""
+        if message.sentence_type == SentenceType.FIRST:
+            # 初始化参数
+            self.tts_stop_request = False
+            self.segmenter.reset()
+            self.segment_count = 0
+            self.tts_audio_first_sentence = True
+            self.before_stop_play_files.clear()
+        elif ContentType.TEXT == message.content_type:
+            for segment_text in self._get_segment_texts(message.content_detail):
+                self.to_tts_single_stream(segment_text)
+
+        elif ContentType.FILE == message.content_type:
+            logger.bind(tag=TAG).info(
+                f"添加音频文件到待播放列表: {message.content_file}"
+            )
+            self.before_stop_play_files.append(
+                (message.content_file, message.content_detail)
+            )
+
+        if message.sentence_type == SentenceType.LAST:
+            # 处理剩余的文本
+            self._process_remaining_text(True)
 
     def _process_remaining_text(self, is_last=False):
         """处理剩余的文本并生成语音
@@ -84,13 +67,11 @@ class TTSProvider(TTSProviderBase):
         Returns:
             bool: 是否成功处理了文本
         """
-        full_text = "".join(self.tts_text_buff)
-        remaining_text = full_text[self.processed_chars :]
+        remaining_text = self.segmenter.flush()
         if remaining_text:
             segment_text = textUtils.get_string_no_punctuation_or_emoji(remaining_text)
             if segment_text:
                 self.to_tts_single_stream(segment_text, is_last)
-                self.processed_chars += len(full_text)
             else:
                 self._process_before_stop_play_files()
         else:
@@ -101,7 +82,7 @@ class TTSProvider(TTSProviderBase):
             max_repeat_time = 5
             text = MarkdownCleaner.clean_markdown(text)
             try:
-                asyncio.run(self.text_to_speak(text, is_last))
+                self._tts_request(text, is_last)
             except Exception as e:
                 logger.bind(tag=TAG).warning(
                     f"语音生成失败{5 - max_repeat_time + 1}次: {text}，错误: {e}"
@@ -125,9 +106,28 @@ class TTSProvider(TTSProviderBase):
     # linkerai单流式TTS重写父类的方法--结束
     ###################################################################################
 
-    async def text_to_speak(self, text, is_last):
-        """流式处理TTS音频，每句只推送一次音频列表"""
-        await self._tts_request(text, is_last)
+    async def text_to_speak(self, text, output_file):
+        """非流式请求，在后台事件循环中获取整句的PCM数据"""
+        params = {
+            "tts_text": text,
+            "spk_id": self.voice,
+            "frame_duration": 60,
+            "stream": False,
+            "target_sr": 16000,
+            "audio_format": self.audio_format,
+            "instruct_text": "请生成一段自然流畅的语音",
+        }
+        headers = {
+            "Authorization": f"Bearer {self.access_token}",
+            "Content-Type": "application/json",
+        }
+        client = get_async_client(self.api_url)
+        response = await client.get(
+            self.api_url, params=params, headers=headers, timeout=5
+        )
+        if response.status_code != 200:
+            raise Exception(f"TTS请求失败: {response.status_code}, {response.text}")
+        return response.content
 
     async def close(self):
         """资源清理"""
@@ -135,7 +135,8 @@ class TTSProvider(TTSProviderBase):
         if hasattr(self, "opus_encoder"):
             self.opus_encoder.close()
 
-    async def _tts_request(self, text: str, is_last: bool) -> None:
+    async def _stream_pcm(self, text: str):
+        """流式请求，在后台事件循环中逐块返回PCM数据，编码由调用线程完成"""
         params = {
             "tts_text": text,
             "spk_id": self.voice,
@@ -149,7 +150,19 @@ class TTSProvider(TTSProviderBase):
             "Authorization": f"Bearer {self.access_token}",
             "Content-Type": "application/json",
         }
-
+        client = get_async_client(self.api_url)
+        async with client.stream(
+            "GET", self.api_url, params=params, headers=headers, timeout=10
+        ) as resp:
+            if resp.status_code != 200:
+                await resp.aread()
+                raise Exception(f"TTS请求失败: {resp.status_code}, {resp.text}")
+            async for data in resp.aiter_bytes():
+                if data:
+                    yield data
+
+    def _tts_request(self, text: str, is_last: bool) -> None:
+        """在TTS线程中接收流式PCM并编码为Opus，不占用共享的后台事件循环"""
         # 一帧 PCM 所需字节数：60 ms &times; 16 kHz &times; 1 ch &times; 2 B = 1 920
         frame_bytes = int(
             self.opus_encoder.sample_rate
@@ -160,75 +173,61 @@ class TTSProvider(TTSProviderBase):
         )  # 16-bit = 2 bytes
 
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(
-                    self.api_url, params=params, headers=headers, timeout=10
-                ) as resp:
-
-                    if resp.status != 200:
-                        logger.bind(tag=TAG).error(
-                            f"TTS请求失败: {resp.status}, {await resp.text()}"
-                        )
-                        self.tts_audio_queue.put((SentenceType.LAST, [], None))
-                        return
-
-                    self.pcm_buffer.clear()
-                    opus_datas_cache = []
+            self.pcm_buffer.clear()
+            opus_datas_cache = []
+            started = False
 
+            for data in iterate_async(self._stream_pcm(text)):
+                if not started:
+                    # 收到首个数据块（请求已成功）时开始本句
                     self.tts_audio_queue.put((SentenceType.FIRST, [], text))
+                    started = True
 
-                    # 兼容 iter_chunked / iter_chunks / iter_any
-                    async for chunk in resp.content.iter_any():
-                        data = chunk[0] if isinstance(chunk, (list, tuple)) else chunk
-                        if not data:
-                            continue
+                # 拼到 buffer
+                self.pcm_buffer.extend(data)
 
-                        # 拼到 buffer
-                        self.pcm_buffer.extend(data)
+                # 够一帧就编码
+                while len(self.pcm_buffer) >= frame_bytes:
+                    frame = bytes(self.pcm_buffer[:frame_bytes])
+                    del self.pcm_buffer[:frame_bytes]
 
-                        # 够一帧就编码
-                        while len(self.pcm_buffer) >= frame_bytes:
-                            frame = bytes(self.pcm_buffer[:frame_bytes])
-                            del self.pcm_buffer[:frame_bytes]
-
-                            opus = self.opus_encoder.encode_pcm_to_opus(
-                                frame, end_of_stream=False
+                    opus = self.opus_encoder.encode_pcm_to_opus(
+                        frame, end_of_stream=False
+                    )
+                    if opus:
+                        if self.segment_count < 10:  # 前10个片段直接发送
+                            self.tts_audio_queue.put(
+                                (SentenceType.MIDDLE, opus, None)
                             )
-                            if opus:
-                                if self.segment_count < 10:  # 前10个片段直接发送
-                                    self.tts_audio_queue.put(
-                                        (SentenceType.MIDDLE, opus, None)
-                                    )
-                                    self.segment_count += 1
-                                else:
-                                    opus_datas_cache.extend(opus)
-
-                    # flush 剩余不足一帧的数据
-                    if self.pcm_buffer:
-                        opus = self.opus_encoder.encode_pcm_to_opus(
-                            bytes(self.pcm_buffer), end_of_stream=True
-                        )
-                        if opus:
-                            if self.segment_count < 10:  # 前10个片段直接发送
-                                # 直接发送
-                                self.tts_audio_queue.put(
-                                    (SentenceType.MIDDLE, opus, None)
-                                )
-                                self.segment_count += 1
-                            else:
-                                # 后续片段缓存
-                                opus_datas_cache.extend(opus)
-                        self.pcm_buffer.clear()
-
-                    # 如果不是前10个片段，发送缓存的数据
-                    if self.segment_count >= 10 and opus_datas_cache:
-                        self.tts_audio_queue.put(
-                            (SentenceType.MIDDLE, opus_datas_cache, None)
-                        )
-
-                    # 如果是最后一段，输出音频获取完毕
-                    if is_last:
-                        self._process_before_stop_play_files()
+                            self.segment_count += 1
+                        else:
+                            opus_datas_cache.extend(opus)
+
+            if not started:
+                self.tts_audio_queue.put((SentenceType.FIRST, [], text))
+
+            # flush 剩余不足一帧的数据
+            if self.pcm_buffer:
+                opus = self.opus_encoder.encode_pcm_to_opus(
+                    bytes(self.pcm_buffer), end_of_stream=True
+                )
+                if opus:
+                    if self.segment_count < 10:  # 前10个片段直接发送
+                        # 直接发送
+                        self.tts_audio_queue.put((SentenceType.MIDDLE, opus, None))
+                        self.segment_count += 1
+                    else:
+                        # 后续片段缓存
+                        opus_datas_cache.extend(opus)
+                self.pcm_buffer.clear()
+
+            # 如果不是前10个片段，发送缓存的数据
+            if self.segment_count >= 10 and opus_datas_cache:
+                self.tts_audio_queue.put((SentenceType.MIDDLE, opus_datas_cache, None))
+
+            # 如果是最后一段，输出音频获取完毕
+            if is_last:
+                self._process_before_stop_play_files()
 
         except Exception as e:
             logger.bind(tag=TAG).error(f"TTS请求异常: {e}")
@@ -246,59 +245,38 @@ class TTSProvider(TTSProviderBase):
         start_time = time.time()
         text = MarkdownCleaner.clean_markdown(text)
 
-        params = {
-            "tts_text": text,
-            "spk_id": self.voice,
-            "frame_duration": 60,
-            "stream": False,
-            "target_sr": 16000,
-            "audio_format": self.audio_format,
-            "instruct_text": "请生成一段自然流畅的语音",
-        }
-        headers = {
-            "Authorization": f"Bearer {self.access_token}",
-            "Content-Type": "application/json",
-        }
-
         try:
-            with requests.get(
-                self.api_url, params=params, headers=headers, timeout=5
-            ) as response:
-                if response.status_code != 200:
-                    logger.bind(tag=TAG).error(
-                        f"TTS请求失败: {response.status_code}, {response.text}"
-                    )
-                    return []
-
-                logger.info(f"TTS请求成功: {text}, 耗时: {time.time() - start_time}秒")
-
-                # 使用opus编码器处理PCM数据
-                opus_datas = []
-                pcm_data = response.content
-
-                # 计算每帧的字节数
-                frame_bytes = int(
-                    self.opus_encoder.sample_rate
-                    * self.opus_encoder.channels
-                    * self.opus_encoder.frame_size_ms
-                    / 1000
-                    * 2
+            # 请求在后台事件循环中完成，PCM的Opus编码在当前线程中进行
+            pcm_data = run_coroutine(self.text_to_speak(text, None))
+
+            logger.info(f"TTS请求成功: {text}, 耗时: {time.time() - start_time}秒")
+
+            # 使用opus编码器处理PCM数据
+            opus_datas = []
+
+            # 计算每帧的字节数
+            frame_bytes = int(
+                self.opus_encoder.sample_rate
+                * self.opus_encoder.channels
+                * self.opus_encoder.frame_size_ms
+                / 1000
+                * 2
+            )
+
+            # 分帧处理PCM数据
+            for i in range(0, len(pcm_data), frame_bytes):
+                frame = pcm_data[i : i + frame_bytes]
+                if len(frame) < frame_bytes:
+                    # 最后一帧可能不足，用0填充
+                    frame = frame + b"\x00" * (frame_bytes - len(frame))
+
+                opus = self.opus_encoder.encode_pcm_to_opus(
+                    frame, end_of_stream=(i + frame_bytes >= len(pcm_data))
                 )
+                if opus:
+                    opus_datas.extend(opus)
 
-                # 分帧处理PCM数据
-                for i in range(0, len(pcm_data), frame_bytes):
-                    frame = pcm_data[i : i + frame_bytes]
-                    if len(frame) < frame_bytes:
-                        # 最后一帧可能不足，用0填充
-                        frame = frame + b"\x00" * (frame_bytes - len(frame))
-
-                    opus = self.opus_encoder.encode_pcm_to_opus(
-                        frame, end_of_stream=(i + frame_bytes >= len(pcm_data))
-                    )
-                    if opus:
-                        opus_datas.extend(opus)
-
-                return opus_datas
+            return opus_datas
 
         except Exception as e:
             logger.bind(tag=TAG).error(f"TTS请求异常: {e}")
@@ -1,9 +1,9 @@
 import os
 import uuid
 import json
-import requests
 from datetime import datetime
 from core.providers.tts.base import TTSProviderBase
+from core.utils.http_client import get_async_client
 from core.utils.util import parse_string_to_list
 
 
@@ -75,8 +75,9 @@ class TTSProvider(TTSProviderBase):
             request_json["voice_setting"]["voice_id"] = ""
 
         try:
-            resp = requests.post(
-                self.api_url, json.dumps(request_json), headers=self.header
+            client = get_async_client(self.api_url)
+            resp = await client.post(
+                self.api_url, content=json.dumps(request_json), headers=self.header
             )
             # 检查返回请求数据的status_code是否为0
             if resp.json()["base_resp"]["status_code"] == 0:
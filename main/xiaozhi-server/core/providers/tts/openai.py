@@ -1,6 +1,6 @@
-import requests
 from core.utils.util import check_model_key
 from core.providers.tts.base import TTSProviderBase
+from core.utils.http_client import get_async_client
 from config.logger import setup_logging
 
 TAG = __name__
@@ -41,7 +41,8 @@ class TTSProvider(TTSProviderBase):
             "response_format": "wav",
             "speed": self.speed,
         }
-        response = requests.post(self.api_url, json=data, headers=headers)
+        client = get_async_client(self.api_url)
+        response = await client.post(self.api_url, json=data, headers=headers)
         if response.status_code == 200:
             if output_file:
                 with open(output_file, "wb") as audio_file:
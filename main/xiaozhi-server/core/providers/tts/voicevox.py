@@ -1,7 +1,7 @@
-import requests
 import json
 from core.utils.util import check_model_key
 from core.providers.tts.base import TTSProviderBase
+from core.utils.http_client import get_async_client
 from config.logger import setup_logging
 
 TAG = __name__
@@ -24,7 +24,8 @@ class TTSProvider(TTSProviderBase):
                 "text": text,
                 "speaker": self.speaker_id
             }
-            query_response = requests.post(query_url, params=query_params)
+            client = get_async_client(self.api_url)
+            query_response = await client.post(query_url, params=query_params)
             query_response.raise_for_status()
             
             # 音声合成を実行
@@ -32,7 +33,7 @@ class TTSProvider(TTSProviderBase):
             synthesis_params = {
                 "speaker": self.speaker_id
             }
-            synthesis_response = requests.post(
+            synthesis_response = await client.post(
                 synthesis_url,
                 params=synthesis_params,
                 json=query_response.json()
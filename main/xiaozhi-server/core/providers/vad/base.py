@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import Optional
+from typing import Optional, Tuple
 
 
 class VADProviderBase(ABC):
@@ -7,3 +7,14 @@ class VADProviderBase(ABC):
     def is_vad(self, conn, data) -> bool:
         """检测音频数据中的语音活动"""
         pass
+
+    async def is_vad_async(self, conn, data) -> bool:
+        """在事件循环中检测语音活动，支持批量推理的实现可重写此方法以避免阻塞事件循环"""
+        return self.is_vad(conn, data)
+
+    def get_speech_range(self, conn) -> Optional[Tuple[int, int]]:
+        """
+        返回本句话语音段在pcm_buffer中的绝对索引范围（已包含前后保留的余白）
+        不记录语音段的实现返回None，此时ASR使用全部音频
+        """
+        return None
@@ -1,15 +1,47 @@
-import time
+from typing import List
 import numpy as np
 import torch
-import opuslib_next
 from config.logger import setup_logging
-from core.providers.vad.base import VADProviderBase
+from core.providers.vad.silero_base import (
+    SAMPLE_RATE,
+    CONTEXT_SAMPLES,
+    SileroBatchEngine,
+    SileroConnectionState,
+    SileroVADProviderBase,
+)
 
 TAG = __name__
 logger = setup_logging()
 
 
-class VADProvider(VADProviderBase):
+class TorchSileroBatchEngine(SileroBatchEngine):
+    """使用torch JIT模型的批量推理引擎"""
+
+    def __init__(self, model, batch_window_ms: float = 2, max_batch_size: int = 64):
+        self.model = model
+        super().__init__(batch_window_ms, max_batch_size)
+
+    def _forward(
+        self, audio: np.ndarray, states: List[SileroConnectionState]
+    ) -> list:
+        """以指定的批量状态执行一次推理，返回语音概率并写回更新后的状态"""
+        rnn_state = torch.cat([state.rnn_state for state in states], dim=1)
+        context = torch.cat([state.context for state in states], dim=0)
+        with torch.no_grad():
+            self.model._state = rnn_state
+            self.model._context = context
+            self.model._last_sr = SAMPLE_RATE
+            self.model._last_batch_size = audio.shape[0]
+            out = self.model(torch.from_numpy(audio), SAMPLE_RATE)
+            rnn_state, context = self.model._state, self.model._context
+
+        for j, state in enumerate(states):
+            state.rnn_state = rnn_state[:, j : j + 1]
+            state.context = context[j : j + 1]
+        return out.reshape(-1).tolist()
+
+
+class VADProvider(SileroVADProviderBase):
     def __init__(self, config):
         logger.bind(tag=TAG).info("SileroVAD", config)
         self.model, _ = torch.hub.load(
@@ -18,63 +50,17 @@ class VADProvider(VADProviderBase):
             model="silero_vad",
             force_reload=False,
         )
+        super().__init__(config)
 
-        self.decoder = opuslib_next.Decoder(16000, 1)
-
-        # 处理空字符串的情况
-        threshold = config.get("threshold", "0.5")
-        min_silence_duration_ms = config.get("min_silence_duration_ms", "1000")
-
-        self.vad_threshold = float(threshold) if threshold else 0.5
-        self.silence_threshold_ms = (
-            int(min_silence_duration_ms) if min_silence_duration_ms else 1000
+    def create_engine(
+        self, batch_window_ms: float, max_batch_size: int
+    ) -> SileroBatchEngine:
+        return TorchSileroBatchEngine(
+            self.model, batch_window_ms=batch_window_ms, max_batch_size=max_batch_size
         )
 
-    def is_vad(self, conn, opus_packet):
-        try:
-            pcm_frame = self.decoder.decode(opus_packet, 960)
-            conn.client_audio_buffer.extend(pcm_frame)  # 将新数据加入缓冲区
-
-            # 确保帧计数器存在
-            if not hasattr(conn, "client_voice_frame_count"):
-                conn.client_voice_frame_count = 0
-
-            # 处理缓冲区中的完整帧（每次处理512采样点）
-            client_have_voice = False
-            while len(conn.client_audio_buffer) >= 512 * 2:
-                # 提取前512个采样点（1024字节）
-                chunk = conn.client_audio_buffer[: 512 * 2]
-                conn.client_audio_buffer = conn.client_audio_buffer[512 * 2 :]
-
-                # 转换为模型需要的张量格式
-                audio_int16 = np.frombuffer(chunk, dtype=np.int16)
-                audio_float32 = audio_int16.astype(np.float32) / 32768.0
-                audio_tensor = torch.from_numpy(audio_float32)
-
-                # 检测语音活动
-                with torch.no_grad():
-                    speech_prob = self.model(audio_tensor, 16000).item()
-                is_voice = speech_prob >= self.vad_threshold
-
-                if is_voice:
-                    conn.client_voice_frame_count += 1
-                else:
-                    conn.client_voice_frame_count = 0
-
-                # 只有连续4帧检测到语音才认为有语音
-                client_have_voice = conn.client_voice_frame_count >= 4
-
-                # 如果之前有声音，但本次没有声音，且与上次有声音的时间差已经超过了静默阈值，则认为已经说完一句话
-                if conn.client_have_voice and not client_have_voice:
-                    stop_duration = time.time() * 1000 - conn.last_activity_time
-                    if stop_duration >= self.silence_threshold_ms:
-                        conn.client_voice_stop = True
-                if client_have_voice:
-                    conn.client_have_voice = True
-                    conn.last_activity_time = time.time() * 1000
-
-            return client_have_voice
-        except opuslib_next.OpusError as e:
-            logger.bind(tag=TAG).info(f"解码错误: {e}")
-        except Exception as e:
-            logger.bind(tag=TAG).error(f"Error processing audio packet: {e}")
+    def create_state(self) -> SileroConnectionState:
+        return SileroConnectionState(
+            torch.zeros((2, 1, 128), dtype=torch.float32),
+            torch.zeros((1, CONTEXT_SAMPLES), dtype=torch.float32),
+        )
@@ -0,0 +1,410 @@
+"""
+Silero VAD的公共部分，与推理后端（torch / onnxruntime）无关
+包括跨连接批量推理的调度、Opus解码与分块、说话状态判定；
+具体后端只需提供模型加载、连接状态张量和一次批量前向推理
+"""
+
+import time
+import queue
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import List, Optional, Tuple
+import numpy as np
+import opuslib_next
+from config.logger import setup_logging
+from core.providers.vad.base import VADProviderBase
+from core.utils import metrics
+from core.utils.runtime import apply_thread_budget
+
+TAG = __name__
+logger = setup_logging()
+
+# Silero VAD在16k采样率下每次处理512个采样点（32ms）
+CHUNK_SAMPLES = 512
+CHUNK_BYTES = CHUNK_SAMPLES * 2
+CONTEXT_SAMPLES = 64
+SAMPLE_RATE = 16000
+CHUNK_MS = CHUNK_SAMPLES * 1000 // SAMPLE_RATE
+
+# 噪声底估计值的下限，避免数字静音把噪声底拉到0
+MIN_NOISE_FLOOR = 1e-5
+# 跳过一段音频后重新经过模型时，先补送的最近音频块数（约0.5秒），让RNN状态恢复到连续输入时的水平
+WARMUP_CHUNKS = 16
+INT16_SCALE = np.float32(1.0 / 32768.0)
+
+
+class SileroConnectionState:
+    """单个连接的VAD状态：Opus解码器，以及由后端初始化的RNN隐状态和上下文，连接之间互不影响"""
+
+    def __init__(self, rnn_state, context):
+        self.decoder = opuslib_next.Decoder(SAMPLE_RATE, 1)
+        self.rnn_state = rnn_state
+        self.context = context
+        # 能量门限：背景噪声的RMS估计值（尚未估计时为None），以及检测到语音后仍需经过模型的块数
+        self.noise_floor = None
+        self.hangover = 0
+        # 连续被跳过的块数
+        self.skipped_chunks = 0
+
+
+class EnergyGate:
+    """
+    神经网络VAD前的能量门限
+    每个连接自适应估计背景噪声的RMS，能量不超过噪声底ratio倍的音频块直接判为静音，不送入模型；
+    说话中、检测到语音后的hangover时间内，以及同一包中有块超过门限时，所有块都经过模型；
+    Silero的RNN状态对过去约2秒的音频敏感，hangover默认2秒，让跳过只发生在RNN状态已稳定的长时间静音中，
+    重新推理前再补送最近的音频，保证语音起止附近的检测结果与不使用门限时一致
+    """
+
+    def __init__(self, ratio: float, hangover_chunks: int):
+        self.ratio = ratio
+        self.hangover_chunks = hangover_chunks
+
+    def select(self, conn, state: SileroConnectionState, rms: np.ndarray) -> bool:
+        """返回本包的音频块是否需要经过模型"""
+        if state.noise_floor is None or state.hangover > 0 or conn.client_have_voice:
+            return True
+        return bool(np.any(rms > state.noise_floor * self.ratio))
+
+    def update(
+        self, state: SileroConnectionState, rms: np.ndarray, speech_probs, threshold
+    ):
+        """根据本包的结果更新噪声底和hangover；speech_probs为None表示本包被跳过"""
+        if speech_probs is None:
+            # 被跳过的块都低于门限，噪声底只向下跟踪
+            quiet = float(np.min(rms))
+            if quiet < state.noise_floor:
+                state.noise_floor = max(
+                    0.9 * state.noise_floor + 0.1 * quiet, MIN_NOISE_FLOOR
+                )
+            return
+
+        for chunk_rms, speech_prob in zip(rms.tolist(), speech_probs):
+            if speech_prob >= threshold:
+                state.hangover = self.hangover_chunks
+                continue
+            state.hangover = max(0, state.hangover - 1)
+            # 模型确认的静音块用于估计噪声底：下降快、上升慢
+            if speech_prob < threshold / 2:
+                chunk_rms = max(chunk_rms, MIN_NOISE_FLOOR)
+                if state.noise_floor is None:
+                    state.noise_floor = chunk_rms
+                elif chunk_rms < state.noise_floor:
+                    state.noise_floor = 0.9 * state.noise_floor + 0.1 * chunk_rms
+                else:
+                    state.noise_floor = 0.98 * state.noise_floor + 0.02 * chunk_rms
+
+
+class _VADRequest:
+    def __init__(self, state: SileroConnectionState, chunks: np.ndarray):
+        self.state = state
+        self.chunks = chunks
+        self.future = Future()
+
+
+class SileroBatchEngine:
+    """
+    跨连接批量推理引擎
+    在独立线程中收集所有连接待处理的32ms音频块，每个tick合并为一个批量推理一次，
+    由子类的_forward按连接拼接/拆分RNN状态，再把语音概率分发回各连接
+    """
+
+    def __init__(self, batch_window_ms: float = 2, max_batch_size: int = 64):
+        self.batch_window = max(batch_window_ms, 0) / 1000
+        self.max_batch_size = max(max_batch_size, 1)
+        self.requests = queue.Queue()
+        self.thread = threading.Thread(
+            target=self._run, name="silero-vad-batch", daemon=True
+        )
+        self.thread.start()
+
+    def submit(self, state: SileroConnectionState, chunks: np.ndarray) -> Future:
+        """提交一个连接的若干音频块（形状为[n, 512]的float32数组），返回每块语音概率的Future"""
+        request = _VADRequest(state, chunks)
+        if len(chunks) == 0:
+            request.future.set_result([])
+        else:
+            self.requests.put(request)
+        return request.future
+
+    def _collect(self, pending: list) -> list:
+        """收集一个tick内到达的请求"""
+        if not pending:
+            pending.append(self.requests.get())
+        deadline = time.monotonic() + self.batch_window
+        while len(pending) < self.max_batch_size:
+            try:
+                timeout = deadline - time.monotonic()
+                if timeout > 0:
+                    pending.append(self.requests.get(timeout=timeout))
+                else:
+                    pending.append(self.requests.get_nowait())
+            except queue.Empty:
+                break
+        return pending
+
+    def _run(self):
+        apply_thread_budget("vad")
+        pending = []
+        while True:
+            pending = self._collect(pending)
+            # 同一连接的请求必须按顺序推理，重复的留到下一个tick
+            batch, deferred, seen = [], [], set()
+            for request in pending:
+                if id(request.state) in seen or len(batch) >= self.max_batch_size:
+                    deferred.append(request)
+                else:
+                    seen.add(id(request.state))
+                    batch.append(request)
+            pending = deferred
+            try:
+                self._infer(batch)
+            except Exception as e:
+                logger.bind(tag=TAG).error(f"VAD批量推理失败: {e}")
+                for request in batch:
+                    if not request.future.done():
+                        request.future.set_exception(e)
+
+    def _infer(self, batch: list):
+        probs = [[] for _ in batch]
+        active = list(range(len(batch)))
+        step = 0
+        while active:
+            audio = np.stack([batch[i].chunks[step] for i in active])
+            out = self._forward(audio, [batch[i].state for i in active])
+            for j, i in enumerate(active):
+                probs[i].append(out[j])
+
+            step += 1
+            active = [i for i in active if len(batch[i].chunks) > step]
+
+        for request, request_probs in zip(batch, probs):
+            request.future.set_result(request_probs)
+
+    def _forward(
+        self, audio: np.ndarray, states: List[SileroConnectionState]
+    ) -> list:
+        """
+        以各连接的状态执行一次批量推理，audio形状为[batch, 512]
+        返回每个连接的语音概率，并把更新后的状态写回states
+        """
+        raise NotImplementedError
+
+
+class SileroVADProviderBase(VADProviderBase):
+    """Silero VAD提供者的公共实现，子类需在调用本类__init__之前加载模型"""
+
+    def __init__(self, config):
+        # 处理空字符串的情况
+        threshold = config.get("threshold", "0.5")
+        min_silence_duration_ms = config.get("min_silence_duration_ms", "1000")
+        speculative_silence_ms = config.get("speculative_silence_ms", "0")
+        speech_pad_ms = config.get("speech_pad_ms", "300")
+
+        self.vad_threshold = float(threshold) if threshold else 0.5
+        self.silence_threshold_ms = (
+            int(min_silence_duration_ms) if min_silence_duration_ms else 1000
+        )
+        # 短暂停顿阈值，达到后提前开始推测式识别与对话，0表示不启用
+        self.pause_threshold_ms = (
+            int(speculative_silence_ms) if speculative_silence_ms else 0
+        )
+        if self.pause_threshold_ms >= self.silence_threshold_ms:
+            self.pause_threshold_ms = 0
+        # 送入ASR前在语音段前后保留的余白（采样点数），其余静音裁掉
+        self.speech_pad_samples = (
+            int(speech_pad_ms) if speech_pad_ms not in (None, "") else 300
+        ) * SAMPLE_RATE // 1000
+
+        # 能量门限：明显低于背景噪声的音频块不经过模型
+        energy_gate = str(config.get("energy_gate", True)).lower() in (
+            "true",
+            "1",
+            "yes",
+        )
+        energy_gate_ratio = config.get("energy_gate_ratio", "2.0")
+        energy_gate_hangover_ms = config.get("energy_gate_hangover_ms", "2000")
+        self.energy_gate = None
+        if energy_gate:
+            self.energy_gate = EnergyGate(
+                float(energy_gate_ratio) if energy_gate_ratio else 2.0,
+                (int(energy_gate_hangover_ms) if energy_gate_hangover_ms else 2000)
+                // CHUNK_MS,
+            )
+
+        batch_window_ms = config.get("batch_window_ms", "2")
+        max_batch_size = config.get("max_batch_size", "64")
+        self.engine = self.create_engine(
+            batch_window_ms=float(batch_window_ms) if batch_window_ms else 2,
+            max_batch_size=int(max_batch_size) if max_batch_size else 64,
+        )
+
+    def create_engine(
+        self, batch_window_ms: float, max_batch_size: int
+    ) -> SileroBatchEngine:
+        """创建绑定已加载模型的批量推理引擎"""
+        raise NotImplementedError
+
+    def create_state(self) -> SileroConnectionState:
+        """创建一个连接的初始状态"""
+        raise NotImplementedError
+
+    def _get_state(self, conn) -> SileroConnectionState:
+        """获取连接的VAD状态，不存在时创建"""
+        state = getattr(conn, "vad_state", None)
+        if state is None:
+            state = self.create_state()
+            if self.energy_gate is not None:
+                # 连接开始时先让模型连续处理一段时间，使RNN状态和噪声底都稳定下来
+                state.hangover = self.energy_gate.hangover_chunks
+            conn.vad_state = state
+        return state
+
+    def _prepare_chunks(self, conn, state, opus_packet) -> np.ndarray:
+        """解码Opus包写入连接的PCM缓冲区，并取出所有尚未检测的完整512采样点音频块"""
+        pcm_frame = state.decoder.decode(opus_packet, 960)
+        conn.pcm_buffer.append(pcm_frame)  # 将新数据加入缓冲区
+
+        start = max(conn.vad_read_index, conn.pcm_buffer.start)
+        chunk_count = (conn.pcm_buffer.end - start) // CHUNK_SAMPLES
+        if chunk_count == 0:
+            conn.vad_read_index = start
+            return np.empty((0, CHUNK_SAMPLES), dtype=np.float32)
+
+        end = start + chunk_count * CHUNK_SAMPLES
+        conn.vad_read_index = end
+        # 结果位于缓冲区复用的float32临时数组中，同一连接的下一个包要等本次推理完成后才会处理
+        return conn.pcm_buffer.read_float32(start, end).reshape(
+            chunk_count, CHUNK_SAMPLES
+        )
+
+    def _update_voice_state(self, conn, speech_probs, start: int) -> bool:
+        """
+        根据每个音频块的语音概率更新连接的说话状态
+        start为第一个音频块在pcm_buffer中的绝对索引，用于记录语音段的起止位置
+        """
+        # 确保帧计数器存在
+        if not hasattr(conn, "client_voice_frame_count"):
+            conn.client_voice_frame_count = 0
+
+        client_have_voice = False
+        for i, speech_prob in enumerate(speech_probs):
+            is_voice = speech_prob >= self.vad_threshold
+            chunk_end = start + (i + 1) * CHUNK_SAMPLES
+
+            if is_voice:
+                conn.client_voice_frame_count += 1
+            else:
+                conn.client_voice_frame_count = 0
+
+            # 只有连续4帧检测到语音才认为有语音
+            client_have_voice = conn.client_voice_frame_count >= 4
+
+            # 语音段从连续语音帧的第一帧开始，到最后一个语音帧结束
+            if client_have_voice and conn.speech_start_index is None:
+                conn.speech_start_index = chunk_end - 4 * CHUNK_SAMPLES
+            if is_voice and conn.speech_start_index is not None:
+                conn.speech_end_index = chunk_end
+
+            # 如果之前有声音，但本次没有声音，且与上次有声音的时间差已经超过了静默阈值，则认为已经说完一句话
+            if conn.client_have_voice and not client_have_voice:
+                stop_duration = time.time() * 1000 - conn.last_activity_time
+                if stop_duration >= self.silence_threshold_ms:
+                    conn.client_voice_stop = True
+                elif (
+                    self.pause_threshold_ms > 0
+                    and stop_duration >= self.pause_threshold_ms
+                ):
+                    conn.client_voice_pause = True
+            if client_have_voice:
+                conn.client_have_voice = True
+                conn.client_voice_pause = False
+                conn.last_activity_time = time.time() * 1000
+
+        return client_have_voice
+
+    def get_speech_range(self, conn) -> Optional[Tuple[int, int]]:
+        if conn.speech_start_index is None or conn.speech_end_index is None:
+            return None
+        return (
+            conn.speech_start_index - self.speech_pad_samples,
+            conn.speech_end_index + self.speech_pad_samples,
+        )
+
+    def _gate(self, conn, state, chunks, start: int):
+        """
+        能量门限判定，返回(各块的RMS, 送入模型的音频块, 补送的块数)
+        本包被跳过时送入模型的音频块为None
+        """
+        if self.energy_gate is None or len(chunks) == 0:
+            return None, chunks, 0
+        rms = np.sqrt(np.mean(np.square(chunks), axis=1))
+        if not self.energy_gate.select(conn, state, rms):
+            state.skipped_chunks += len(chunks)
+            metrics.inc_counter("vad.frames_skipped", len(chunks))
+            return rms, None, 0
+
+        # 跳过之后重新推理：先补送缓冲区中最近被跳过的音频，结果丢弃
+        warmup = 0
+        if state.skipped_chunks > 0:
+            warmup_start = max(
+                start - min(state.skipped_chunks, WARMUP_CHUNKS) * CHUNK_SAMPLES,
+                conn.pcm_buffer.start,
+            )
+            warmup = (start - warmup_start) // CHUNK_SAMPLES
+            if warmup > 0:
+                history = conn.pcm_buffer.samples(
+                    start - warmup * CHUNK_SAMPLES, start
+                ).astype(np.float32)
+                history *= INT16_SCALE
+                chunks = np.concatenate(
+                    [history.reshape(warmup, CHUNK_SAMPLES), chunks]
+                )
+            state.skipped_chunks = 0
+        metrics.inc_counter("vad.frames_evaluated", len(chunks))
+        return rms, chunks, warmup
+
+    def _finish(self, conn, state, rms, speech_probs, warmup: int, start: int) -> bool:
+        """更新能量门限状态，被跳过的块按静音处理"""
+        if rms is None:
+            return self._update_voice_state(conn, speech_probs, start)
+        if speech_probs is None:
+            self.energy_gate.update(state, rms, None, self.vad_threshold)
+            speech_probs = [0.0] * len(rms)
+        else:
+            speech_probs = speech_probs[warmup:]
+            self.energy_gate.update(state, rms, speech_probs, self.vad_threshold)
+        return self._update_voice_state(conn, speech_probs, start)
+
+    def is_vad(self, conn, opus_packet):
+        try:
+            state = self._get_state(conn)
+            chunks = self._prepare_chunks(conn, state, opus_packet)
+            start = conn.vad_read_index - len(chunks) * CHUNK_SAMPLES
+            rms, model_input, warmup = self._gate(conn, state, chunks, start)
+            speech_probs = None
+            if model_input is not None:
+                speech_probs = self.engine.submit(state, model_input).result()
+            return self._finish(conn, state, rms, speech_probs, warmup, start)
+        except opuslib_next.OpusError as e:
+            logger.bind(tag=TAG).info(f"解码错误: {e}")
+        except Exception as e:
+            logger.bind(tag=TAG).error(f"Error processing audio packet: {e}")
+
+    async def is_vad_async(self, conn, opus_packet):
+        try:
+            state = self._get_state(conn)
+            chunks = self._prepare_chunks(conn, state, opus_packet)
+            start = conn.vad_read_index - len(chunks) * CHUNK_SAMPLES
+            rms, model_input, warmup = self._gate(conn, state, chunks, start)
+            speech_probs = None
+            if model_input is not None:
+                speech_probs = await asyncio.wrap_future(
+                    self.engine.submit(state, model_input)
+                )
+            return self._finish(conn, state, rms, speech_probs, warmup, start)
+        except opuslib_next.OpusError as e:
+            logger.bind(tag=TAG).info(f"解码错误: {e}")
+        except Exception as e:
+            logger.bind(tag=TAG).error(f"Error processing audio packet: {e}")
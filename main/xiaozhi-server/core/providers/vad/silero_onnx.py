@@ -0,0 +1,84 @@
+import os
+from typing import List
+import numpy as np
+import onnxruntime
+from config.logger import setup_logging
+from core.providers.vad.silero_base import (
+    SAMPLE_RATE,
+    CONTEXT_SAMPLES,
+    SileroBatchEngine,
+    SileroConnectionState,
+    SileroVADProviderBase,
+)
+from core.utils.runtime import onnx_session_options
+
+TAG = __name__
+logger = setup_logging()
+
+DEFAULT_MODEL_FILE = os.path.join("src", "silero_vad", "data", "silero_vad.onnx")
+
+
+class OnnxSileroBatchEngine(SileroBatchEngine):
+    """
+    使用onnxruntime运行Silero VAD的ONNX导出模型
+    RNN状态和上下文以numpy数组显式传入、传出，不依赖torch
+    """
+
+    def __init__(
+        self,
+        session: onnxruntime.InferenceSession,
+        batch_window_ms: float = 2,
+        max_batch_size: int = 64,
+    ):
+        self.session = session
+        self.sample_rate = np.array(SAMPLE_RATE, dtype=np.int64)
+        super().__init__(batch_window_ms, max_batch_size)
+
+    def _forward(
+        self, audio: np.ndarray, states: List[SileroConnectionState]
+    ) -> list:
+        """以指定的批量状态执行一次推理，返回语音概率并写回更新后的状态"""
+        rnn_state = np.concatenate([state.rnn_state for state in states], axis=1)
+        context = np.concatenate([state.context for state in states], axis=0)
+        # 模型输入为上一块末尾的64个采样点加上本块的512个采样点
+        audio = np.concatenate([context, audio], axis=1)
+        out, rnn_state = self.session.run(
+            None, {"input": audio, "state": rnn_state, "sr": self.sample_rate}
+        )
+
+        for j, state in enumerate(states):
+            state.rnn_state = rnn_state[:, j : j + 1]
+            state.context = audio[j : j + 1, -CONTEXT_SAMPLES:]
+        return out.reshape(-1).tolist()
+
+
+class VADProvider(SileroVADProviderBase):
+    def __init__(self, config):
+        logger.bind(tag=TAG).info("SileroVAD(onnxruntime)", config)
+        model_path = config.get("model_path") or os.path.join(
+            config["model_dir"], DEFAULT_MODEL_FILE
+        )
+        if not os.path.isfile(model_path):
+            raise FileNotFoundError(f"Silero VAD的ONNX模型不存在: {model_path}")
+        # 线程数取runtime配置中vad类别的预算
+        self.session = onnxruntime.InferenceSession(
+            model_path,
+            sess_options=onnx_session_options("vad"),
+            providers=["CPUExecutionProvider"],
+        )
+        super().__init__(config)
+
+    def create_engine(
+        self, batch_window_ms: float, max_batch_size: int
+    ) -> SileroBatchEngine:
+        return OnnxSileroBatchEngine(
+            self.session,
+            batch_window_ms=batch_window_ms,
+            max_batch_size=max_batch_size,
+        )
+
+    def create_state(self) -> SileroConnectionState:
+        return SileroConnectionState(
+            np.zeros((2, 1, 128), dtype=np.float32),
+            np.zeros((1, CONTEXT_SAMPLES), dtype=np.float32),
+        )
@@ -0,0 +1,63 @@
+"""
+静态音频资源缓存
+config/assets下的提示音在首次使用（或启动预加载）时转码为Opus数据包，之后直接返回缓存的不可变列表，
+文件的修改时间或大小变化时自动重新转码
+"""
+
+import os
+import threading
+from typing import Dict, Tuple
+from config.logger import setup_logging
+from core.utils.util import audio_to_data
+
+TAG = __name__
+logger = setup_logging()
+
+ASSETS_DIR = "config/assets"
+AUDIO_EXTENSIONS = (".wav", ".mp3", ".ogg", ".opus", ".m4a", ".aac", ".flac")
+
+# (绝对路径, 是否Opus) -> (文件修改时间, 文件大小, 数据包元组, 时长)
+_asset_cache: Dict[Tuple[str, bool], Tuple[int, int, tuple, float]] = {}
+_asset_cache_lock = threading.Lock()
+
+
+def get_asset_audio(file_path: str, is_opus: bool = True) -> Tuple[tuple, float]:
+    """
+    获取音频资源的数据包和时长
+    返回的数据包为元组，多个连接共享同一份缓存，调用方不得修改
+    """
+    path = os.path.abspath(file_path)
+    stat = os.stat(path)
+    key = (path, is_opus)
+    cached = _asset_cache.get(key)
+    if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+        return cached[2], cached[3]
+
+    packets, duration = audio_to_data(path, is_opus=is_opus)
+    packets = tuple(packets)
+    with _asset_cache_lock:
+        _asset_cache[key] = (stat.st_mtime_ns, stat.st_size, packets, duration)
+    if cached:
+        logger.bind(tag=TAG).info(f"音频资源已更新，重新转码: {file_path}")
+    return packets, duration
+
+
+def preload_assets(assets_dir: str = ASSETS_DIR):
+    """预先转码目录下的所有音频资源"""
+    count = 0
+    for root, _, files in os.walk(assets_dir):
+        for name in files:
+            if not name.lower().endswith(AUDIO_EXTENSIONS):
+                continue
+            try:
+                get_asset_audio(os.path.join(root, name))
+                count += 1
+            except Exception as e:
+                logger.bind(tag=TAG).warning(f"音频资源预加载失败: {name}, {e}")
+    logger.bind(tag=TAG).info(f"音频资源预加载完成，共{count}个")
+
+
+def clear_asset_cache():
+    """清空资源缓存"""
+    with _asset_cache_lock:
+        _asset_cache.clear()
@@ -0,0 +1,142 @@
+"""
+连接级PCM缓冲区
+每个上行Opus包只解码一次写入缓冲区，VAD与ASR都从这里读取，
+采样点使用从连接开始累计的绝对索引，丢弃旧数据后索引保持不变
+"""
+
+import numpy as np
+
+# 16kHz单声道16位PCM
+SAMPLE_RATE = 16000
+SAMPLE_WIDTH = 2
+
+INT16_SCALE = np.float32(1.0 / 32768.0)
+
+# 初始容量：静音期间只保留ASR前置音频（10个60ms包），再加一个包的写入余量；
+# 说话时由扩容逻辑按需加倍，不为每个连接预先分配长时间的缓冲区
+DEFAULT_INITIAL_SECONDS = 0.66
+
+
+class PcmBuffer:
+    """
+    预分配的int16采样缓冲区
+    写入时直接拷贝到预分配数组中，丢弃旧数据只移动起始偏移，空间不足时才整理或扩容；
+    VAD读取时转换到复用的float32临时数组，逐帧处理不再产生新的内存分配
+    """
+
+    def __init__(
+        self, max_seconds: float = 120, initial_seconds: float = DEFAULT_INITIAL_SECONDS
+    ):
+        self.max_samples = int(max_seconds * SAMPLE_RATE)
+        self._initial_capacity = max(int(initial_seconds * SAMPLE_RATE), 1)
+        self._samples = np.zeros(self._initial_capacity, dtype=np.int16)
+        # 有效数据在数组中的起始偏移和长度
+        self._head = 0
+        self._size = 0
+        # 有效数据第一个采样点的绝对索引
+        self._start = 0
+        self._scratch = np.zeros(0, dtype=np.float32)
+
+    @property
+    def start(self) -> int:
+        """缓冲区中最早一个采样点的绝对索引"""
+        return self._start
+
+    @property
+    def end(self) -> int:
+        """缓冲区末尾的绝对索引（下一个写入采样点的索引）"""
+        return self._start + self._size
+
+    def __len__(self) -> int:
+        """缓冲区中的采样点数"""
+        return self._size
+
+    def _reserve(self, count: int):
+        """保证数组尾部有count个采样点的空闲空间"""
+        if self._head + self._size + count <= len(self._samples):
+            return
+        if self._size + count <= len(self._samples):
+            # 把有效数据移到数组开头
+            self._samples[: self._size] = self._samples[
+                self._head : self._head + self._size
+            ]
+        else:
+            capacity = len(self._samples)
+            while capacity < self._size + count:
+                capacity *= 2
+            samples = np.zeros(capacity, dtype=np.int16)
+            samples[: self._size] = self._samples[self._head : self._head + self._size]
+            self._samples = samples
+        self._head = 0
+
+    def append(self, pcm: bytes):
+        """追加PCM数据，超过容量上限时丢弃最早的数据"""
+        frame = np.frombuffer(pcm, dtype=np.int16)
+        count = len(frame)
+        if count == 0:
+            return
+        self._reserve(count)
+        offset = self._head + self._size
+        self._samples[offset : offset + count] = frame
+        self._size += count
+        overflow = self._size - self.max_samples
+        if overflow > 0:
+            self.discard_before(self._start + overflow)
+
+    def _offsets(self, start: int, end: int):
+        """把绝对索引转换为数组偏移，超出缓冲区的部分会被截断"""
+        start = max(start, self._start) - self._start + self._head
+        end = min(end, self.end) - self._start + self._head
+        return start, max(start, end)
+
+    def samples(self, start: int, end: int) -> np.ndarray:
+        """按绝对索引返回一段int16采样的视图，视图在下一次写入前有效"""
+        start, end = self._offsets(start, end)
+        return self._samples[start:end]
+
+    def read(self, start: int, end: int) -> bytes:
+        """按绝对索引读取一段PCM数据的副本"""
+        return self.samples(start, end).tobytes()
+
+    def read_float32(self, start: int, end: int) -> np.ndarray:
+        """
+        按绝对索引读取一段归一化到[-1, 1)的float32采样
+        结果写入复用的临时数组，在下一次调用前有效
+        """
+        samples = self.samples(start, end)
+        count = len(samples)
+        if len(self._scratch) < count:
+            self._scratch = np.zeros(max(count, len(self._scratch) * 2), dtype=np.float32)
+        out = self._scratch[:count]
+        np.multiply(samples, INT16_SCALE, out=out)
+        return out
+
+    def discard_before(self, index: int):
+        """丢弃绝对索引index之前的数据"""
+        count = min(index, self.end) - self._start
+        if count > 0:
+            self._head += count
+            self._size -= count
+            self._start += count
+            if self._size == 0:
+                self._head = 0
+
+    def keep_last(self, samples: int):
+        """只保留最近的samples个采样点"""
+        self.discard_before(self.end - samples)
+
+    def detach(self) -> memoryview:
+        """
+        取出缓冲区中的全部数据并清空缓冲区，不复制数据
+        返回的memoryview引用原有内存，之后写入的新数据使用新分配的数组，索引继续累计
+        """
+        data = memoryview(self._samples[self._head : self._head + self._size]).cast("B")
+        self._samples = np.zeros(self._initial_capacity, dtype=np.int16)
+        self._start = self.end
+        self._head = 0
+        self._size = 0
+        return data
+
+    def clear(self):
+        """清空缓冲区，索引继续累计"""
+        self.discard_before(self.end)
@@ -0,0 +1,375 @@
+"""
+音频解码层
+WAV与原始PCM在进程内用NumPy解析并重采样为16kHz单声道，不再启动ffmpeg；
+MP3/OGG等压缩格式交给预先启动的ffmpeg进程解码，进程创建开销不在请求路径上
+"""
+
+import os
+import math
+import struct
+import threading
+import subprocess
+import numpy as np
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+from pydub import AudioSegment
+from config.logger import setup_logging
+
+TAG = __name__
+logger = setup_logging()
+
+TARGET_SAMPLE_RATE = 16000
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+# 这些格式可以在进程内直接解析
+RAW_PCM_TYPES = ("pcm", "raw", "s16le")
+
+
+class UnsupportedWavError(ValueError):
+    """WAV编码不在进程内解析范围内（如ADPCM），需要交给ffmpeg"""
+
+
+def _parse_wav_chunks(data: bytes) -> Tuple[tuple, bytes]:
+    """解析WAV头，返回(编码格式, 声道数, 采样率, 位深)和原始数据块"""
+    if len(data) < 12 or data[:4] != b"RIFF" or data[8:12] != b"WAVE":
+        raise UnsupportedWavError("不是有效的WAV数据")
+
+    offset = 12
+    fmt = None
+    while offset + 8 <= len(data):
+        chunk_id = data[offset : offset + 4]
+        chunk_size = struct.unpack_from("<I", data, offset + 4)[0]
+        body = offset + 8
+        if chunk_id == b"fmt ":
+            audio_format, channels, sample_rate = struct.unpack_from("<HHI", data, body)
+            bits = struct.unpack_from("<H", data, body + 14)[0]
+            if audio_format == WAVE_FORMAT_EXTENSIBLE and chunk_size >= 26:
+                audio_format = struct.unpack_from("<H", data, body + 24)[0]
+            fmt = (audio_format, max(channels, 1), sample_rate, bits)
+        elif chunk_id == b"data":
+            if fmt is None:
+                raise UnsupportedWavError("WAV缺少fmt块")
+            # 流式返回的WAV头中数据长度常为0或0xFFFFFFFF，此时读取到末尾
+            end = body + chunk_size
+            if chunk_size in (0, 0xFFFFFFFF) or end > len(data):
+                end = len(data)
+            return fmt, data[body:end]
+        offset = body + chunk_size + (chunk_size & 1)
+    raise UnsupportedWavError("WAV缺少data块")
+
+
+def parse_wav(data: bytes) -> Tuple[np.ndarray, int, int]:
+    """
+    解析WAV字节数据
+    Returns:
+        (float32采样数组[采样点, 声道], 采样率, 声道数)
+    """
+    (audio_format, channels, sample_rate, bits), raw = _parse_wav_chunks(data)
+    samples = _decode_samples(raw, audio_format, bits)
+    samples = samples[: len(samples) - len(samples) % channels]
+    return samples.reshape(-1, channels), sample_rate, channels
+
+
+def _decode_samples(raw: bytes, audio_format: int, bits: int) -> np.ndarray:
+    """把WAV数据块转换为float32采样"""
+    if audio_format == WAVE_FORMAT_PCM:
+        if bits == 16:
+            samples = np.frombuffer(raw[: len(raw) - len(raw) % 2], dtype="<i2")
+            return samples.astype(np.float32) / 32768.0
+        if bits == 8:
+            samples = np.frombuffer(raw, dtype=np.uint8)
+            return (samples.astype(np.float32) - 128.0) / 128.0
+        if bits == 24:
+            raw = raw[: len(raw) - len(raw) % 3]
+            triplets = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+            samples = triplets[:, 0] | (triplets[:, 1] << 8) | (triplets[:, 2] << 16)
+            samples = np.where(samples >= 1 << 23, samples - (1 << 24), samples)
+            return samples.astype(np.float32) / float(1 << 23)
+        if bits == 32:
+            samples = np.frombuffer(raw[: len(raw) - len(raw) % 4], dtype="<i4")
+            return samples.astype(np.float32) / float(1 << 31)
+    elif audio_format == WAVE_FORMAT_IEEE_FLOAT:
+        if bits == 32:
+            return np.frombuffer(raw[: len(raw) - len(raw) % 4], dtype="<f4").astype(
+                np.float32
+            )
+        if bits == 64:
+            return np.frombuffer(raw[: len(raw) - len(raw) % 8], dtype="<f8").astype(
+                np.float32
+            )
+    raise UnsupportedWavError(f"不支持的WAV编码: format={audio_format}, bits={bits}")
+
+
+# 重采样低通滤波器：单侧零交叉数、Kaiser窗参数、截止频率相对目标奈奎斯特频率的比例
+RESAMPLE_ZERO_CROSSINGS = 16
+RESAMPLE_KAISER_BETA = 8.6
+RESAMPLE_ROLLOFF = 0.94
+# 多相滤波器相位数上限，采样率比值的分母超过时按此精度量化相位
+RESAMPLE_MAX_PHASES = 4096
+
+
+@lru_cache(maxsize=16)
+def _resample_filter(src_rate: int, dst_rate: int) -> Tuple[int, int, int, np.ndarray]:
+    """
+    设计src_rate到dst_rate的多相低通滤波器（Kaiser窗sinc）
+    Returns:
+        (up, down, phases, 滤波器系数[相位, 抽头])，抽头数为2 * half_width
+    """
+    divisor = math.gcd(src_rate, dst_rate)
+    up, down = dst_rate // divisor, src_rate // divisor
+    phases = min(up, RESAMPLE_MAX_PHASES)
+    # 截止频率（以输入采样率为1的归一化频率的2倍），降采样时低于目标奈奎斯特频率以抑制混叠
+    cutoff = min(1.0, dst_rate / src_rate) * RESAMPLE_ROLLOFF
+    half_width = int(math.ceil(RESAMPLE_ZERO_CROSSINGS / cutoff))
+    taps = np.arange(2 * half_width, dtype=np.float64)
+    # 第p个相位、第k个抽头对应的时间差（单位：输入采样点）
+    offsets = (
+        np.arange(phases, dtype=np.float64)[:, None] / phases
+        + (half_width - 1)
+        - taps[None, :]
+    )
+    window = np.i0(
+        RESAMPLE_KAISER_BETA * np.sqrt(np.clip(1 - (offsets / half_width) ** 2, 0, 1))
+    ) / np.i0(RESAMPLE_KAISER_BETA)
+    kernel = cutoff * np.sinc(cutoff * offsets) * window
+    # 每个相位单独归一化，保证直流增益为1
+    kernel /= kernel.sum(axis=1, keepdims=True)
+    return up, down, phases, kernel.astype(np.float32)
+
+
+def resample(samples: np.ndarray, src_rate: int, dst_rate: int = TARGET_SAMPLE_RATE) -> np.ndarray:
+    """
+    带抗混叠低通滤波的多相重采样，输入输出均为一维float32数组
+    降采样时先滤除目标奈奎斯特频率以上的成分，避免高频折叠到可听频段
+    """
+    if src_rate == dst_rate or len(samples) == 0:
+        return samples
+    up, down, phases, kernel = _resample_filter(src_rate, dst_rate)
+    taps = kernel.shape[1]
+    half_width = taps // 2
+    dst_length = int(round(len(samples) * dst_rate / src_rate))
+
+    # 第n个输出点位于输入的n * down / up处：整数部分为base，小数部分量化为相位
+    positions = np.arange(dst_length, dtype=np.int64) * down
+    base = positions // up
+    phase = (positions % up * phases + up // 2) // up
+    wrapped = phase == phases
+    base[wrapped] += 1
+    phase[wrapped] = 0
+
+    padded = np.concatenate(
+        [
+            np.zeros(half_width, dtype=np.float32),
+            samples.astype(np.float32, copy=False),
+            np.zeros(half_width + 2, dtype=np.float32),
+        ]
+    )
+    # 抽头k对应输入采样点base + k - (half_width - 1)，在padded中的索引为base + k + 1
+    base += 1
+    output = np.zeros(dst_length, dtype=np.float32)
+    for k in range(taps):
+        output += padded[base + k] * kernel[phase, k]
+    return output
+
+
+def to_pcm16(samples: np.ndarray) -> bytes:
+    """float32采样转换为16位小端PCM字节"""
+    return np.clip(samples * 32768.0, -32768, 32767).astype("<i2").tobytes()
+
+
+def wav_to_pcm(data: bytes) -> bytes:
+    """WAV转换为16kHz单声道16位PCM"""
+    (audio_format, channels, sample_rate, bits), raw = _parse_wav_chunks(data)
+    if (
+        audio_format == WAVE_FORMAT_PCM
+        and bits == 16
+        and channels == 1
+        and sample_rate == TARGET_SAMPLE_RATE
+    ):
+        # 已经是目标格式时直接返回原始数据
+        return bytes(raw[: len(raw) - len(raw) % 2])
+    samples = _decode_samples(raw, audio_format, bits)
+    samples = samples[: len(samples) - len(samples) % channels].reshape(-1, channels)
+    mono = samples.mean(axis=1) if channels > 1 else samples[:, 0]
+    return to_pcm16(resample(mono, sample_rate))
+
+
+# 流式输入时传给ffmpeg的格式名（-f），未列出的格式由ffmpeg自动识别
+FFMPEG_INPUT_FORMATS = {
+    "mp3": "mp3",
+    "wav": "wav",
+    "ogg": "ogg",
+    "opus": "ogg",
+    "aac": "aac",
+    "flac": "flac",
+}
+
+
+def ffmpeg_input_format(file_type: str) -> Optional[str]:
+    """文件类型对应的ffmpeg输入格式名，无法确定时返回None（自动识别）"""
+    return FFMPEG_INPUT_FORMATS.get((file_type or "").lower().lstrip("."))
+
+
+def ffmpeg_decode_command(input_format: Optional[str] = None, source: str = "pipe:0") -> list:
+    """把source解码为16kHz单声道PCM并输出到stdout的ffmpeg命令"""
+    command = [AudioSegment.converter, "-hide_banner", "-loglevel", "error"]
+    if input_format:
+        command += ["-f", input_format]
+    return command + [
+        "-i",
+        source,
+        "-ac",
+        "1",
+        "-ar",
+        str(TARGET_SAMPLE_RATE),
+        "-f",
+        "s16le",
+        "pipe:1",
+    ]
+
+
+def decode_file_with_ffmpeg(file_path: str, nice: int = 0) -> bytes:
+    """
+    启动独立的ffmpeg进程解码音频文件，不占用共享的进程池
+    nice大于0时在子进程中调低调度优先级，用于后台批量转码
+    """
+    preexec_fn = None
+    if nice > 0 and hasattr(os, "nice"):
+        preexec_fn = lambda: os.nice(nice)
+    input_format = ffmpeg_input_format(os.path.splitext(file_path)[1])
+    result = subprocess.run(
+        ffmpeg_decode_command(input_format, file_path),
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        preexec_fn=preexec_fn,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(
+            f"ffmpeg解码失败: {result.stderr.decode('utf-8', errors='ignore').strip()}"
+        )
+    return result.stdout
+
+
+class FfmpegWorkerPool:
+    """
+    预先启动的ffmpeg解码进程池
+    每个进程从stdin读取压缩音频，向stdout输出16kHz单声道PCM，
+    取走一个进程后由池内唯一的补充线程在后台补足，请求路径上不再等待进程创建
+    input_format为None时由ffmpeg自动识别格式（整段解码用）；
+    流式解码需指定格式，省去格式探测的等待
+    capture_stderr为False时stderr丢弃，用于持续写入、不读取错误输出的流式解码
+    """
+
+    def __init__(
+        self,
+        size: int = 2,
+        input_format: Optional[str] = None,
+        capture_stderr: bool = True,
+    ):
+        self.size = max(size, 1)
+        self.input_format = input_format
+        self.capture_stderr = capture_stderr
+        self.lock = threading.Lock()
+        self.idle = []
+        self._replenish()
+        # 只有补充线程创建空闲进程，并发取用时也不会超出size
+        self.wakeup = threading.Event()
+        threading.Thread(
+            target=self._run_replenisher, name="ffmpeg-prespawn", daemon=True
+        ).start()
+
+    def _spawn(self) -> subprocess.Popen:
+        return subprocess.Popen(
+            ffmpeg_decode_command(self.input_format),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE if self.capture_stderr else subprocess.DEVNULL,
+        )
+
+    def _replenish(self):
+        try:
+            while True:
+                with self.lock:
+                    if len(self.idle) >= self.size:
+                        return
+                process = self._spawn()
+                with self.lock:
+                    self.idle.append(process)
+        except Exception as e:
+            logger.bind(tag=TAG).error(f"预启动ffmpeg进程失败: {e}")
+
+    def _run_replenisher(self):
+        while True:
+            self.wakeup.wait()
+            self.wakeup.clear()
+            self._replenish()
+
+    def acquire(self) -> subprocess.Popen:
+        """取出一个空闲的ffmpeg进程，调用方负责写入数据并等待结束"""
+        process = None
+        with self.lock:
+            while self.idle and process is None:
+                candidate = self.idle.pop()
+                if candidate.poll() is None:
+                    process = candidate
+        if process is None:
+            process = self._spawn()
+        self.wakeup.set()
+        return process
+
+    def decode(self, data: bytes) -> bytes:
+        """解码一段完整的压缩音频"""
+        process = self.acquire()
+        stdout, stderr = process.communicate(input=data)
+        if process.returncode != 0:
+            raise RuntimeError(
+                f"ffmpeg解码失败: {stderr.decode('utf-8', errors='ignore').strip()}"
+            )
+        return stdout
+
+
+_ffmpeg_pool: Optional[FfmpegWorkerPool] = None
+_ffmpeg_pool_lock = threading.Lock()
+# 流式解码用的进程池，按输入格式区分
+_stream_pools: Dict[Optional[str], FfmpegWorkerPool] = {}
+
+
+def get_ffmpeg_pool() -> FfmpegWorkerPool:
+    """获取进程内共享的ffmpeg进程池（整段解码，自动识别格式）"""
+    global _ffmpeg_pool
+    if _ffmpeg_pool is None:
+        with _ffmpeg_pool_lock:
+            if _ffmpeg_pool is None:
+                _ffmpeg_pool = FfmpegWorkerPool()
+    return _ffmpeg_pool
+
+
+def get_stream_ffmpeg_pool(file_type: str) -> FfmpegWorkerPool:
+    """获取流式解码用的ffmpeg进程池，进程启动时已指定输入格式，stderr丢弃"""
+    input_format = ffmpeg_input_format(file_type)
+    with _ffmpeg_pool_lock:
+        pool = _stream_pools.get(input_format)
+        if pool is None:
+            pool = FfmpegWorkerPool(input_format=input_format, capture_stderr=False)
+            _stream_pools[input_format] = pool
+        return pool
+
+
+def decode_to_pcm(audio_bytes: bytes, file_type: str) -> bytes:
+    """
+    任意格式音频转换为16kHz单声道16位小端PCM
+    WAV与原始PCM（按16kHz单声道处理）在进程内完成，其他格式交给ffmpeg进程池
+    """
+    file_type = (file_type or "").lower().lstrip(".")
+    if file_type in RAW_PCM_TYPES:
+        return bytes(audio_bytes[: len(audio_bytes) - len(audio_bytes) % 2])
+    if file_type == "wav" or audio_bytes[:4] == b"RIFF":
+        try:
+            return wav_to_pcm(audio_bytes)
+        except UnsupportedWavError as e:
+            logger.bind(tag=TAG).debug(f"WAV无法在进程内解析，改用ffmpeg: {e}")
+    return get_ffmpeg_pool().decode(audio_bytes)
@@ -0,0 +1,75 @@
+"""
+语音识别音频的审计录音
+识别流程只把音频交给后台线程，WAV文件在后台写入磁盘，不再阻塞识别；
+写入积压超过上限时丢弃新的录音，不影响识别本身
+"""
+
+import os
+import wave
+import queue
+import threading
+from typing import List
+from config.logger import setup_logging
+from core.utils import metrics
+
+TAG = __name__
+logger = setup_logging()
+
+DEFAULT_MAX_PENDING = 64
+
+_recorder = None
+_recorder_lock = threading.Lock()
+
+
+class AudioRecorder:
+    """单个后台线程按提交顺序把PCM写成16kHz单声道16位WAV文件"""
+
+    def __init__(self, max_pending: int = DEFAULT_MAX_PENDING):
+        self.tasks = queue.Queue(maxsize=max_pending)
+        self.thread = threading.Thread(
+            target=self._run, name="asr-audio-recorder", daemon=True
+        )
+        self.thread.start()
+
+    def submit(self, file_path: str, pcm_data: List[bytes]) -> bool:
+        """提交一段录音，积压已满时丢弃并返回False"""
+        try:
+            self.tasks.put_nowait((file_path, pcm_data))
+        except queue.Full:
+            metrics.inc_counter("asr.audio_record_dropped")
+            return False
+        metrics.set_gauge("asr.audio_record_pending", self.tasks.qsize())
+        return True
+
+    def _run(self):
+        while True:
+            file_path, pcm_data = self.tasks.get()
+            try:
+                self._write(file_path, pcm_data)
+                metrics.inc_counter("asr.audio_recorded")
+            except Exception as e:
+                metrics.inc_counter("asr.audio_record_failed")
+                logger.bind(tag=TAG).error(f"录音保存失败: {file_path} | 错误: {e}")
+            metrics.set_gauge("asr.audio_record_pending", self.tasks.qsize())
+
+    @staticmethod
+    def _write(file_path: str, pcm_data: List[bytes]):
+        directory = os.path.dirname(file_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with wave.open(file_path, "wb") as wf:
+            wf.setnchannels(1)
+            wf.setsampwidth(2)  # 2字节 = 16位
+            wf.setframerate(16000)
+            for frame in pcm_data:
+                wf.writeframes(frame)
+
+
+def get_audio_recorder() -> AudioRecorder:
+    """获取进程内共享的录音器，首次调用时启动后台线程"""
+    global _recorder
+    if _recorder is None:
+        with _recorder_lock:
+            if _recorder is None:
+                _recorder = AudioRecorder()
+    return _recorder
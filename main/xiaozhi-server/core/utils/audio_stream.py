@@ -0,0 +1,101 @@
+"""
+流式音频解码
+TTS服务返回的编码音频块边到达边写入ffmpeg子进程，后台线程持续读取16kHz单声道PCM并回调，
+不必等待整段音频返回后再统一解码
+"""
+
+import os
+import threading
+from typing import Callable
+from core.utils.audio_decode import RAW_PCM_TYPES, get_stream_ffmpeg_pool
+from config.logger import setup_logging
+
+TAG = __name__
+logger = setup_logging()
+
+# 每次从ffmpeg读取的PCM字节数（约64ms）
+READ_SIZE = 2048
+
+
+class StreamingAudioDecoder:
+    """
+    基于ffmpeg管道的流式解码器
+    feed()写入编码后的音频数据，on_pcm在后台线程中接收解码出的PCM（16kHz/单声道/16位小端）
+    close()结束输入并等待剩余数据全部回调完毕
+    """
+
+    def __init__(self, file_type: str, on_pcm: Callable[[bytes], None]):
+        self.on_pcm = on_pcm
+        self.error = None
+        self.file_type = (file_type or "").lower().lstrip(".")
+        self.process = None
+        self.reader = None
+        # 原始PCM（按16kHz单声道处理）不需要解码，直接按采样点对齐后回调
+        self.remainder = b""
+        if self.file_type in RAW_PCM_TYPES:
+            return
+        # 使用按输入格式预先启动的ffmpeg进程，避免每句话等待进程创建和格式探测
+        self.process = get_stream_ffmpeg_pool(self.file_type).acquire()
+        self.reader = threading.Thread(target=self._read_loop, daemon=True)
+        self.reader.start()
+
+    def _read_loop(self):
+        fd = self.process.stdout.fileno()
+        # 保证回调的PCM数据按采样点对齐
+        remainder = b""
+        try:
+            while True:
+                data = os.read(fd, READ_SIZE)
+                if not data:
+                    break
+                data = remainder + data
+                aligned = len(data) - len(data) % 2
+                remainder = data[aligned:]
+                if aligned:
+                    self.on_pcm(data[:aligned])
+        except Exception as e:
+            self.error = e
+            logger.bind(tag=TAG).error(f"流式解码读取失败: {e}")
+
+    def feed(self, data: bytes):
+        """写入一块编码后的音频数据"""
+        if not data:
+            return
+        if self.process is None:
+            data = self.remainder + data
+            aligned = len(data) - len(data) % 2
+            self.remainder = data[aligned:]
+            if aligned:
+                self.on_pcm(data[:aligned])
+            return
+        self.process.stdin.write(data)
+        self.process.stdin.flush()
+
+    def close(self):
+        """结束输入，等待解码完成"""
+        if self.process is None:
+            return
+        try:
+            if not self.process.stdin.closed:
+                self.process.stdin.close()
+        except BrokenPipeError:
+            pass
+        self.reader.join()
+        self.process.wait()
+        self.process.stdout.close()
+
+    def kill(self):
+        """放弃解码，立即结束子进程"""
+        if self.process is None:
+            return
+        self.process.kill()
+        self.close()
+
+
+def prewarm_stream_decoder(file_type: str):
+    """在后台预先启动对应格式的ffmpeg进程，第一句话的流式合成不再等待进程创建"""
+    if (file_type or "").lower().lstrip(".") in RAW_PCM_TYPES:
+        return
+    threading.Thread(
+        target=get_stream_ffmpeg_pool, args=(file_type,), daemon=True
+    ).start()
@@ -0,0 +1,147 @@
+"""
+进程级异步HTTP客户端
+- TTS等服务的异步调用统一在一个常驻的后台事件循环中执行，不再每句话asyncio.run创建、销毁事件循环
+- 按主机复用httpx.AsyncClient连接池（keep-alive），安装了h2时启用HTTP/2，并限制每个主机的连接数
+"""
+
+import queue
+import asyncio
+import threading
+import importlib.util
+from urllib.parse import urlsplit
+import httpx
+
+DEFAULT_MAX_CONNECTIONS = 20
+DEFAULT_MAX_KEEPALIVE = 10
+DEFAULT_KEEPALIVE_EXPIRY = 30
+DEFAULT_TIMEOUT = 60
+
+_settings = {
+    "max_connections_per_host": DEFAULT_MAX_CONNECTIONS,
+    "max_keepalive_per_host": DEFAULT_MAX_KEEPALIVE,
+    "keepalive_expiry": DEFAULT_KEEPALIVE_EXPIRY,
+    "timeout": DEFAULT_TIMEOUT,
+    "http2": True,
+}
+
+_loop = None
+_loop_lock = threading.Lock()
+_clients = {}
+
+_DONE = object()
+
+
+def configure_http_client(config: dict):
+    """按http_client配置设置连接池参数，需在首次创建客户端之前调用"""
+    http_config = config.get("http_client") or {}
+    for key in _settings:
+        if http_config.get(key) is not None:
+            _settings[key] = http_config[key]
+
+
+def get_background_loop() -> asyncio.AbstractEventLoop:
+    """获取常驻的后台事件循环，首次调用时在守护线程中启动"""
+    global _loop
+    if _loop is None:
+        with _loop_lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(
+                    target=loop.run_forever, name="async-io", daemon=True
+                )
+                thread.start()
+                _loop = loop
+    return _loop
+
+
+def _check_not_in_loop(loop):
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    if running is loop:
+        raise RuntimeError("不能在后台事件循环中同步等待协程结果")
+
+
+def run_coroutine(coro, timeout: float = None):
+    """在后台事件循环中执行协程，并在调用线程中等待结果（替代asyncio.run）"""
+    loop = get_background_loop()
+    _check_not_in_loop(loop)
+    future = asyncio.run_coroutine_threadsafe(coro, loop)
+    try:
+        return future.result(timeout)
+    except BaseException:
+        future.cancel()
+        raise
+
+
+def iterate_async(async_iterable, timeout: float = None):
+    """
+    在后台事件循环中迭代异步生成器，在调用线程中逐个返回数据
+    数据的后续处理（解码、编码等）在调用线程中进行，不占用后台事件循环
+    提前结束迭代时取消后台的迭代任务
+    """
+    loop = get_background_loop()
+    _check_not_in_loop(loop)
+    items = queue.Queue()
+
+    async def pump():
+        try:
+            async for item in async_iterable:
+                items.put((item, None))
+        except Exception as e:
+            items.put((_DONE, e))
+            return
+        items.put((_DONE, None))
+
+    future = asyncio.run_coroutine_threadsafe(pump(), loop)
+    try:
+        while True:
+            try:
+                item, error = items.get(timeout=timeout)
+            except queue.Empty:
+                raise TimeoutError("等待异步数据超时")
+            if item is _DONE:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        future.cancel()
+
+
+def _http2_available() -> bool:
+    return bool(_settings["http2"]) and importlib.util.find_spec("h2") is not None
+
+
+def get_async_client(url: str) -> httpx.AsyncClient:
+    """
+    获取目标主机共享的httpx.AsyncClient
+    客户端绑定后台事件循环，只能在通过run_coroutine/iterate_async执行的协程中使用
+    """
+    parts = urlsplit(url)
+    key = f"{parts.scheme}://{parts.netloc}"
+    client = _clients.get(key)
+    if client is None or client.is_closed:
+        limits = httpx.Limits(
+            max_connections=int(_settings["max_connections_per_host"]),
+            max_keepalive_connections=int(_settings["max_keepalive_per_host"]),
+            keepalive_expiry=float(_settings["keepalive_expiry"]),
+        )
+        # 与requests一致，自动跟随重定向（httpx默认直接返回3xx响应）
+        client = httpx.AsyncClient(
+            http2=_http2_available(),
+            follow_redirects=True,
+            limits=limits,
+            timeout=float(_settings["timeout"]),
+        )
+        _clients[key] = client
+    return client
+
+
+async def close_all_clients():
+    """关闭所有共享的HTTP客户端"""
+    clients = list(_clients.values())
+    _clients.clear()
+    for client in clients:
+        await client.aclose()
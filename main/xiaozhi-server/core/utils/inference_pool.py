@@ -0,0 +1,259 @@
+"""
+本地模型推理服务
+每个模型副本由一个独立的工作线程持有，请求进入有界队列，
+事件循环只需等待Future，不再被同步推理阻塞
+"""
+
+import time
+import queue
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, List, Optional
+from config.logger import setup_logging
+from core.utils import metrics
+from core.utils.runtime import apply_thread_budget
+
+TAG = __name__
+logger = setup_logging()
+
+
+class InferencePoolFullError(Exception):
+    """推理队列已满"""
+
+
+class InferenceTimeoutError(Exception):
+    """请求在截止时间前未能开始推理"""
+
+
+class _InferenceJob:
+    def __init__(self, func: Callable, args: tuple, kwargs: dict, deadline: Optional[float]):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.deadline = deadline
+        self.enqueue_time = time.monotonic()
+        self.future = Future()
+
+
+class InferencePool:
+    """
+    推理工作线程池
+    name: 指标名前缀
+    models: 模型副本列表，每个副本对应一个工作线程
+    max_queue_size: 等待队列上限，超过时立即拒绝请求
+    timeout: 默认的请求截止时间（秒），包含排队与推理时间，0表示不限制
+    """
+
+    def __init__(
+        self,
+        name: str,
+        models: List[Any],
+        max_queue_size: int = 32,
+        timeout: float = 30,
+    ):
+        if not models:
+            raise ValueError("推理服务至少需要一个模型副本")
+        self.name = name
+        self.models = models
+        self.timeout = timeout
+        self.jobs = queue.Queue(maxsize=max(max_queue_size, 1))
+        self.workers = []
+        for index, model in enumerate(models):
+            worker = threading.Thread(
+                target=self._worker,
+                args=(model,),
+                name=f"{name}-infer-{index}",
+                daemon=True,
+            )
+            worker.start()
+            self.workers.append(worker)
+        logger.bind(tag=TAG).info(
+            f"推理服务已启动: {name}，副本数: {len(models)}，队列上限: {max_queue_size}"
+        )
+
+    def _update_queue_depth(self):
+        metrics.set_gauge(f"{self.name}.queue_depth", self.jobs.qsize())
+
+    def submit(self, func: Callable, *args, timeout: Optional[float] = None, **kwargs) -> Future:
+        """
+        提交推理请求，func的第一个参数为工作线程持有的模型副本
+        队列已满时抛出InferencePoolFullError
+        """
+        timeout = self.timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout if timeout else None
+        job = _InferenceJob(func, args, kwargs, deadline)
+        try:
+            self.jobs.put_nowait(job)
+        except queue.Full:
+            metrics.inc_counter(f"{self.name}.rejected")
+            raise InferencePoolFullError(f"{self.name}推理队列已满")
+        self._update_queue_depth()
+        return job.future
+
+    async def run(self, func: Callable, *args, timeout: Optional[float] = None, **kwargs):
+        """在事件循环中提交推理请求并等待结果，超时后取消尚未开始的请求"""
+        timeout = self.timeout if timeout is None else timeout
+        future = self.submit(func, *args, timeout=timeout, **kwargs)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout or None)
+        except asyncio.TimeoutError:
+            metrics.inc_counter(f"{self.name}.timeout")
+            raise InferenceTimeoutError(f"{self.name}推理超时（{timeout}s）")
+
+    def _worker(self, model):
+        # 按模型类别（名称前缀，如asr）应用线程预算和CPU亲和性
+        apply_thread_budget(self.name.split(".")[0])
+        while True:
+            job = self.jobs.get()
+            self._update_queue_depth()
+            # 已被调用方取消的请求直接跳过
+            if not job.future.set_running_or_notify_cancel():
+                continue
+
+            start_time = time.monotonic()
+            metrics.observe(f"{self.name}.queue_wait_seconds", start_time - job.enqueue_time)
+            if job.deadline is not None and start_time > job.deadline:
+                metrics.inc_counter(f"{self.name}.timeout")
+                job.future.set_exception(
+                    InferenceTimeoutError(f"{self.name}请求排队超过截止时间")
+                )
+                continue
+
+            try:
+                result = job.func(model, *job.args, **job.kwargs)
+                job.future.set_result(result)
+            except Exception as e:
+                metrics.inc_counter(f"{self.name}.errors")
+                job.future.set_exception(e)
+            finally:
+                metrics.observe(
+                    f"{self.name}.inference_seconds", time.monotonic() - start_time
+                )
+
+
+class _BatchItem:
+    def __init__(self, item: Any, cost: float):
+        self.item = item
+        self.cost = cost
+        self.enqueue_time = time.monotonic()
+        self.future = Future()
+
+
+class BatchScheduler:
+    """
+    动态微批调度器，位于推理服务之前
+    请求在窗口期内累积，达到窗口时间、最大批大小或最大音频时长时合并为一次批量推理，
+    再把结果按顺序分发回各请求
+    batch_func(model, items) 必须返回与items等长、顺序一致的结果列表
+    """
+
+    def __init__(
+        self,
+        pool: InferencePool,
+        batch_func: Callable[[Any, List[Any]], List[Any]],
+        window_ms: float = 30,
+        max_batch_size: int = 8,
+        max_batch_cost: float = 60,
+    ):
+        self.pool = pool
+        self.batch_func = batch_func
+        self.window = max(window_ms, 0) / 1000
+        self.max_batch_size = max(max_batch_size, 1)
+        self.max_batch_cost = max_batch_cost
+        self.lock = threading.Lock()
+        self.pending: List[_BatchItem] = []
+        self.pending_cost = 0.0
+        self.timer: Optional[threading.Timer] = None
+
+    def submit(self, item: Any, cost: float = 0) -> Future:
+        """提交单个请求，cost为请求的音频时长（秒），用于限制单批总时长"""
+        batch_item = _BatchItem(item, cost)
+        ready = []
+        with self.lock:
+            # 加入后会超出总时长上限时，先把已累积的请求发出
+            if self.pending and self.pending_cost + cost > self.max_batch_cost:
+                ready.append(self._take_pending())
+            self.pending.append(batch_item)
+            self.pending_cost += cost
+            if (
+                len(self.pending) >= self.max_batch_size
+                or self.pending_cost >= self.max_batch_cost
+            ):
+                ready.append(self._take_pending())
+            elif self.timer is None:
+                self.timer = threading.Timer(self.window, self._on_timer)
+                self.timer.daemon = True
+                self.timer.start()
+        for batch in ready:
+            self._dispatch(batch)
+        return batch_item.future
+
+    async def run(self, item: Any, cost: float = 0):
+        """在事件循环中提交请求并等待结果"""
+        future = self.submit(item, cost)
+        timeout = self.pool.timeout + self.window if self.pool.timeout else None
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except asyncio.TimeoutError:
+            metrics.inc_counter(f"{self.pool.name}.timeout")
+            raise InferenceTimeoutError(f"{self.pool.name}推理超时（{timeout}s）")
+
+    def _take_pending(self) -> List[_BatchItem]:
+        """取出已累积的请求，调用方需持有锁"""
+        batch = self.pending
+        self.pending = []
+        self.pending_cost = 0.0
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        return batch
+
+    def _on_timer(self):
+        with self.lock:
+            batch = self._take_pending()
+        if batch:
+            self._dispatch(batch)
+
+    def _dispatch(self, batch: List[_BatchItem]):
+        # 调用方已取消的请求不再参与推理
+        batch = [b for b in batch if b.future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        now = time.monotonic()
+        metrics.observe(
+            f"{self.pool.name}.batch_size",
+            len(batch),
+            buckets=(1, 2, 4, 8, 16, 32, 64),
+        )
+        for batch_item in batch:
+            metrics.observe(
+                f"{self.pool.name}.batch_wait_seconds", now - batch_item.enqueue_time
+            )
+        try:
+            pool_future = self.pool.submit(self._run_batch, batch)
+        except Exception as e:
+            for batch_item in batch:
+                batch_item.future.set_exception(e)
+            return
+        pool_future.add_done_callback(lambda f: self._on_batch_done(batch, f))
+
+    def _run_batch(self, model, batch: List[_BatchItem]) -> List[Any]:
+        results = self.batch_func(model, [batch_item.item for batch_item in batch])
+        if len(results) != len(batch):
+            raise RuntimeError(
+                f"批量推理结果数量不匹配: 请求{len(batch)}个，返回{len(results)}个"
+            )
+        return results
+
+    @staticmethod
+    def _on_batch_done(batch: List[_BatchItem], pool_future: Future):
+        if pool_future.cancelled():
+            error = InferenceTimeoutError("批量推理请求已取消")
+        else:
+            error = pool_future.exception()
+        for index, batch_item in enumerate(batch):
+            if error is not None:
+                batch_item.future.set_exception(error)
+            else:
+                batch_item.future.set_result(pool_future.result()[index])
@@ -0,0 +1,87 @@
+"""
+进程内运行指标
+计数器、瞬时值和直方图保存在全局字典中，通过HTTP接口以JSON形式导出
+"""
+
+import threading
+from typing import Dict, Sequence
+
+# 默认直方图分桶（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+_lock = threading.Lock()
+_counters: Dict[str, float] = {}
+_gauges: Dict[str, float] = {}
+_histograms: Dict[str, dict] = {}
+
+
+def inc_counter(name: str, value: float = 1):
+    """累加计数器"""
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def set_gauge(name: str, value: float):
+    """设置瞬时值，如队列深度"""
+    with _lock:
+        _gauges[name] = value
+
+
+def observe(name: str, value: float, buckets: Sequence[float] = DEFAULT_BUCKETS):
+    """记录一次直方图观测值，分桶在首次记录时确定"""
+    with _lock:
+        histogram = _histograms.get(name)
+        if histogram is None:
+            histogram = {
+                "buckets": list(buckets),
+                "bucket_counts": [0] * (len(buckets) + 1),
+                "count": 0,
+                "sum": 0.0,
+                "max": value,
+            }
+            _histograms[name] = histogram
+        index = len(histogram["buckets"])
+        for i, bound in enumerate(histogram["buckets"]):
+            if value <= bound:
+                index = i
+                break
+        histogram["bucket_counts"][index] += 1
+        histogram["count"] += 1
+        histogram["sum"] += value
+        histogram["max"] = max(histogram["max"], value)
+
+
+def get_metrics() -> dict:
+    """获取所有指标的快照"""
+    with _lock:
+        histograms = {}
+        for name, histogram in _histograms.items():
+            count = histogram["count"]
+            histograms[name] = {
+                "count": count,
+                "sum": histogram["sum"],
+                "avg": histogram["sum"] / count if count else 0.0,
+                "max": histogram["max"],
+                "buckets": {
+                    **{
+                        str(bound): bucket_count
+                        for bound, bucket_count in zip(
+                            histogram["buckets"], histogram["bucket_counts"]
+                        )
+                    },
+                    "+Inf": histogram["bucket_counts"][-1],
+                },
+            }
+        return {
+            "counters": dict(_counters),
+            "gauges": dict(_gauges),
+            "histograms": histograms,
+        }
+
+
+def reset_metrics():
+    """清空所有指标"""
+    with _lock:
+        _counters.clear()
+        _gauges.clear()
+        _histograms.clear()
@@ -0,0 +1,268 @@
+"""
+本地音乐转码缓存
+音乐文件按(路径, 大小, 修改时间)转码为p3文件保存，播放时直接以内存映射方式读取Opus帧，
+不再在每次播放时用ffmpeg解码并重新编码整首歌曲；
+后台低优先级线程在启动时和定期扫描时预先转码音乐目录，文件修改后自动重新转码；
+转码使用独立启动的低优先级ffmpeg进程，不占用对话请求共用的ffmpeg进程池
+"""
+
+import os
+import time
+import queue
+import struct
+import hashlib
+import threading
+from typing import Optional
+from config.logger import setup_logging
+from core.utils import metrics
+from core.utils.util import pcm_to_data
+from core.utils.audio_decode import (
+    UnsupportedWavError,
+    wav_to_pcm,
+    decode_file_with_ffmpeg,
+)
+
+TAG = __name__
+logger = setup_logging()
+
+DEFAULT_MUSIC_DIR = "./music"
+DEFAULT_MUSIC_EXT = (".mp3", ".wav", ".p3")
+
+# 转码任务优先级：播放时请求的歌曲排在扫描任务之前
+PRIORITY_REQUEST = 0
+PRIORITY_SCAN = 1
+
+# 后台转码线程及其ffmpeg子进程的nice值（线程部分仅Linux按线程生效）
+WORKER_NICE = 19
+
+
+def get_music_settings(config: dict):
+    """读取play_music插件的音乐目录和扩展名配置，默认值与插件一致"""
+    music_config = (config.get("plugins") or {}).get("play_music") or {}
+    music_dir = os.path.abspath(music_config.get("music_dir", DEFAULT_MUSIC_DIR))
+    music_ext = tuple(music_config.get("music_ext", DEFAULT_MUSIC_EXT))
+    return music_dir, music_ext
+
+
+class MusicCache:
+    def __init__(
+        self,
+        cache_dir: str,
+        music_dir: str,
+        music_ext: tuple,
+        scan_interval: float = 60,
+        pretranscode: bool = True,
+    ):
+        self.cache_dir = cache_dir
+        self.music_dir = music_dir
+        self.music_ext = tuple(ext.lower() for ext in music_ext)
+        self.scan_interval = float(scan_interval)
+        self.pretranscode = pretranscode
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # (优先级, 序号, 音乐文件路径, 缓存键)
+        self.tasks = queue.PriorityQueue()
+        self.sequence = 0
+        # 已在队列中或正在转码的缓存键，避免重复转码
+        self.pending = set()
+        # 转码失败的缓存键，源文件不变时不再重试
+        self.failed = set()
+        self.lock = threading.Lock()
+        self.worker = None
+
+    def _cache_key(self, music_path: str, stat: os.stat_result) -> str:
+        raw = f"{os.path.abspath(music_path)}|{stat.st_size}|{stat.st_mtime_ns}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _cache_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.p3")
+
+    def resolve(self, music_path: str) -> str:
+        """
+        返回播放用的文件路径：已转码时返回缓存的p3文件，
+        未转码时提交后台转码，本次仍返回原文件（按原流程转码播放）
+        """
+        if music_path.lower().endswith(".p3"):
+            return music_path
+        try:
+            key = self._cache_key(music_path, os.stat(music_path))
+        except OSError:
+            return music_path
+        cache_path = self._cache_path(key)
+        if os.path.exists(cache_path):
+            metrics.inc_counter("music_cache.hit")
+            return cache_path
+        metrics.inc_counter("music_cache.miss")
+        self.submit(music_path, PRIORITY_REQUEST)
+        return music_path
+
+    def submit(self, music_path: str, priority: int = PRIORITY_SCAN) -> bool:
+        """提交转码任务，已缓存或已在队列中时返回False"""
+        if music_path.lower().endswith(".p3"):
+            return False
+        try:
+            key = self._cache_key(music_path, os.stat(music_path))
+        except OSError:
+            return False
+        if os.path.exists(self._cache_path(key)):
+            return False
+        with self.lock:
+            if key in self.pending or key in self.failed:
+                return False
+            self.pending.add(key)
+            self.sequence += 1
+            self.tasks.put((priority, self.sequence, music_path, key))
+        self._ensure_worker()
+        return True
+
+    def transcode(self, music_path: str) -> str:
+        """把音乐文件转码为p3缓存文件，返回缓存路径"""
+        stat = os.stat(music_path)
+        key = self._cache_key(music_path, stat)
+        cache_path = self._cache_path(key)
+        if os.path.exists(cache_path):
+            return cache_path
+        start = time.time()
+        pcm = self._decode(music_path)
+        duration = len(pcm) / 2 / 16000
+        packets = pcm_to_data(pcm, is_opus=True)
+        tmp_path = f"{cache_path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                for packet in packets:
+                    f.write(struct.pack(">BBH", 0, 0, len(packet)))
+                    f.write(packet)
+            os.replace(tmp_path, cache_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        metrics.inc_counter("music_cache.transcoded")
+        logger.bind(tag=TAG).info(
+            f"音乐转码完成: {music_path}，时长{duration:.1f}秒，耗时{time.time() - start:.2f}秒"
+        )
+        return cache_path
+
+    @staticmethod
+    def _decode(music_path: str) -> bytes:
+        """解码为16kHz单声道PCM：WAV在本线程内解析，其他格式启动低优先级的ffmpeg进程"""
+        if music_path.lower().endswith(".wav"):
+            with open(music_path, "rb") as f:
+                data = f.read()
+            try:
+                return wav_to_pcm(data)
+            except UnsupportedWavError:
+                pass
+        return decode_file_with_ffmpeg(music_path, nice=WORKER_NICE)
+
+    def scan(self) -> int:
+        """扫描音乐目录，提交未转码的文件，并删除已不对应任何音乐文件的缓存"""
+        if not os.path.isdir(self.music_dir):
+            return 0
+        submitted = 0
+        live_keys = set()
+        for root, _, files in os.walk(self.music_dir):
+            for name in files:
+                lower_name = name.lower()
+                if not lower_name.endswith(self.music_ext) or lower_name.endswith(".p3"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    live_keys.add(self._cache_key(path, os.stat(path)))
+                except OSError:
+                    continue
+                if self.submit(path):
+                    submitted += 1
+        self._remove_stale(live_keys)
+        return submitted
+
+    def _remove_stale(self, live_keys: set):
+        """删除源文件已修改或已删除的缓存（含p3帧索引文件）"""
+        with self.lock:
+            live_keys = live_keys | self.pending
+        for entry in os.scandir(self.cache_dir):
+            key = entry.name.split(".", 1)[0]
+            if not entry.is_file() or key in live_keys:
+                continue
+            try:
+                os.remove(entry.path)
+            except OSError as e:
+                logger.bind(tag=TAG).warning(f"删除过期音乐缓存失败: {entry.name}, {e}")
+
+    def start(self):
+        """启动后台转码线程，开启预转码时立即扫描一次音乐目录"""
+        self._ensure_worker()
+
+    def _ensure_worker(self):
+        with self.lock:
+            if self.worker is not None and self.worker.is_alive():
+                return
+            self.worker = threading.Thread(
+                target=self._run, name="music-transcoder", daemon=True
+            )
+            self.worker.start()
+
+    def _run(self):
+        # 降低本线程的调度优先级，避免与对话中的实时任务争抢CPU
+        if hasattr(os, "setpriority"):
+            try:
+                os.setpriority(
+                    os.PRIO_PROCESS, threading.get_native_id(), WORKER_NICE
+                )
+            except OSError:
+                pass
+        next_scan = time.monotonic()
+        while True:
+            if self.pretranscode and time.monotonic() >= next_scan:
+                try:
+                    submitted = self.scan()
+                    if submitted:
+                        logger.bind(tag=TAG).info(f"音乐预转码: 提交{submitted}个文件")
+                except Exception as e:
+                    logger.bind(tag=TAG).warning(f"扫描音乐目录失败: {e}")
+                next_scan = time.monotonic() + self.scan_interval
+            timeout = max(0.0, next_scan - time.monotonic()) if self.pretranscode else None
+            try:
+                _, _, music_path, key = self.tasks.get(timeout=timeout)
+            except queue.Empty:
+                continue
+            try:
+                self.transcode(music_path)
+            except Exception as e:
+                with self.lock:
+                    self.failed.add(key)
+                metrics.inc_counter("music_cache.failed")
+                logger.bind(tag=TAG).warning(f"音乐转码失败: {music_path}, {e}")
+            finally:
+                with self.lock:
+                    self.pending.discard(key)
+            metrics.set_gauge("music_cache.pending", self.tasks.qsize())
+
+
+_music_cache = None
+_music_cache_lock = threading.Lock()
+
+
+def get_music_cache(config: dict) -> Optional[MusicCache]:
+    """获取进程内共享的音乐缓存，未启用时返回None"""
+    global _music_cache
+    cache_config = config.get("music_cache") or {}
+    if not cache_config.get("enabled", False):
+        return None
+    if _music_cache is None:
+        with _music_cache_lock:
+            if _music_cache is None:
+                music_dir, music_ext = get_music_settings(config)
+                _music_cache = MusicCache(
+                    cache_dir=cache_config.get("cache_dir", "data/music_cache"),
+                    music_dir=music_dir,
+                    music_ext=music_ext,
+                    scan_interval=float(cache_config.get("scan_interval", 60)),
+                    pretranscode=cache_config.get("pretranscode", True),
+                )
+    return _music_cache
+
+
+def start_music_cache(config: dict):
+    """启动时调用，开启后台预转码"""
+    cache = get_music_cache(config)
+    if cache is not None and cache.pretranscode:
+        cache.start()
@@ -4,18 +4,33 @@ Opus编码工具类
 """
 
 import logging
+import threading
 import traceback
+from contextlib import contextmanager
 
-import numpy as np
-from typing import List, Optional
+from typing import Dict, List, Optional
 from opuslib_next import Encoder
 from opuslib_next import constants
 
+# 每个编码器池保留的空闲编码器上限，超出的归还后直接丢弃
+DEFAULT_POOL_SIZE = 8
+
+_pools: Dict[tuple, "OpusEncoderPool"] = {}
+_pools_lock = threading.Lock()
+
 
 class OpusEncoderUtils:
     """PCM到Opus的编码器"""
 
-    def __init__(self, sample_rate: int, channels: int, frame_size_ms: int):
+    def __init__(
+        self,
+        sample_rate: int,
+        channels: int,
+        frame_size_ms: int,
+        bitrate: Optional[int] = 24000,
+        complexity: Optional[int] = 10,
+        signal: Optional[int] = constants.SIGNAL_VOICE,
+    ):
         """
         初始化Opus编码器
 
@@ -23,6 +38,9 @@ class OpusEncoderUtils:
             sample_rate: 采样率 (Hz)
             channels: 通道数 (1=单声道, 2=立体声)
             frame_size_ms: 帧大小 (毫秒)
+            bitrate: 比特率 (bps)，None表示使用opus默认值
+            complexity: 复杂度 (0-10)，None表示使用opus默认值
+            signal: 信号类型，None表示由opus自动判断
         """
         self.sample_rate = sample_rate
         self.channels = channels
@@ -33,20 +51,27 @@ class OpusEncoderUtils:
         self.total_frame_size = self.frame_size * channels
 
         # 比特率和复杂度设置
-        self.bitrate = 24000  # bps
-        self.complexity = 10  # 最高质量
+        self.bitrate = bitrate
+        self.complexity = complexity
 
-        # 缓冲区初始化为空
-        self.buffer = np.array([], dtype=np.int16)
+        # 每帧字节数（16位PCM）
+        self.frame_bytes = self.total_frame_size * 2
+        # 未凑满一帧的剩余数据保存在预分配的帧缓冲区中，buffered为其中的字节数
+        # 每次编码后剩余数据不足一帧，因此一帧大小的缓冲区即可，追加数据时不再复制已缓冲的内容
+        self.frame_buffer = bytearray(self.frame_bytes)
+        self.buffered = 0
 
         try:
             # 创建Opus编码器
             self.encoder = Encoder(
                 sample_rate, channels, constants.APPLICATION_AUDIO  # 音频优化模式
             )
-            self.encoder.bitrate = self.bitrate
-            self.encoder.complexity = self.complexity
-            self.encoder.signal = constants.SIGNAL_VOICE  # 语音信号优化
+            if bitrate is not None:
+                self.encoder.bitrate = bitrate
+            if complexity is not None:
+                self.encoder.complexity = complexity
+            if signal is not None:
+                self.encoder.signal = signal  # 语音信号优化
         except Exception as e:
             logging.error(f"初始化Opus编码器失败: {e}")
             raise RuntimeError("初始化失败") from e
@@ -54,83 +79,132 @@ class OpusEncoderUtils:
     def reset_state(self):
         """重置编码器状态"""
         self.encoder.reset_state()
-        self.buffer = np.array([], dtype=np.int16)
+        self.buffered = 0
 
     def encode_pcm_to_opus(self, pcm_data: bytes, end_of_stream: bool) -> List[bytes]:
         """
         将PCM数据编码为Opus格式
 
         Args:
-            pcm_data: PCM字节数据
+            pcm_data: PCM字节数据（小端16位）
             end_of_stream: 是否为流的结束
 
         Returns:
             Opus数据包列表
         """
-        # 将字节数据转换为short数组
-        new_samples = self._convert_bytes_to_shorts(pcm_data)
-
-        # 校验PCM数据
-        self._validate_pcm_data(new_samples)
-
-        # 将新数据追加到缓冲区
-        self.buffer = np.append(self.buffer, new_samples)
-
+        # 通过memoryview切片，不复制输入数据
+        data = memoryview(pcm_data).cast("B")
+        total = len(data)
+        frame_bytes = self.frame_bytes
         opus_packets = []
         offset = 0
 
-        # 处理所有完整帧
-        while offset <= len(self.buffer) - self.total_frame_size:
-            frame = self.buffer[offset : offset + self.total_frame_size]
-            output = self._encode(frame)
-            if output:
-                opus_packets.append(output)
-            offset += self.total_frame_size
-
-        # 保留未处理的样本
-        self.buffer = self.buffer[offset:]
+        # 先用新数据补满上次剩余的不完整帧
+        if self.buffered:
+            count = min(frame_bytes - self.buffered, total)
+            self.frame_buffer[self.buffered : self.buffered + count] = data[:count]
+            self.buffered += count
+            offset = count
+            if self.buffered == frame_bytes:
+                self._append_packet(opus_packets, self.frame_buffer)
+                self.buffered = 0
+
+        # 完整帧直接从输入数据中编码
+        while offset <= total - frame_bytes:
+            self._append_packet(opus_packets, data[offset : offset + frame_bytes])
+            offset += frame_bytes
+
+        # 保留未处理的数据
+        if offset < total:
+            count = total - offset
+            self.frame_buffer[:count] = data[offset:]
+            self.buffered = count
 
         # 流结束时处理剩余数据
-        if end_of_stream and len(self.buffer) > 0:
-            # 创建最后一帧并用0填充
-            last_frame = np.zeros(self.total_frame_size, dtype=np.int16)
-            last_frame[: len(self.buffer)] = self.buffer
-
-            output = self._encode(last_frame)
-            if output:
-                opus_packets.append(output)
-            self.buffer = np.array([], dtype=np.int16)
+        if end_of_stream and self.buffered > 0:
+            # 最后一帧用0填充
+            self.frame_buffer[self.buffered :] = bytes(frame_bytes - self.buffered)
+            self._append_packet(opus_packets, self.frame_buffer)
+            self.buffered = 0
 
         return opus_packets
 
-    def _encode(self, frame: np.ndarray) -> Optional[bytes]:
+    def _append_packet(self, opus_packets: List[bytes], frame):
+        output = self._encode(frame)
+        if output:
+            opus_packets.append(output)
+
+    def _encode(self, frame) -> Optional[bytes]:
         """编码一帧音频数据"""
         try:
-            # 将numpy数组转换为bytes
-            frame_bytes = frame.tobytes()
-            # opuslib要求输入字节数必须是channels*2的倍数
-            encoded = self.encoder.encode(frame_bytes, self.frame_size)
+            # opuslib要求输入为bytes，且字节数必须是channels*2的倍数
+            encoded = self.encoder.encode(bytes(frame), self.frame_size)
             return encoded
         except Exception as e:
             logging.error(f"Opus编码失败: {e}")
             traceback.print_exc()
             return None
 
-    def _convert_bytes_to_shorts(self, bytes_data: bytes) -> np.ndarray:
-        """将字节数组转换为short数组 (16位PCM)"""
-        # 假设输入是小端字节序的16位PCM
-        return np.frombuffer(bytes_data, dtype=np.int16)
-
-    def _validate_pcm_data(self, pcm_shorts: np.ndarray) -> None:
-        """验证PCM数据是否有效"""
-        # 16位PCM数据范围是 -32768 到 32767
-        if np.any((pcm_shorts < -32768) | (pcm_shorts > 32767)):
-            invalid_samples = pcm_shorts[(pcm_shorts < -32768) | (pcm_shorts > 32767)]
-            logging.warning(f"发现无效PCM样本: {invalid_samples[:5]}...")
-            # 在实际应用中可以选择裁剪而不是抛出异常
-            # np.clip(pcm_shorts, -32768, 32767, out=pcm_shorts)
-
     def close(self):
         """关闭编码器并释放资源"""
         # opuslib没有明确的关闭方法，Python的垃圾回收会处理
         pass
+
+
+class OpusEncoderPool:
+    """
+    相同参数的Opus编码器池
+    创建编码器需要分配opus内部状态并设置参数，每段音频都新建编码器的开销可以省去；
+    每个音频流取出一个编码器独占使用，归还时重置状态，供下一个流复用
+    """
+
+    def __init__(self, max_idle: int = DEFAULT_POOL_SIZE, **encoder_args):
+        self.encoder_args = encoder_args
+        self.max_idle = max_idle
+        self.idle: List[OpusEncoderUtils] = []
+        self.lock = threading.Lock()
+
+    def acquire(self) -> OpusEncoderUtils:
+        """取出一个空闲编码器，没有空闲编码器时新建"""
+        with self.lock:
+            if self.idle:
+                return self.idle.pop()
+        return OpusEncoderUtils(**self.encoder_args)
+
+    def release(self, encoder: OpusEncoderUtils):
+        """重置编码器状态后归还到池中"""
+        encoder.reset_state()
+        with self.lock:
+            if len(self.idle) < self.max_idle:
+                self.idle.append(encoder)
+
+    @contextmanager
+    def checkout(self):
+        """在with块内独占使用一个编码器，结束时自动归还"""
+        encoder = self.acquire()
+        try:
+            yield encoder
+        finally:
+            self.release(encoder)
+
+
+def get_encoder_pool(
+    sample_rate: int = 16000,
+    channels: int = 1,
+    frame_size_ms: int = 60,
+    **options,
+) -> OpusEncoderPool:
+    """获取进程内共享的编码器池，参数（含比特率等选项）相同的调用方共用一个池"""
+    encoder_args = dict(
+        sample_rate=sample_rate,
+        channels=channels,
+        frame_size_ms=frame_size_ms,
+        **options,
+    )
+    key = tuple(sorted(encoder_args.items()))
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = OpusEncoderPool(**encoder_args)
+            _pools[key] = pool
+        return pool
@@ -1,4 +1,10 @@
+import os
+import sys
+import mmap
 import struct
+import weakref
+import threading
+from array import array
 
 def decode_opus_from_file(input_file):
     """
@@ -56,4 +62,162 @@ def decode_opus_from_bytes(input_bytes):
         total_frames += 1
 
     total_duration = (total_frames * frame_duration_ms) / 1000.0
-    return opus_datas, total_duration
\ No newline at end of file
+    return opus_datas, total_duration
+
+# p3帧索引文件：保存每帧头部在文件中的偏移，首次打开时生成，保存在p3文件旁边
+INDEX_SUFFIX = ".idx"
+INDEX_MAGIC = b"P3IX"
+# 索引头部：魔数、帧数、源文件大小、源文件修改时间（纳秒）
+INDEX_HEADER = struct.Struct("<4sIQQ")
+FRAME_HEADER = struct.Struct(">BBH")
+FRAME_DURATION_MS = 60
+
+# 正在播放的p3文件映射，同一文件的多个播放共用一个mmap和索引，没有播放引用时自动释放
+_mapped_files = weakref.WeakValueDictionary()
+_mapped_lock = threading.Lock()
+
+
+def build_frame_index(data) -> array:
+    """扫描p3数据，返回每帧头部偏移组成的紧凑数组"""
+    offsets = array("I")
+    total = len(data)
+    offset = 0
+    while offset < total:
+        if offset + FRAME_HEADER.size > total:
+            raise ValueError(f"Incomplete frame header at offset {offset}.")
+        _, _, data_len = FRAME_HEADER.unpack_from(data, offset)
+        if offset + FRAME_HEADER.size + data_len > total:
+            raise ValueError(
+                f"Data length({total - offset - FRAME_HEADER.size}) mismatch({data_len}) in the file."
+            )
+        offsets.append(offset)
+        offset += FRAME_HEADER.size + data_len
+    return offsets
+
+
+def _load_frame_index(index_path, size, mtime_ns):
+    """读取索引文件，与源文件大小或修改时间不一致时返回None"""
+    try:
+        with open(index_path, "rb") as f:
+            header = f.read(INDEX_HEADER.size)
+            if len(header) != INDEX_HEADER.size:
+                return None
+            magic, count, index_size, index_mtime_ns = INDEX_HEADER.unpack(header)
+            if magic != INDEX_MAGIC or index_size != size or index_mtime_ns != mtime_ns:
+                return None
+            offsets = array("I")
+            offsets.frombytes(f.read(count * offsets.itemsize))
+    except (OSError, ValueError):
+        return None
+    if len(offsets) != count:
+        return None
+    if sys.byteorder != "little":
+        offsets.byteswap()
+    return offsets
+
+
+def _save_frame_index(index_path, offsets, size, mtime_ns):
+    """保存索引文件，目录不可写时跳过（仅本次在内存中使用）"""
+    data = offsets
+    if sys.byteorder != "little":
+        data = array("I", offsets)
+        data.byteswap()
+    tmp_path = f"{index_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(INDEX_HEADER.pack(INDEX_MAGIC, len(offsets), size, mtime_ns))
+            f.write(data.tobytes())
+        os.replace(tmp_path, index_path)
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+class _MappedP3File:
+    """以只读方式映射的p3文件及其帧索引"""
+
+    def __init__(self, path, size, mtime_ns):
+        self.path = path
+        self.size = size
+        self.mtime_ns = mtime_ns
+        if size == 0:
+            # 空文件无法mmap
+            self.data = memoryview(b"")
+        else:
+            with open(path, "rb") as f:
+                self.data = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+        index_path = path + INDEX_SUFFIX
+        offsets = _load_frame_index(index_path, size, mtime_ns)
+        if offsets is None:
+            offsets = build_frame_index(self.data)
+            _save_frame_index(index_path, offsets, size, mtime_ns)
+        self.offsets = offsets
+
+
+class P3Frames:
+    """
+    p3文件的Opus帧序列，支持len、下标、切片和迭代
+    帧按需以memoryview形式从映射中取出，不复制数据，也不预先读入整个文件
+    """
+
+    def __init__(self, mapped: _MappedP3File, start: int = 0, stop: int = None):
+        self._mapped = mapped
+        self._start = start
+        self._stop = len(mapped.offsets) if stop is None else stop
+
+    def __len__(self):
+        return self._stop - self._start
+
+    def _frame(self, index: int) -> memoryview:
+        offset = self._mapped.offsets[index]
+        _, _, data_len = FRAME_HEADER.unpack_from(self._mapped.data, offset)
+        offset += FRAME_HEADER.size
+        return self._mapped.data[offset : offset + data_len]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                return [self[i] for i in range(start, stop, step)]
+            return P3Frames(
+                self._mapped, self._start + start, self._start + max(start, stop)
+            )
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("p3 frame index out of range")
+        return self._frame(self._start + index)
+
+    def __iter__(self):
+        for index in range(self._start, self._stop):
+            yield self._frame(index)
+
+    @property
+    def duration(self) -> float:
+        """帧序列的时长（秒）"""
+        return len(self) * FRAME_DURATION_MS / 1000.0
+
+    def seek(self, seconds: float) -> "P3Frames":
+        """返回从指定时间（秒）开始的帧序列"""
+        frame = int(max(0.0, seconds) * 1000 // FRAME_DURATION_MS)
+        return self[frame:]
+
+
+def open_p3(input_file) -> P3Frames:
+    """
+    以内存映射方式打开p3文件，返回帧序列
+    帧偏移索引缓存在同目录的.idx文件中，文件大小或修改时间变化后自动重建
+    """
+    path = os.path.abspath(input_file)
+    stat = os.stat(path)
+    with _mapped_lock:
+        mapped = _mapped_files.get(path)
+        if (
+            mapped is None
+            or mapped.size != stat.st_size
+            or mapped.mtime_ns != stat.st_mtime_ns
+        ):
+            mapped = _MappedP3File(path, stat.st_size, stat.st_mtime_ns)
+            _mapped_files[path] = mapped
+    return P3Frames(mapped)
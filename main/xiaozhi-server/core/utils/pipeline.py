@@ -0,0 +1,193 @@
+"""
+连接处理管线工具
+thread模式：每个连接启动独立的ASR/TTS/播放/上报线程（原有行为）
+asyncio模式：各阶段以asyncio任务运行，阻塞调用统一交给进程内共享的有界线程池
+"""
+
+import queue
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+PIPELINE_MODE_THREAD = "thread"
+PIPELINE_MODE_ASYNCIO = "asyncio"
+
+DEFAULT_MAX_WORKERS = 32
+
+_shared_executor = None
+_shared_executor_lock = threading.Lock()
+_lookahead_executor = None
+
+
+def get_pipeline_mode(config: dict) -> str:
+    """获取连接处理管线模式，未配置或配置错误时使用thread模式"""
+    pipeline_config = config.get("pipeline") or {}
+    mode = str(pipeline_config.get("mode", PIPELINE_MODE_THREAD)).lower()
+    if mode == PIPELINE_MODE_ASYNCIO:
+        return PIPELINE_MODE_ASYNCIO
+    return PIPELINE_MODE_THREAD
+
+
+def get_shared_executor(config: dict = None) -> ThreadPoolExecutor:
+    """获取进程内共享的有界线程池，首次调用时按配置创建"""
+    global _shared_executor
+    if _shared_executor is None:
+        with _shared_executor_lock:
+            if _shared_executor is None:
+                max_workers = DEFAULT_MAX_WORKERS
+                if config:
+                    pipeline_config = config.get("pipeline") or {}
+                    max_workers = int(
+                        pipeline_config.get("max_workers") or DEFAULT_MAX_WORKERS
+                    )
+                _shared_executor = ThreadPoolExecutor(
+                    max_workers=max_workers, thread_name_prefix="pipeline"
+                )
+    return _shared_executor
+
+
+def get_lookahead_executor(config: dict = None) -> ThreadPoolExecutor:
+    """
+    获取TTS预合成专用的共享线程池
+    与管线线程池分开，避免等待预合成名额的TTS文本任务占满管线线程池导致死锁
+    """
+    global _lookahead_executor
+    if _lookahead_executor is None:
+        with _shared_executor_lock:
+            if _lookahead_executor is None:
+                max_workers = DEFAULT_MAX_WORKERS
+                if config:
+                    pipeline_config = config.get("pipeline") or {}
+                    max_workers = int(
+                        pipeline_config.get("lookahead_workers") or DEFAULT_MAX_WORKERS
+                    )
+                _lookahead_executor = ThreadPoolExecutor(
+                    max_workers=max_workers, thread_name_prefix="tts-lookahead"
+                )
+    return _lookahead_executor
+
+
+class OrderedSlot:
+    """OrderedOutput中的一个槽位，对应一个并发任务的输出"""
+
+    __slots__ = ("_output", "items", "closed")
+
+    def __init__(self, output):
+        self._output = output
+        self.items = []
+        self.closed = False
+
+    @property
+    def cancelled(self) -> bool:
+        return self._output.cancelled
+
+    def put(self, item):
+        self._output._emit(self, item)
+
+    def close(self):
+        self._output._close(self)
+
+
+class OrderedOutput:
+    """
+    重排缓冲：按槽位申请顺序输出多个并发任务产生的数据
+    队首槽位的数据直接透传（流式输出不增加延迟），其余槽位先缓存，
+    前面的槽位全部关闭后再按顺序输出
+    """
+
+    def __init__(self, put):
+        self._put = put
+        self._lock = threading.Lock()
+        self._slots = deque()
+        self.cancelled = False
+
+    def new_slot(self) -> OrderedSlot:
+        with self._lock:
+            slot = OrderedSlot(self)
+            if not self.cancelled:
+                self._slots.append(slot)
+            return slot
+
+    def put(self, item):
+        """按顺序输出一条不需要等待的数据"""
+        slot = self.new_slot()
+        slot.put(item)
+        slot.close()
+
+    def cancel(self):
+        """丢弃所有未输出的数据，之后的输出全部忽略"""
+        with self._lock:
+            self.cancelled = True
+            self._slots.clear()
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._slots)
+
+    def _emit(self, slot, item):
+        with self._lock:
+            if self.cancelled:
+                return
+            if self._slots and self._slots[0] is slot:
+                self._put(item)
+            else:
+                slot.items.append(item)
+
+    def _close(self, slot):
+        with self._lock:
+            slot.closed = True
+            while self._slots and self._slots[0].closed:
+                self._slots.popleft()
+                if self._slots:
+                    head = self._slots[0]
+                    for item in head.items:
+                        self._put(item)
+                    head.items.clear()
+
+
+class AsyncBridgeQueue:
+    """
+    基于asyncio.Queue的队列，保留queue.Queue的put/get_nowait/qsize/task_done接口，
+    工作线程中调用put时通过call_soon_threadsafe投递到事件循环，事件循环中直接入队
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self._queue = asyncio.Queue()
+
+    def _in_loop_thread(self) -> bool:
+        try:
+            return asyncio.get_running_loop() is self.loop
+        except RuntimeError:
+            return False
+
+    def put(self, item):
+        if self._in_loop_thread():
+            self._queue.put_nowait(item)
+        else:
+            self.loop.call_soon_threadsafe(self._queue.put_nowait, item)
+
+    def put_nowait(self, item):
+        self.put(item)
+
+    async def get(self):
+        return await self._queue.get()
+
+    def get_nowait(self):
+        try:
+            return self._queue.get_nowait()
+        except asyncio.QueueEmpty:
+            raise queue.Empty
+
+    def task_done(self):
+        if self._in_loop_thread():
+            self._queue.task_done()
+        else:
+            self.loop.call_soon_threadsafe(self._queue.task_done)
+
+    def qsize(self) -> int:
+        return self._queue.qsize()
+
+    def empty(self) -> bool:
+        return self._queue.empty()
@@ -0,0 +1,205 @@
+"""
+本地模型的CPU线程预算
+VAD、ASR等本地模型在同一进程中运行，各推理库默认按CPU核数创建线程，负载高时会互相争抢CPU。
+这里按模型类别（vad、asr等）统一分配线程数和可选的CPU亲和性：
+- torch：intra-op和inter-op线程数都是进程级设置，无法按类别区分，
+  各类别预算的最大值在进程内只设置一次（FunASR未配置num_threads时，加载模型的ncpu也使用该值）
+- onnxruntime：通过onnx_session_options创建带线程数的SessionOptions
+- sherpa-onnx：通过get_num_threads取得num_threads参数
+"""
+
+import os
+import sys
+import threading
+from typing import Dict, List, Optional
+from config.logger import setup_logging
+
+TAG = __name__
+logger = setup_logging()
+
+
+class ThreadBudget:
+    def __init__(
+        self,
+        intra_op_threads: Optional[int] = None,
+        inter_op_threads: Optional[int] = None,
+        cpu_affinity: Optional[List[int]] = None,
+    ):
+        self.intra_op_threads = intra_op_threads
+        self.inter_op_threads = inter_op_threads
+        self.cpu_affinity = cpu_affinity
+
+    def to_dict(self) -> dict:
+        return {
+            "intra_op_threads": self.intra_op_threads,
+            "inter_op_threads": self.inter_op_threads,
+            "cpu_affinity": self.cpu_affinity,
+        }
+
+
+_budgets: Dict[str, ThreadBudget] = {}
+# 各工作线程实际生效的设置，用于启动报告
+_applied: Dict[str, dict] = {}
+_lock = threading.Lock()
+_torch_configured = False
+
+
+def _positive_int(value) -> Optional[int]:
+    if value in (None, ""):
+        return None
+    value = int(value)
+    return value if value > 0 else None
+
+
+def configure_runtime(config: dict):
+    """读取runtime配置中各模型类别的线程预算，需在初始化模型之前调用"""
+    _budgets.clear()
+    runtime_config = config.get("runtime") or {}
+    for family, family_config in runtime_config.items():
+        if not isinstance(family_config, dict):
+            continue
+        affinity = family_config.get("cpu_affinity") or None
+        _budgets[family] = ThreadBudget(
+            _positive_int(family_config.get("intra_op_threads")),
+            _positive_int(family_config.get("inter_op_threads")),
+            [int(cpu) for cpu in affinity] if affinity else None,
+        )
+
+
+def get_thread_budget(family: str) -> ThreadBudget:
+    """获取模型类别的线程预算，未配置时各项为None（保持推理库默认值）"""
+    return _budgets.get(family) or ThreadBudget()
+
+
+def get_num_threads(family: str, configured=None, default: int = 2) -> int:
+    """
+    sherpa-onnx等以参数指定线程数的推理库使用
+    模型自身配置的num_threads优先，其次为类别预算，最后为default
+    """
+    value = _positive_int(configured)
+    if value is None:
+        value = get_thread_budget(family).intra_op_threads
+    return value or default
+
+
+def onnx_session_options(family: str):
+    """创建按类别预算设置线程数的onnxruntime.SessionOptions"""
+    import onnxruntime
+
+    budget = get_thread_budget(family)
+    options = onnxruntime.SessionOptions()
+    if budget.intra_op_threads:
+        options.intra_op_num_threads = budget.intra_op_threads
+    if budget.inter_op_threads:
+        options.inter_op_num_threads = budget.inter_op_threads
+    return options
+
+
+def get_torch_threads(configured=None, default: Optional[int] = None) -> Optional[int]:
+    """
+    torch的进程级intra-op线程数：与get_num_threads一致，模型自身配置的num_threads优先，
+    其次为各类别预算的最大值，最后为default
+    torch.set_num_threads设置的是进程共用的值，各线程首次并行计算时都会采用，因此只能有一个值
+    """
+    value = _positive_int(configured)
+    if value is not None:
+        return value
+    values = [b.intra_op_threads for b in _budgets.values() if b.intra_op_threads]
+    if values:
+        return max(values)
+    return default
+
+
+def _configure_torch():
+    """在进程内只设置一次torch的intra-op和inter-op线程数，各取类别预算的最大值"""
+    global _torch_configured
+    torch = sys.modules.get("torch")
+    if torch is None or _torch_configured:
+        return
+    _torch_configured = True
+    intra_op_threads = get_torch_threads()
+    if intra_op_threads:
+        torch.set_num_threads(intra_op_threads)
+    values = [b.inter_op_threads for b in _budgets.values() if b.inter_op_threads]
+    if not values:
+        return
+    try:
+        torch.set_num_interop_threads(max(values))
+    except RuntimeError as e:
+        logger.bind(tag=TAG).warning(f"torch inter-op线程数设置失败（线程池已启动）: {e}")
+
+
+def apply_thread_budget(family: str, worker_name: str = None):
+    """
+    在推理工作线程开始工作前调用：把类别的CPU亲和性应用到当前线程（仅Linux），
+    并在已加载torch时确保进程级的torch线程数已设置（torch线程数不按线程区分）
+    """
+    budget = get_thread_budget(family)
+    worker_name = worker_name or threading.current_thread().name
+    applied = {"family": family}
+
+    if budget.cpu_affinity:
+        if hasattr(os, "sched_setaffinity"):
+            try:
+                os.sched_setaffinity(threading.get_native_id(), budget.cpu_affinity)
+                applied["cpu_affinity"] = sorted(
+                    os.sched_getaffinity(threading.get_native_id())
+                )
+            except OSError as e:
+                logger.bind(tag=TAG).warning(
+                    f"{worker_name} CPU亲和性设置失败 {budget.cpu_affinity}: {e}"
+                )
+        else:
+            logger.bind(tag=TAG).warning("当前平台不支持设置CPU亲和性，已忽略cpu_affinity")
+
+    torch = sys.modules.get("torch")
+    if torch is not None:
+        with _lock:
+            _configure_torch()
+
+    with _lock:
+        _applied[worker_name] = applied
+
+
+def runtime_report() -> dict:
+    """汇总线程预算和实际生效的设置"""
+    report = {
+        "cpu_count": os.cpu_count(),
+        "budgets": {family: b.to_dict() for family, b in _budgets.items()},
+    }
+    if hasattr(os, "sched_getaffinity"):
+        report["process_cpus"] = len(os.sched_getaffinity(0))
+    torch = sys.modules.get("torch")
+    if torch is not None:
+        # torch的线程数是进程级的，所有类别共用
+        report["torch"] = {
+            "version": torch.__version__,
+            "intra_op_threads": torch.get_num_threads(),
+            "interop_threads": torch.get_num_interop_threads(),
+        }
+        expected = get_torch_threads()
+        if expected and torch.get_num_threads() != expected:
+            report["torch_warning"] = (
+                f"torch intra-op线程数为{torch.get_num_threads()}，与预算({expected})不一致，"
+                "可能被其他库（如模型配置的num_threads）覆盖"
+            )
+    onnxruntime = sys.modules.get("onnxruntime")
+    if onnxruntime is not None:
+        report["onnxruntime"] = {"version": onnxruntime.__version__}
+    with _lock:
+        report["workers"] = dict(_applied)
+
+    total = sum(b.intra_op_threads or 0 for b in _budgets.values())
+    cpus = report.get("process_cpus") or report["cpu_count"] or 0
+    if cpus and total > cpus:
+        report["warning"] = f"各类别intra-op线程数之和({total})超过可用CPU数({cpus})"
+    return report
+
+
+def log_runtime_report():
+    """在启动时输出线程预算报告"""
+    report = runtime_report()
+    logger.bind(tag=TAG).info(f"CPU线程预算: {report}")
+    for key in ("warning", "torch_warning"):
+        if report.get(key):
+            logger.bind(tag=TAG).warning(report[key])
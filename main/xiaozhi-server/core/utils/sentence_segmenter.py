@@ -0,0 +1,106 @@
+"""
+TTS文本流式分句
+只保存尚未分句的尾部文本，每个新到达的字符只扫描一次，
+支持首句最小长度、无标点超时强制切分和最大句长等策略
+"""
+
+import time
+from typing import Iterable, List, Optional
+from core.utils import textUtils
+
+
+class SentenceSegmenter:
+    def __init__(
+        self,
+        punctuations: Iterable[str],
+        first_punctuations: Iterable[str],
+        min_first_length: int = 0,
+        max_length: int = 0,
+        flush_after_ms: float = 0,
+    ):
+        """
+        Args:
+            punctuations: 普通句子的切分标点
+            first_punctuations: 首句的切分标点（通常包含逗号，以便尽快开始播放）
+            min_first_length: 首句的最小长度（不含标点和表情），不足时继续等待下一个标点，0表示不限制
+            max_length: 最大句长，尾部文本超过该长度时强制切分，0表示不限制
+            flush_after_ms: 尾部文本持续该时长没有遇到标点时整体切出，0表示不限制
+        """
+        self.punctuations = frozenset(punctuations)
+        self.first_punctuations = frozenset(first_punctuations)
+        self.min_first_length = min_first_length
+        self.max_length = max_length
+        self.flush_after_ms = flush_after_ms
+        self.reset()
+
+    def reset(self):
+        """开始新的一轮回复"""
+        self.tail = ""
+        # 尾部文本中已扫描过的位置，新文本到达时从这里继续扫描
+        self.scan_pos = 0
+        self.is_first = True
+        # 尾部文本开始累积的时间（毫秒）
+        self.tail_started_ms = None
+
+    def push(self, text: str, now_ms: Optional[float] = None) -> List[str]:
+        """追加一段文本，返回本次可以切出的所有句子（保留原始标点）"""
+        if not text:
+            return []
+        if now_ms is None:
+            now_ms = time.monotonic() * 1000
+        if not self.tail:
+            self.tail_started_ms = now_ms
+        self.tail += text
+
+        segments = []
+        while True:
+            segment = self._cut_at_punctuation()
+            if segment is None:
+                break
+            segments.append(self._take(segment, now_ms))
+
+        while self.max_length > 0 and len(self.tail) >= self.max_length:
+            segments.append(self._take(self.max_length, now_ms))
+
+        if (
+            self.flush_after_ms > 0
+            and self.tail
+            and now_ms - self.tail_started_ms >= self.flush_after_ms
+        ):
+            segments.append(self._take(len(self.tail), now_ms))
+        return segments
+
+    def flush(self) -> str:
+        """取出剩余的全部文本"""
+        remaining = self.tail
+        self.tail = ""
+        self.scan_pos = 0
+        self.tail_started_ms = None
+        return remaining
+
+    def _cut_at_punctuation(self) -> Optional[int]:
+        """从上次扫描的位置继续查找切分点，返回切分长度"""
+        punctuations = self.first_punctuations if self.is_first else self.punctuations
+        tail = self.tail
+        for i in range(self.scan_pos, len(tail)):
+            if tail[i] not in punctuations:
+                continue
+            end = i + 1
+            if (
+                self.is_first
+                and self.min_first_length > 0
+                and len(textUtils.get_string_no_punctuation_or_emoji(tail[:end]))
+                < self.min_first_length
+            ):
+                continue
+            return end
+        self.scan_pos = len(tail)
+        return None
+
+    def _take(self, length: int, now_ms: float) -> str:
+        segment = self.tail[:length]
+        self.tail = self.tail[length:]
+        self.scan_pos = 0
+        self.is_first = False
+        self.tail_started_ms = now_ms if self.tail else None
+        return segment
@@ -0,0 +1,158 @@
+"""
+预热会话池
+提前建立并完成鉴权、初始化的流式服务会话（如ASR的WebSocket连接），
+检测到语音时直接取出使用，取出后在后台补充，握手不再位于用户说话到返回文字的关键路径上
+同一配置的所有连接共享一个池，没有连接使用时关闭空闲会话
+"""
+
+import time
+import asyncio
+from collections import deque
+from typing import Any, Awaitable, Callable, Optional
+from config.logger import setup_logging
+from core.utils import metrics
+
+TAG = __name__
+logger = setup_logging()
+
+# 创建失败后的重试间隔（秒），连续失败时逐步加倍
+RETRY_DELAY = 2
+MAX_RETRY_DELAY = 60
+
+_pools = {}
+
+
+class WarmSessionPool:
+    """
+    保持size个已就绪的空闲会话
+    空闲超过max_idle秒的会话在过期前关闭并重建，避免被服务端因空闲断开
+    """
+
+    def __init__(
+        self,
+        name: str,
+        create: Callable[[], Awaitable[Any]],
+        close: Callable[[Any], Awaitable[None]],
+        is_alive: Optional[Callable[[Any], bool]] = None,
+        size: int = 1,
+        max_idle: float = 10,
+    ):
+        self.name = name
+        self.create = create
+        self.close_session = close
+        self.is_alive = is_alive or (lambda session: True)
+        self.size = max(0, int(size))
+        self.max_idle = float(max_idle)
+        self.idle = deque()  # (session, 创建时间)
+        self.users = 0
+        self.fill_task = None
+        self.retry_delay = RETRY_DELAY
+        # 会话被取出时唤醒后台任务立即补充
+        self.wakeup = asyncio.Event()
+
+    def attach(self):
+        """登记一个使用方，开始预热"""
+        self.users += 1
+        self._schedule_fill()
+
+    async def detach(self):
+        """注销一个使用方，没有使用方时关闭所有空闲会话"""
+        self.users = max(0, self.users - 1)
+        if self.users == 0:
+            if self.fill_task is not None:
+                self.fill_task.cancel()
+                self.fill_task = None
+            while self.idle:
+                session, _ = self.idle.popleft()
+                await self._discard(session)
+            metrics.set_gauge(f"{self.name}.idle", 0)
+
+    async def acquire(self):
+        """取出一个已就绪的会话，没有可用会话时立即新建"""
+        while self.idle:
+            session, created_at = self.idle.popleft()
+            if self._usable(session, created_at):
+                metrics.inc_counter(f"{self.name}.warm_hit")
+                metrics.set_gauge(f"{self.name}.idle", len(self.idle))
+                self._schedule_fill()
+                return session
+            await self._discard(session)
+        metrics.inc_counter(f"{self.name}.warm_miss")
+        self._schedule_fill()
+        return await self.create()
+
+    def _usable(self, session, created_at) -> bool:
+        if time.monotonic() - created_at > self.max_idle:
+            return False
+        try:
+            return self.is_alive(session)
+        except Exception:
+            return False
+
+    async def _discard(self, session):
+        try:
+            await self.close_session(session)
+        except Exception:
+            pass
+
+    def _schedule_fill(self):
+        if self.size <= 0 or self.users <= 0:
+            return
+        if self.fill_task is None or self.fill_task.done():
+            self.fill_task = asyncio.create_task(self._maintain())
+        else:
+            self.wakeup.set()
+
+    async def _maintain(self):
+        """补足空闲会话，并在最早的会话过期前替换它"""
+        while self.users > 0:
+            # 清理已过期或已断开的会话
+            for _ in range(len(self.idle)):
+                session, created_at = self.idle.popleft()
+                if self._usable(session, created_at):
+                    self.idle.append((session, created_at))
+                else:
+                    await self._discard(session)
+
+            if len(self.idle) < self.size:
+                try:
+                    session = await self.create()
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.bind(tag=TAG).warning(f"{self.name} 预热会话创建失败: {e}")
+                    metrics.inc_counter(f"{self.name}.create_failed")
+                    await asyncio.sleep(self.retry_delay)
+                    self.retry_delay = min(self.retry_delay * 2, MAX_RETRY_DELAY)
+                    continue
+                self.retry_delay = RETRY_DELAY
+                if self.users <= 0:
+                    await self._discard(session)
+                    break
+                self.idle.append((session, time.monotonic()))
+                metrics.set_gauge(f"{self.name}.idle", len(self.idle))
+                continue
+
+            # 已补满：等到最早的会话即将过期时再检查
+            oldest = self.idle[0][1]
+            wait = oldest + self.max_idle * 0.8 - time.monotonic()
+            if wait > 0:
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+                self.wakeup.clear()
+            else:
+                session, _ = self.idle.popleft()
+                await self._discard(session)
+
+
+def get_session_pool(
+    key, name: str, create, close, is_alive=None, size=1, max_idle=10
+) -> WarmSessionPool:
+    """按key获取进程内共享的预热会话池，不存在时用当前参数创建"""
+    pool = _pools.get(key)
+    if pool is None:
+        pool = WarmSessionPool(name, create, close, is_alive, size, max_idle)
+        _pools[key] = pool
+    return pool
@@ -0,0 +1,86 @@
+"""
+推测式对话
+用户短暂停顿时提前执行ASR并开始请求LLM，生成的播报内容先缓存不播放；
+用户继续说话则取消，静音达到说话结束阈值后确认，缓存内容立即送入TTS
+"""
+
+import uuid
+import threading
+
+PENDING = 0
+CONFIRMED = 1
+CANCELLED = 2
+
+# 对话线程等待确认的最长时间（秒），超时视为取消
+CONFIRM_TIMEOUT = 30
+
+
+class SpeculativeTurn:
+    """
+    一次推测式对话的状态
+    ASR任务在事件循环中执行，LLM在对话线程中执行，两边通过本对象交接：
+    确认前TTS消息缓存在本对象中，工具调用、写入对话记录等有副作用的操作需先等待确认
+    """
+
+    def __init__(self):
+        # 事件循环中的ASR任务，由连接负责取消
+        self.asr_task = None
+        # 已提交给LLM的推测文本，未提交时为None
+        self.query = None
+        # 推测回复使用的句子ID，确认时设置到连接上
+        self.sentence_id = uuid.uuid4().hex
+        self._state = PENDING
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._resolved = threading.Event()
+
+    @property
+    def pending(self) -> bool:
+        return self._state == PENDING
+
+    @property
+    def confirmed(self) -> bool:
+        return self._state == CONFIRMED
+
+    @property
+    def cancelled(self) -> bool:
+        return self._state == CANCELLED
+
+    def put(self, target_queue, item):
+        """确认前缓存，确认后直接放入目标队列，取消后丢弃"""
+        with self._lock:
+            if self._state == PENDING:
+                self._buffer.append((target_queue, item))
+                return
+            if self._state == CANCELLED:
+                return
+        target_queue.put(item)
+
+    def confirm(self) -> bool:
+        """确认推测结果，按顺序放入缓存的消息；已取消时返回False"""
+        with self._lock:
+            if self._state != PENDING:
+                return self._state == CONFIRMED
+            buffered = self._buffer
+            self._buffer = []
+            # 持有锁时放入缓存内容，保证后续消息排在缓存内容之后
+            for target_queue, item in buffered:
+                target_queue.put(item)
+            self._state = CONFIRMED
+        self._resolved.set()
+        return True
+
+    def cancel(self):
+        """取消推测，丢弃缓存内容"""
+        with self._lock:
+            if self._state != PENDING:
+                return
+            self._state = CANCELLED
+            self._buffer = []
+        self._resolved.set()
+
+    def wait(self, timeout: float = CONFIRM_TIMEOUT) -> bool:
+        """在对话线程中等待确认，返回是否已确认"""
+        if not self._resolved.wait(timeout):
+            self.cancel()
+        return self.confirmed
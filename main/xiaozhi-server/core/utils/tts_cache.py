@@ -0,0 +1,272 @@
+"""
+TTS合成结果缓存
+按(TTS类型, 音色, 合成参数, 规范化文本)计算内容哈希，缓存最终的Opus数据包列表，
+内存LRU层与磁盘p3文件层各自有容量上限和过期时间，所有连接共享；
+合成结果先只放入内存层，同一文本再次命中时才由后台线程写入磁盘层，
+一次性的对话内容不会落盘，写盘也不会阻塞合成流程
+"""
+
+import os
+import json
+import time
+import queue
+import struct
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import List, Optional
+from config.logger import setup_logging
+from core.utils import p3, metrics
+
+TAG = __name__
+logger = setup_logging()
+
+# 后台写盘任务积压上限，超过时丢弃新的写盘任务（内存层不受影响）
+DEFAULT_MAX_PENDING_WRITES = 64
+
+# 不参与缓存键计算的配置项（密钥、输出目录等与合成结果无关的内容）
+IGNORED_CONFIG_KEYS = {
+    "type",
+    "output_dir",
+    "api_key",
+    "access_token",
+    "token",
+    "secret",
+    "secret_id",
+    "secret_key",
+    "access_key_id",
+    "access_key_secret",
+    "appkey",
+    "appid",
+    "group_id",
+    "authorization",
+}
+
+
+def normalize_text(text: str) -> str:
+    """规范化文本：去除首尾空白并合并连续空白"""
+    return " ".join(text.split())
+
+
+def build_cache_identity(provider: str, config: dict) -> str:
+    """根据TTS类型和影响合成结果的配置项生成缓存标识"""
+    params = {
+        key: value
+        for key, value in config.items()
+        if key not in IGNORED_CONFIG_KEYS and isinstance(value, (str, int, float, bool))
+    }
+    return provider + "|" + json.dumps(params, sort_keys=True, ensure_ascii=False)
+
+
+def build_cache_key(identity: str, voice, text: str) -> str:
+    raw = f"{identity}|{voice}|{normalize_text(text)}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class TTSCache:
+    def __init__(
+        self,
+        memory_max_mb: float = 64,
+        disk_dir: str = "data/tts_cache",
+        disk_max_mb: float = 512,
+        ttl_hours: float = 24 * 7,
+        disk_min_hits: int = 1,
+        max_pending_writes: int = DEFAULT_MAX_PENDING_WRITES,
+    ):
+        self.memory_max_bytes = int(memory_max_mb * 1024 * 1024)
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = int(disk_max_mb * 1024 * 1024)
+        self.ttl = ttl_hours * 3600
+        # 内存层命中多少次后写入磁盘层，0表示首次合成后立即写入
+        self.disk_min_hits = max(0, int(disk_min_hits))
+        self.lock = threading.Lock()
+        # key -> (写入时间, 数据包元组, 字节数)
+        self.memory = OrderedDict()
+        self.memory_bytes = 0
+        # key -> 内存层命中次数
+        self.memory_hits = {}
+        # key -> (文件修改时间, 文件大小)，按修改时间从旧到新排列
+        self.disk_index = OrderedDict()
+        self.disk_bytes = 0
+        # 已提交后台写盘、尚未写完的key
+        self.disk_pending = set()
+        self.disk_tasks = None
+        if self.disk_enabled:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            self._load_disk_index()
+            self.disk_tasks = queue.Queue(maxsize=max_pending_writes)
+            threading.Thread(
+                target=self._run_disk_writer, name="tts-cache-writer", daemon=True
+            ).start()
+
+    @property
+    def disk_enabled(self) -> bool:
+        return bool(self.disk_dir) and self.disk_max_bytes > 0
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, f"{key}.p3")
+
+    def _load_disk_index(self):
+        entries = []
+        for entry in os.scandir(self.disk_dir):
+            if entry.is_file() and entry.name.endswith(".p3"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, entry.name[:-3], stat.st_size))
+        for mtime, key, size in sorted(entries):
+            self.disk_index[key] = (mtime, size)
+            self.disk_bytes += size
+        self._evict_disk()
+
+    def get(self, key: str) -> Optional[tuple]:
+        """查找缓存，依次查询内存层和磁盘层"""
+        now = time.time()
+        with self.lock:
+            entry = self.memory.get(key)
+            if entry is not None:
+                if now - entry[0] <= self.ttl:
+                    self.memory.move_to_end(key)
+                    hits = self.memory_hits.get(key, 0) + 1
+                    self.memory_hits[key] = hits
+                    if hits >= self.disk_min_hits:
+                        self._schedule_disk(key, entry[1])
+                    metrics.inc_counter("tts_cache.hit_memory")
+                    return entry[1]
+                self._remove_memory(key)
+
+            disk_entry = self.disk_index.get(key)
+        if disk_entry is not None:
+            if now - disk_entry[0] <= self.ttl:
+                try:
+                    packets, _ = p3.decode_opus_from_file(self._disk_path(key))
+                    packets = tuple(packets)
+                    with self.lock:
+                        self._put_memory(key, packets, disk_entry[0])
+                    metrics.inc_counter("tts_cache.hit_disk")
+                    return packets
+                except Exception as e:
+                    logger.bind(tag=TAG).warning(f"读取TTS磁盘缓存失败: {e}")
+            with self.lock:
+                self._remove_disk(key)
+
+        metrics.inc_counter("tts_cache.miss")
+        return None
+
+    def put(self, key: str, packets: List[bytes]):
+        """写入内存层，disk_min_hits为0时同时提交后台写盘"""
+        if not packets:
+            return
+        packets = tuple(packets)
+        now = time.time()
+        with self.lock:
+            self._put_memory(key, packets, now)
+            if self.disk_min_hits == 0:
+                self._schedule_disk(key, packets)
+        metrics.inc_counter("tts_cache.store")
+
+    def _schedule_disk(self, key: str, packets: tuple):
+        """提交后台写盘（需持有锁），已在磁盘层或已在队列中时跳过"""
+        if self.disk_tasks is None:
+            return
+        if key in self.disk_index or key in self.disk_pending:
+            return
+        try:
+            self.disk_tasks.put_nowait((key, packets))
+        except queue.Full:
+            metrics.inc_counter("tts_cache.disk_write_dropped")
+            return
+        self.disk_pending.add(key)
+        metrics.set_gauge("tts_cache.disk_write_pending", self.disk_tasks.qsize())
+
+    def _run_disk_writer(self):
+        while True:
+            key, packets = self.disk_tasks.get()
+            try:
+                self._put_disk(key, packets)
+            finally:
+                with self.lock:
+                    self.disk_pending.discard(key)
+            metrics.set_gauge("tts_cache.disk_write_pending", self.disk_tasks.qsize())
+
+    def _put_memory(self, key: str, packets: tuple, created: float):
+        size = sum(len(packet) for packet in packets)
+        if size > self.memory_max_bytes:
+            return
+        self._remove_memory(key)
+        self.memory[key] = (created, packets, size)
+        self.memory_bytes += size
+        while self.memory_bytes > self.memory_max_bytes and self.memory:
+            self._remove_memory(next(iter(self.memory)))
+        metrics.set_gauge("tts_cache.memory_bytes", self.memory_bytes)
+
+    def _remove_memory(self, key: str):
+        entry = self.memory.pop(key, None)
+        self.memory_hits.pop(key, None)
+        if entry is not None:
+            self.memory_bytes -= entry[2]
+
+    def _put_disk(self, key: str, packets: tuple):
+        path = self._disk_path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                for packet in packets:
+                    f.write(struct.pack(">BBH", 0, 0, len(packet)))
+                    f.write(packet)
+            os.replace(tmp_path, path)
+            stat = os.stat(path)
+        except Exception as e:
+            logger.bind(tag=TAG).warning(f"写入TTS磁盘缓存失败: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+        with self.lock:
+            old = self.disk_index.pop(key, None)
+            if old is not None:
+                self.disk_bytes -= old[1]
+            self.disk_index[key] = (stat.st_mtime, stat.st_size)
+            self.disk_bytes += stat.st_size
+            self._evict_disk()
+        metrics.inc_counter("tts_cache.disk_store")
+
+    def _remove_disk(self, key: str):
+        entry = self.disk_index.pop(key, None)
+        if entry is not None:
+            self.disk_bytes -= entry[1]
+            try:
+                os.remove(self._disk_path(key))
+            except FileNotFoundError:
+                pass
+
+    def _evict_disk(self):
+        """删除过期文件，并按写入先后淘汰超出容量的文件"""
+        now = time.time()
+        while self.disk_index:
+            key, (mtime, _) = next(iter(self.disk_index.items()))
+            if now - mtime > self.ttl or self.disk_bytes > self.disk_max_bytes:
+                self._remove_disk(key)
+            else:
+                break
+        metrics.set_gauge("tts_cache.disk_bytes", self.disk_bytes)
+
+
+_tts_cache = None
+_tts_cache_lock = threading.Lock()
+
+
+def get_tts_cache(config: dict) -> Optional[TTSCache]:
+    """获取进程内共享的TTS缓存，未启用时返回None"""
+    global _tts_cache
+    cache_config = config.get("tts_cache") or {}
+    if not cache_config.get("enabled", False):
+        return None
+    if _tts_cache is None:
+        with _tts_cache_lock:
+            if _tts_cache is None:
+                _tts_cache = TTSCache(
+                    memory_max_mb=float(cache_config.get("memory_max_mb", 64)),
+                    disk_dir=cache_config.get("disk_dir", "data/tts_cache"),
+                    disk_max_mb=float(cache_config.get("disk_max_mb", 512)),
+                    ttl_hours=float(cache_config.get("ttl_hours", 24 * 7)),
+                    disk_min_hits=int(cache_config.get("disk_min_hits", 1)),
+                )
+    return _tts_cache
@@ -6,10 +6,10 @@ import os
 import wave
 from io import BytesIO
 from core.utils import p3
-import numpy as np
 import requests
 import opuslib_next
-from pydub import AudioSegment
+from core.utils.audio_decode import decode_to_pcm
+from core.utils.opus_encoder_utils import get_encoder_pool
 import copy
 
 TAG = __name__
@@ -758,48 +758,43 @@ def audio_to_data(audio_file_path, is_opus=True):
     file_type = os.path.splitext(audio_file_path)[1]
     if file_type:
         file_type = file_type.lstrip(".")
-    # 读取音频文件，-nostdin 参数：不要从标准输入读取数据，否则FFmpeg会阻塞
-    audio = AudioSegment.from_file(
-        audio_file_path, format=file_type, parameters=["-nostdin"]
-    )
+    with open(audio_file_path, "rb") as f:
+        audio_bytes = f.read()
 
     # 转换为单声道/16kHz采样率/16位小端编码（确保与编码器匹配）
-    audio = audio.set_channels(1).set_frame_rate(16000).set_sample_width(2)
+    raw_data = decode_to_pcm(audio_bytes, file_type)
 
     # 音频时长(秒)
-    duration = len(audio) / 1000.0
-
-    # 获取原始PCM数据（16位小端）
-    raw_data = audio.raw_data
+    duration = len(raw_data) / 2 / 16000
     return pcm_to_data(raw_data, is_opus), duration
 
 
 def audio_bytes_to_data(audio_bytes, file_type, is_opus=True):
     """
-    直接用音频二进制数据转为opus/pcm数据，支持wav、mp3、p3
+    直接用音频二进制数据转为opus/pcm数据，支持wav、pcm、mp3、p3
     """
     if file_type == "p3":
         # 直接用p3解码
         return p3.decode_opus_from_bytes(audio_bytes)
     else:
-        # 其他格式用pydub
-        audio = AudioSegment.from_file(
-            BytesIO(audio_bytes), format=file_type, parameters=["-nostdin"]
-        )
-        audio = audio.set_channels(1).set_frame_rate(16000).set_sample_width(2)
-        duration = len(audio) / 1000.0
-        raw_data = audio.raw_data
+        # wav/pcm在进程内解析，其他格式交给常驻的ffmpeg进程
+        raw_data = decode_to_pcm(audio_bytes, file_type)
+        duration = len(raw_data) / 2 / 16000
         return pcm_to_data(raw_data, is_opus), duration
 
 
 def pcm_to_data(raw_data, is_opus=True):
-    # 初始化Opus编码器
-    encoder = opuslib_next.Encoder(16000, 1, opuslib_next.APPLICATION_AUDIO)
-
     # 编码参数
     frame_duration = 60  # 60ms per frame
     frame_size = int(16000 * frame_duration / 1000)  # 960 samples/frame
 
+    if is_opus:
+        # 从编码器池取出编码器（保持opus默认的比特率等参数），整段PCM一次编码，最后一帧不足时补零
+        with get_encoder_pool(
+            16000, 1, frame_duration, bitrate=None, complexity=None, signal=None
+        ).checkout() as encoder:
+            return encoder.encode_pcm_to_opus(raw_data, True)
+
     datas = []
     # 按帧处理所有音频数据（包括最后一帧可能补零）
     for i in range(0, len(raw_data), frame_size * 2):  # 16bit=2bytes/sample
@@ -810,15 +805,7 @@ def pcm_to_data(raw_data, is_opus=True):
         if len(chunk) < frame_size * 2:
             chunk += b"\x00" * (frame_size * 2 - len(chunk))
 
-        if is_opus:
-            # 转换为numpy数组处理
-            np_frame = np.frombuffer(chunk, dtype=np.int16)
-            # 编码Opus数据
-            frame_data = encoder.encode(np_frame.tobytes(), frame_size)
-        else:
-            frame_data = chunk if isinstance(chunk, bytes) else bytes(chunk)
-
-        datas.append(frame_data)
+        datas.append(chunk if isinstance(chunk, bytes) else bytes(chunk))
 
     return datas
 
@@ -0,0 +1,140 @@
+"""
+Opusエンコードのマイクロベンチマーク
+実際のopuslib_next（libopus）を使い、TTS出力と同じ16kHz単声道・60msフレームで次を計測します
+  - エンコーダーの新規作成とエンコーダープールからの取り出し・返却のコスト
+  - OpusEncoderUtilsのバッファリングを含むエンコード時間と、libopusを直接呼んだ場合との差
+    （ストリーミング時はTTSの応答と同じく不揃いなチャンクで入力します）
+使い方: python performance_tester_opus.py [--seconds 10] [--repeat 20]
+"""
+
+import time
+import argparse
+import statistics
+
+import numpy as np
+from opuslib_next import Encoder, constants
+
+from core.utils.opus_encoder_utils import OpusEncoderUtils, get_encoder_pool
+
+SAMPLE_RATE = 16000
+CHANNELS = 1
+FRAME_MS = 60
+FRAME_SIZE = SAMPLE_RATE * FRAME_MS // 1000
+FRAME_BYTES = FRAME_SIZE * CHANNELS * 2
+
+
+def make_pcm(seconds: float, seed: int = 0) -> bytes:
+    """音声に近いレベルのランダムな16ビットPCMを生成"""
+    rng = np.random.default_rng(seed)
+    samples = rng.integers(-3000, 3000, int(SAMPLE_RATE * seconds), dtype=np.int16)
+    return samples.tobytes()
+
+
+def make_chunks(pcm: bytes, seed: int = 0) -> list:
+    """TTSのストリーミング応答を模して、20ms〜200msの不揃いなチャンクに分割"""
+    rng = np.random.default_rng(seed)
+    chunks, offset = [], 0
+    while offset < len(pcm):
+        size = int(rng.integers(320, 3200)) * 2
+        chunks.append(pcm[offset : offset + size])
+        offset += size
+    return chunks
+
+
+def timed(func, repeat: int) -> float:
+    """funcをrepeat回実行し、1回あたりの中央値（ミリ秒）を返す"""
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append((time.perf_counter() - start) * 1000)
+    return statistics.median(durations)
+
+
+def raw_encode(pcm: bytes) -> list:
+    """libopusを直接呼ぶ基準値（OpusEncoderUtilsと同じパラメータ、最終フレームはゼロ埋め）"""
+    encoder = Encoder(SAMPLE_RATE, CHANNELS, constants.APPLICATION_AUDIO)
+    encoder.bitrate = 24000
+    encoder.complexity = 10
+    encoder.signal = constants.SIGNAL_VOICE
+    remainder = len(pcm) % FRAME_BYTES
+    if remainder:
+        pcm += bytes(FRAME_BYTES - remainder)
+    return [
+        encoder.encode(pcm[offset : offset + FRAME_BYTES], FRAME_SIZE)
+        for offset in range(0, len(pcm), FRAME_BYTES)
+    ]
+
+
+def bench_encoder_creation(repeat: int):
+    pool = get_encoder_pool(SAMPLE_RATE, CHANNELS, FRAME_MS)
+    pool.release(pool.acquire())
+
+    def create():
+        for _ in range(100):
+            OpusEncoderUtils(SAMPLE_RATE, CHANNELS, FRAME_MS)
+
+    def checkout():
+        for _ in range(100):
+            pool.release(pool.acquire())
+
+    create_ms = timed(create, repeat) / 100
+    pool_ms = timed(checkout, repeat) / 100
+    print("エンコーダーの取得（1回あたり）")
+    print(f"  新規作成:         {create_ms * 1000:8.1f} µs")
+    print(f"  プールから取得:   {pool_ms * 1000:8.1f} µs")
+
+
+def bench_encode(seconds: float, repeat: int):
+    pcm = make_pcm(seconds)
+    chunks = make_chunks(pcm)
+    pool = get_encoder_pool(SAMPLE_RATE, CHANNELS, FRAME_MS)
+    expected = raw_encode(pcm)
+
+    def whole():
+        with pool.checkout() as encoder:
+            return encoder.encode_pcm_to_opus(pcm, True)
+
+    def stream():
+        packets = []
+        with pool.checkout() as encoder:
+            for chunk in chunks:
+                packets += encoder.encode_pcm_to_opus(chunk, False)
+            packets += encoder.encode_pcm_to_opus(b"", True)
+        return packets
+
+    # 分割の仕方によらず、libopusを直接呼んだ場合と同じパケット列になることを確認
+    assert whole() == expected, "一括エンコードの結果がlibopusと一致しません"
+    assert stream() == expected, "ストリーミングエンコードの結果がlibopusと一致しません"
+
+    raw_ms = timed(lambda: raw_encode(pcm), repeat)
+    whole_ms = timed(whole, repeat)
+    stream_ms = timed(stream, repeat)
+    print(
+        f"{seconds:g}秒の音声のエンコード（{len(expected)}フレーム、"
+        f"ストリーミング入力は{len(chunks)}チャンク）"
+    )
+    for name, ms in (
+        ("libopus直接", raw_ms),
+        ("一括", whole_ms),
+        ("ストリーミング", stream_ms),
+    ):
+        print(
+            f"  {name:<10} {ms:8.2f} ms  実時間比 {ms / (seconds * 1000):.4f}  "
+            f"libopus直接比 {ms / raw_ms:.2f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Opusエンコードのマイクロベンチマーク")
+    parser.add_argument("--seconds", type=float, default=10, help="エンコードする音声の長さ（秒）")
+    parser.add_argument("--repeat", type=int, default=20, help="各計測の繰り返し回数")
+    args = parser.parse_args()
+
+    bench_encoder_creation(args.repeat)
+    bench_encode(args.seconds, args.repeat)
+    bench_encode(args.seconds * 6, max(1, args.repeat // 4))
+
+
+if __name__ == "__main__":
+    main()
@@ -11,6 +11,7 @@ from core.utils import p3
 from core.handle.sendAudioHandle import send_stt_message
 from plugins_func.register import register_function, ToolType, ActionResponse, Action
 from core.utils.dialogue import Message
+from core.utils.music_cache import get_music_cache
 from core.providers.tts.dto.dto import TTSMessageDTO, SentenceType, ContentType
 
 TAG = __name__
@@ -214,6 +215,10 @@ async def play_local_music(conn, specific_file=None):
         if not os.path.exists(music_path):
             conn.logger.bind(tag=TAG).error(f"选定的音乐文件不存在: {music_path}")
             return
+        # 変換済みの場合はキャッシュのp3ファイルを再生します（未変換の場合はバックグラウンド変換を依頼し、今回は元のファイルを再生）
+        music_cache = get_music_cache(conn.config)
+        if music_cache is not None:
+            music_path = music_cache.resolve(music_path)
         text = _get_random_play_prompt(selected_music)
         await send_stt_message(conn, text)
         conn.dialogue.put(Message(role="assistant", content=text))
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# 测试从服务端根目录导入core、config等模块
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if SERVER_DIR not in sys.path:
+    sys.path.insert(0, SERVER_DIR)
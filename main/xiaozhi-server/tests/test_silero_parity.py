@@ -0,0 +1,82 @@
+"""
+Silero VAD两种推理后端的一致性测试
+同一段录音分别经过torch版（silero.VADProvider）和onnxruntime版（silero_onnx.VADProvider），
+逐个32ms音频块比较语音/静音判定
+"""
+
+import os
+import numpy as np
+import pytest
+
+from conftest import SERVER_DIR
+
+pytest.importorskip("torch")
+pytest.importorskip("onnxruntime")
+pytest.importorskip("opuslib_next")
+
+MODEL_DIR = os.path.join(SERVER_DIR, "models", "snakers4_silero-vad")
+ASSETS_DIR = os.path.join(SERVER_DIR, "config", "assets")
+WAV_FILES = ["bind_not_found.wav", "wakeup_words.wav", "max_output_size.wav"]
+# 每次提交的音频块数，与60ms的Opus包大致相当
+CHUNKS_PER_PACKET = 2
+# 两个后端的概率差异很小，只有恰好落在阈值附近的块可能判定不同
+MAX_MISMATCH_RATIO = 0.01
+MAX_PROB_DIFF = 0.05
+
+
+@pytest.fixture(scope="module")
+def providers():
+    if not os.path.exists(os.path.join(SERVER_DIR, "data", ".config.yaml")):
+        pytest.skip("需要data/.config.yaml才能初始化日志")
+    from core.providers.vad import silero, silero_onnx
+
+    config = {"model_dir": MODEL_DIR, "threshold": "0.5", "energy_gate": False}
+    return silero.VADProvider(config), silero_onnx.VADProvider(config)
+
+
+def _load_chunks(file_name: str) -> np.ndarray:
+    """读取录音并转换为16kHz单声道，切分为[n, 512]的float32音频块"""
+    from core.providers.vad.silero_base import CHUNK_SAMPLES
+    from core.utils.audio_decode import decode_to_pcm
+
+    with open(os.path.join(ASSETS_DIR, file_name), "rb") as f:
+        pcm = decode_to_pcm(f.read(), "wav")
+    # 前后补1秒静音，覆盖语音起止两侧的判定
+    silence = np.zeros(16000, dtype=np.int16)
+    samples = np.concatenate([silence, np.frombuffer(pcm, dtype=np.int16), silence])
+    count = len(samples) // CHUNK_SAMPLES
+    chunks = samples[: count * CHUNK_SAMPLES].astype(np.float32) / 32768.0
+    return chunks.reshape(count, CHUNK_SAMPLES)
+
+
+def _speech_probs(provider, chunks: np.ndarray) -> np.ndarray:
+    """与连接的处理方式相同：每个连接一个状态，按包提交给批量推理引擎"""
+    state = provider.create_state()
+    probs = []
+    for i in range(0, len(chunks), CHUNKS_PER_PACKET):
+        probs.extend(
+            provider.engine.submit(state, chunks[i : i + CHUNKS_PER_PACKET]).result()
+        )
+    return np.array(probs)
+
+
+@pytest.mark.parametrize("file_name", WAV_FILES)
+def test_onnx_matches_torch(providers, file_name):
+    torch_provider, onnx_provider = providers
+    chunks = _load_chunks(file_name)
+
+    torch_probs = _speech_probs(torch_provider, chunks)
+    onnx_probs = _speech_probs(onnx_provider, chunks)
+    assert len(torch_probs) == len(onnx_probs) == len(chunks)
+
+    threshold = torch_provider.vad_threshold
+    torch_voice = torch_probs >= threshold
+    onnx_voice = onnx_probs >= threshold
+    # 录音中既有语音也有静音，判定结果才有比较意义
+    assert torch_voice.any() and not torch_voice.all()
+
+    mismatches = int(np.count_nonzero(torch_voice != onnx_voice))
+    assert mismatches <= len(chunks) * MAX_MISMATCH_RATIO, (
+        f"{file_name}: {mismatches}/{len(chunks)}个音频块的判定不一致"
+    )
+    assert float(np.max(np.abs(torch_probs - onnx_probs))) < MAX_PROB_DIFF